@@ -52,7 +52,10 @@ export default function AlertsPage() {
         stalledCutoff.setDate(stalledCutoff.getDate() - 3);
         const stalledCutoffISO = stalledCutoff.toISOString();
 
-        // Invoices: overdue + pending past due date
+        // Invoices: overdue + pending past due date. The scheduler marks the
+        // latter overdue hourly (mark-overdue-invoices), so the second query
+        // is normally empty, but it keeps alerts right if the scheduler is
+        // down or behind.
         const [overdueRes, pendingRes] = await Promise.all([
           supabase
             .from("invoices")
@@ -65,10 +68,14 @@ export default function AlertsPage() {
             .lt("due_date", todayISO),
         ]);
 
-        const invoiceRows = ([
-          ...(overdueRes.data ?? []),
-          ...(pendingRes.data ?? []),
-        ] as any[]).filter(Boolean);
+        // An invoice marked overdue between the two queries shows up in both
+        const invoiceRows = Array.from(
+          new Map(
+            ([...(overdueRes.data ?? []), ...(pendingRes.data ?? [])] as any[])
+              .filter(Boolean)
+              .map((row) => [row.id as string, row])
+          ).values()
+        );
 
         const invoiceCustomerIds = Array.from(
           new Set(
@@ -13,15 +13,17 @@ import { useTapanAssociateContext } from "@/components/layout/tapan-associate-co
 import type { ChartData, ChartDataPoint } from "@/types/dashboard";
 import { format, subDays, subYears } from "date-fns";
 
-interface ShipmentEvent {
-  created_at: string;
-  weight: number;
-  status: string;
+interface DailyShipmentStat {
+  day: string;
+  shipment_count: number;
+  delivered_count: number;
+  total_weight: number;
 }
 
-interface InvoiceEvent {
-  invoice_date: string;
-  amount: number;
+interface DailyRevenueStat {
+  day: string;
+  invoice_count: number;
+  revenue: number;
 }
 
 interface AnalyticsStats {
@@ -57,15 +59,22 @@ export default function AnalyticsPage() {
         const now = new Date();
         const yearAgo = subYears(now, 1);
 
+        // Rollup tables hold one row per day, so a year is at most 366 rows per series
+        const fromDay = getDayKey(yearAgo);
+
         const [shipmentsRes, invoicesRes] = await Promise.all([
           supabase
-            .from("shipments")
-            .select("created_at, weight, status")
-            .gte("created_at", yearAgo.toISOString()),
+            .from("daily_shipment_stats")
+            .select("day, shipment_count, delivered_count, total_weight")
+            .gte("day", fromDay)
+            .order("day", { ascending: false })
+            .limit(366),
           supabase
-            .from("invoices")
-            .select("invoice_date, amount, status")
-            .gte("invoice_date", yearAgo.toISOString()),
+            .from("daily_revenue_stats")
+            .select("day, invoice_count, revenue")
+            .gte("day", fromDay)
+            .order("day", { ascending: false })
+            .limit(366),
         ]);
 
         if (shipmentsRes.error) {
@@ -84,20 +93,22 @@ export default function AnalyticsPage() {
           throw invoicesRes.error;
         }
 
-        const shipmentEvents: ShipmentEvent[] = ((shipmentsRes.data as any[]) ?? []).map(
+        const shipmentDays: DailyShipmentStat[] = ((shipmentsRes.data as any[]) ?? []).map(
           (row) => ({
-            created_at: row.created_at as string,
-            weight: Number(row.weight ?? 0),
-            status: (row.status as string | null) ?? "pending",
+            day: row.day as string,
+            shipment_count: Number(row.shipment_count ?? 0),
+            delivered_count: Number(row.delivered_count ?? 0),
+            total_weight: Number(row.total_weight ?? 0),
           })
         );
 
-        const invoiceEvents: InvoiceEvent[] = ((invoicesRes.data as any[]) ?? []).map(
+        const revenueDays: DailyRevenueStat[] = ((invoicesRes.data as any[]) ?? []).map(
           (row) => ({
-            invoice_date: (row.invoice_date as string | null) ?? "",
-            amount: Number(row.amount ?? 0),
+            day: row.day as string,
+            invoice_count: Number(row.invoice_count ?? 0),
+            revenue: Number(row.revenue ?? 0),
           })
-        ).filter((ev) => !!ev.invoice_date);
+        );
 
         const shipmentsByDay = new Map<
           string,
@@ -105,26 +116,15 @@ export default function AnalyticsPage() {
         >();
         const revenueByDay = new Map<string, number>();
 
-        shipmentEvents.forEach((ev) => {
-          const d = new Date(ev.created_at);
-          if (Number.isNaN(d.getTime())) return;
-          const key = getDayKey(d);
-          const current = shipmentsByDay.get(key) ?? {
-            count: 0,
-            totalWeight: 0,
-          };
-          shipmentsByDay.set(key, {
-            count: current.count + 1,
-            totalWeight: current.totalWeight + ev.weight,
+        shipmentDays.forEach((row) => {
+          shipmentsByDay.set(row.day, {
+            count: row.shipment_count,
+            totalWeight: row.total_weight,
           });
         });
 
-        invoiceEvents.forEach((ev) => {
-          const d = new Date(ev.invoice_date);
-          if (Number.isNaN(d.getTime())) return;
-          const key = getDayKey(d);
-          const current = revenueByDay.get(key) ?? 0;
-          revenueByDay.set(key, current + ev.amount);
+        revenueDays.forEach((row) => {
+          revenueByDay.set(row.day, row.revenue);
         });
 
         const buildDaySeries = (days: number): ChartDataPoint[] => {
@@ -153,26 +153,23 @@ export default function AnalyticsPage() {
         >();
         const revenueByMonth = new Map<string, number>();
 
-        shipmentEvents.forEach((ev) => {
-          const d = new Date(ev.created_at);
-          if (Number.isNaN(d.getTime())) return;
-          const key = getMonthKey(d);
+        // Day keys are yyyy-MM-dd, so the month key is their prefix
+        shipmentDays.forEach((row) => {
+          const key = row.day.slice(0, 7);
           const current = shipmentsByMonth.get(key) ?? {
             count: 0,
             totalWeight: 0,
           };
           shipmentsByMonth.set(key, {
-            count: current.count + 1,
-            totalWeight: current.totalWeight + ev.weight,
+            count: current.count + row.shipment_count,
+            totalWeight: current.totalWeight + row.total_weight,
           });
         });
 
-        invoiceEvents.forEach((ev) => {
-          const d = new Date(ev.invoice_date);
-          if (Number.isNaN(d.getTime())) return;
-          const key = getMonthKey(d);
+        revenueDays.forEach((row) => {
+          const key = row.day.slice(0, 7);
           const current = revenueByMonth.get(key) ?? 0;
-          revenueByMonth.set(key, current + ev.amount);
+          revenueByMonth.set(key, current + row.revenue);
         });
 
         const buildMonthSeries = (months: number): ChartDataPoint[] => {
@@ -206,10 +203,12 @@ export default function AnalyticsPage() {
           last30Revenue += point.revenue;
         });
 
-        const totalShipments = shipmentEvents.length;
-        const deliveredShipments = shipmentEvents.filter(
-          (s) => s.status === "delivered"
-        ).length;
+        let totalShipments = 0;
+        let deliveredShipments = 0;
+        shipmentDays.forEach((row) => {
+          totalShipments += row.shipment_count;
+          deliveredShipments += row.delivered_count;
+        });
         const deliveredRate =
           totalShipments > 0
             ? Math.round((deliveredShipments / totalShipments) * 100)
@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server";
 import { getCurrentUser } from "@/lib/auth";
+import { runWithRequestScope } from "@/lib/request-auth";
 
 /**
  * GET /api/auth/getCurrentUser
@@ -7,7 +8,9 @@ import { getCurrentUser } from "@/lib/auth";
  */
 export async function GET() {
   try {
-    const user = await getCurrentUser();
+    // getCurrentUser reads the auth context and the profile through the
+    // same request client
+    const user = await runWithRequestScope(getCurrentUser);
 
     if (!user) {
       return NextResponse.json(
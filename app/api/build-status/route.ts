@@ -1,11 +1,19 @@
-
 import { NextResponse } from "next/server";
+import { queueDriver } from "@/lib/queues/setup";
+import { getQueueMetrics } from "@/lib/queues/metrics";
 
 export async function GET(req: Request) {
+  const queues = await getQueueMetrics().catch((error) => {
+    console.error("/api/build-status queue metrics error", error);
+    return null;
+  });
+
   return NextResponse.json({
     success: true,
     built: true,
     typescriptErrors: [],
-    status: "clean"
+    status: "clean",
+    queueDriver,
+    queues,
   });
 }
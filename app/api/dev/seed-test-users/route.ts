@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server";
 import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import { invalidateUserContext } from "@/lib/user-context";
 import type { Location } from "@/types/auth";
 
 type Role = "admin";  // Only admin role for this dashboard
@@ -59,6 +60,8 @@ async function ensureUser(
     throw upsertError;
   }
 
+  invalidateUserContext(user.id);
+
   return { id: user.id as string, email, role, location };
 }
 
@@ -20,8 +20,22 @@ interface ARSummaryResponse {
   };
 }
 
+// Snapshot refreshed every 15 minutes by the scheduler (refresh-ar-summary);
+// older ones mean the scheduler is not running, so compute live instead
+const SNAPSHOT_MAX_AGE_MS = 30 * 60_000;
+
 export async function GET() {
   try {
+    const { data: snapshot } = await supabaseAdmin
+      .from("finance_snapshots")
+      .select("payload, computed_at")
+      .eq("key", "ar_summary")
+      .maybeSingle();
+
+    if (snapshot && Date.now() - Date.parse(snapshot.computed_at) < SNAPSHOT_MAX_AGE_MS) {
+      return NextResponse.json(snapshot.payload as ARSummaryResponse);
+    }
+
     const [invoicesRes, paymentsRes] = await Promise.all([
       supabaseAdmin
         .from("invoices")
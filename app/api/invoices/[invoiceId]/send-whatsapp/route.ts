@@ -1,6 +1,42 @@
-
 import { NextResponse } from "next/server";
+import { withAuth } from "@/lib/api/withAuth";
+import { queueWhatsAppInvoice } from "@/lib/queues/setup";
+
+export const runtime = "nodejs";
+
+/**
+ * Queue a WhatsApp notification for one invoice
+ * POST /api/invoices/:invoiceId/send-whatsapp
+ */
+export async function POST(req: Request, { params }: { params: { invoiceId: string } }) {
+  const handler = withAuth(
+    async () => {
+      try {
+        const job = await queueWhatsAppInvoice(params.invoiceId);
+
+        return NextResponse.json(
+          {
+            success: true,
+            jobId: job.id,
+            statusUrl: `/api/jobs/${encodeURIComponent(job.id)}?queue=whatsapp`,
+            message: "WhatsApp message queued",
+          },
+          { status: 202 }
+        );
+      } catch (error: any) {
+        console.error("Error queuing WhatsApp message:", error);
+        return NextResponse.json(
+          {
+            error: "Failed to queue WhatsApp message",
+            code: "QUEUE_ERROR",
+            details: error.message,
+          },
+          { status: 500 }
+        );
+      }
+    },
+    { allowedRoles: ["admin", "operator"] }
+  );
 
-export async function POST(req: Request) {
-  return NextResponse.json({ success: true, message: "WhatsApp sent" });
+  return handler(req);
 }
@@ -1,12 +1,13 @@
 import { NextResponse } from "next/server";
 import { generateInvoicePdf } from "@/lib/invoicePdf";
 import { z } from "zod";
+import { RATE_LIMIT_COSTS, withRateLimit } from "@/lib/rateLimit";
 
 const generateInvoiceSchema = z.object({
   invoiceId: z.string().min(1),
 });
 
-export async function POST(req: Request) {
+async function handleGenerate(req: Request) {
   try {
     const json = await req.json();
     const parsed = generateInvoiceSchema.safeParse(json);
@@ -31,3 +32,9 @@ export async function POST(req: Request) {
     );
   }
 }
+
+// Synchronous rendering is the most expensive call we serve; prefer
+// /api/invoices/queue, which is charged less against the same budget
+export const POST = withRateLimit("invoicePdf", handleGenerate, {
+  cost: RATE_LIMIT_COSTS.syncPdf,
+});
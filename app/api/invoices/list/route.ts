@@ -0,0 +1,105 @@
+import { NextResponse } from "next/server";
+import { z } from "zod";
+import { withAuth } from "@/lib/api/withAuth";
+import { withQueryValidation } from "@/lib/api/withValidation";
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import {
+  decodeCursor,
+  keysetAfterFilter,
+  pageSizeSchema,
+  toKeysetPage,
+} from "@/lib/pagination";
+
+const listInvoicesSchema = z.object({
+  cursor: z.string().optional(),
+  limit: pageSizeSchema,
+  status: z.enum(["paid", "pending", "overdue", "partially_paid"]).optional(),
+  customerId: z.string().uuid("Invalid customer ID").optional(),
+  q: z.string().trim().max(100).optional(),
+});
+
+type InvoiceListRow = {
+  id: string;
+  invoice_ref: string | null;
+  customer_id: string | null;
+  customer_name: string | null;
+  amount: number | null;
+  status: string | null;
+  due_date: string | null;
+  created_at: string;
+  shipment_count: number | null;
+};
+
+/**
+ * Paginated invoices listing
+ * GET /api/invoices/list?cursor=&limit=&status=&customerId=&q=
+ *
+ * Keyset pagination on (created_at, id) over the invoice_list view, which
+ * carries the customer name and an aggregated shipment count per invoice.
+ */
+export const GET = withAuth(
+  withQueryValidation(listInvoicesSchema, async (_req, data) => {
+    const cursor = decodeCursor(data.cursor);
+    if (data.cursor && !cursor) {
+      return NextResponse.json(
+        { error: "Invalid cursor", code: "VALIDATION_ERROR" },
+        { status: 400 }
+      );
+    }
+
+    try {
+      let query = supabaseAdmin
+        .from("invoice_list")
+        .select(
+          "id, invoice_ref, customer_id, customer_name, amount, status, due_date, created_at, shipment_count"
+        )
+        .order("created_at", { ascending: false })
+        .order("id", { ascending: false })
+        .limit(data.limit + 1);
+
+      if (data.status) {
+        query = query.eq("status", data.status);
+      }
+      if (data.customerId) {
+        query = query.eq("customer_id", data.customerId);
+      }
+      if (data.q) {
+        const term = data.q.toLowerCase().replace(/[%_\\]/g, (ch) => `\\${ch}`);
+        query = query.like("search_text", `%${term}%`);
+      }
+      if (cursor) {
+        query = query.or(keysetAfterFilter(cursor));
+      }
+
+      const { data: rows, error } = await query;
+      if (error) throw error;
+
+      const { items, nextCursor } = toKeysetPage(
+        (rows ?? []) as InvoiceListRow[],
+        data.limit
+      );
+
+      return NextResponse.json({
+        invoices: items.map((row) => ({
+          id: row.id,
+          invoiceRef: row.invoice_ref,
+          customerId: row.customer_id,
+          customerName: row.customer_name ?? "",
+          amount: Number(row.amount ?? 0),
+          status: row.status ?? "pending",
+          dueDate: row.due_date,
+          createdAt: row.created_at,
+          shipments: Number(row.shipment_count ?? 0),
+        })),
+        nextCursor,
+      });
+    } catch (error: any) {
+      console.error("/api/invoices/list error", error);
+      return NextResponse.json(
+        { error: error?.message ?? "Failed to load invoices", code: "INTERNAL_ERROR" },
+        { status: 500 }
+      );
+    }
+  }),
+  { allowedRoles: ["admin", "operator"] }
+);
@@ -2,34 +2,82 @@ import { NextResponse } from "next/server";
 import { z } from "zod";
 import { withAuth } from "@/lib/api/withAuth";
 import { withValidation } from "@/lib/api/withValidation";
-import { withRateLimit } from "@/lib/rateLimit";
-import { queueInvoiceGeneration } from "@/lib/queues/setup";
+import {
+  RATE_LIMIT_COSTS,
+  checkRateLimit,
+  rateLimitExceeded,
+  withRateLimit,
+} from "@/lib/rateLimit";
+import { queueInvoiceGeneration, queueInvoiceGenerations } from "@/lib/queues/setup";
 
-const queueInvoiceSchema = z.object({
-  invoiceId: z.string().uuid("Invalid invoice ID"),
-});
+const queueInvoiceSchema = z.union([
+  z.object({
+    invoiceId: z.string().uuid("Invalid invoice ID"),
+  }),
+  z.object({
+    invoiceIds: z
+      .array(z.string().uuid("Invalid invoice ID"))
+      .min(1, "At least one invoice is required")
+      .max(1000, "At most 1000 invoices per request"),
+  }),
+]);
+
+function jobSummary(job: any) {
+  return {
+    jobId: job.id,
+    statusUrl: `/api/jobs/${encodeURIComponent(job.id)}?queue=invoice`,
+  };
+}
 
 /**
  * Queue invoice PDF generation
  * POST /api/invoices/queue
  * 
  * This endpoint queues the invoice for PDF generation in the background
- * instead of generating it synchronously
+ * instead of generating it synchronously. Poll `statusUrl` for progress.
+ *
+ * `{ invoiceId }` goes to the interactive lane; `{ invoiceIds: [...] }`
+ * (e.g. month-end runs) to the bulk lane, so it never delays the former.
+ * Requests for an unchanged invoice return the job already queued for it.
+ * Bulk requests are additionally charged one `invoicePdfBulk` unit per
+ * invoice; ids with no invoice are returned in `notFound`.
  */
 export const POST = withRateLimit(
-  "api",
+  "invoicePdf",
   withAuth(
     withValidation(queueInvoiceSchema, async (req, data, context) => {
       const { userId, userRole } = context;
-      const { invoiceId } = data;
 
       try {
+        if ("invoiceIds" in data) {
+          const invoiceIds = Array.from(new Set(data.invoiceIds));
+
+          const rateLimit = await checkRateLimit("invoicePdfBulk", `user:${userId}`, {
+            cost: invoiceIds.length,
+            role: userRole,
+          });
+          if (!rateLimit.success) {
+            return rateLimitExceeded(rateLimit);
+          }
+
+          const queued = await queueInvoiceGenerations(invoiceIds);
+          const found = new Set(queued.map(({ invoiceId }) => invoiceId));
+
+          return NextResponse.json({
+            success: true,
+            count: queued.length,
+            jobs: queued.map(({ invoiceId, job }) => ({ invoiceId, ...jobSummary(job) })),
+            notFound: invoiceIds.filter((invoiceId) => !found.has(invoiceId)),
+            message: "Invoice generation queued",
+          });
+        }
+
         // Queue the job
-        const job = await queueInvoiceGeneration(invoiceId);
+        const job = await queueInvoiceGeneration(data.invoiceId);
 
         return NextResponse.json({
           success: true,
-          jobId: job.id,
+          ...jobSummary(job),
           message: "Invoice generation queued",
           estimatedTime: "1-2 minutes",
         });
@@ -47,8 +95,5 @@ export const POST = withRateLimit(
     }),
     { allowedRoles: ["admin", "operator"] }
   ),
-  (req) => {
-    // Use userId as rate limit identifier
-    return req.headers.get("x-user-id") || "anonymous";
-  }
+  { cost: RATE_LIMIT_COSTS.queuedPdf }
 );
@@ -0,0 +1,48 @@
+import { NextResponse } from "next/server";
+import { z } from "zod";
+import { withAuth } from "@/lib/api/withAuth";
+import { withQueryValidation } from "@/lib/api/withValidation";
+import { getJobStatus } from "@/lib/queues/metrics";
+
+const jobStatusSchema = z.object({
+  queue: z.enum(["invoice", "email", "whatsapp", "maintenance"]).default("invoice"),
+});
+
+/**
+ * Background job status
+ * GET /api/jobs/:jobId?queue=invoice|email|whatsapp|maintenance
+ *
+ * Poll with the jobId returned by the queueing endpoint (e.g.
+ * POST /api/invoices/queue) until status is "completed" or "failed".
+ */
+export async function GET(req: Request, { params }: { params: { jobId: string } }) {
+  const handler = withAuth(
+    withQueryValidation(jobStatusSchema, async (_req, data) => {
+      try {
+        const job = await getJobStatus(data.queue, params.jobId);
+
+        if (!job) {
+          return NextResponse.json(
+            { error: "Job not found", code: "NOT_FOUND" },
+            { status: 404 }
+          );
+        }
+
+        return NextResponse.json({ job });
+      } catch (error: any) {
+        console.error("Error loading job status:", error);
+        return NextResponse.json(
+          {
+            error: "Failed to load job status",
+            code: "QUEUE_ERROR",
+            details: error.message,
+          },
+          { status: 500 }
+        );
+      }
+    }),
+    { allowedRoles: ["admin", "operator"] }
+  );
+
+  return handler(req);
+}
@@ -1,9 +1,10 @@
 import { NextResponse } from "next/server";
 import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import { getQueueMetrics } from "@/lib/queues/metrics";
 
 export async function GET() {
   try {
-    const [scansRes, manifestsRes, invoiceLogsRes] = await Promise.all([
+    const [scansRes, manifestsRes, invoiceLogsRes, queues] = await Promise.all([
       supabaseAdmin
         .from("package_scans")
         .select("id, barcode_id, scan_type, location, scanned_at")
@@ -19,6 +20,11 @@ export async function GET() {
         .select("id, invoice_id, status, message, started_at, finished_at, duration_ms")
         .order("started_at", { ascending: false })
         .limit(10),
+      // Metrics are best-effort; a queue outage shouldn't hide the activity feed
+      getQueueMetrics().catch((error) => {
+        console.error("/api/ops/activity queue metrics error", error);
+        return [];
+      }),
     ]);
 
     if (scansRes.error) throw scansRes.error;
@@ -29,6 +35,7 @@ export async function GET() {
       scans: scansRes.data ?? [],
       manifests: manifestsRes.data ?? [],
       invoiceLogs: invoiceLogsRes.data ?? [],
+      queues,
     });
   } catch (err: any) {
     console.error("/api/ops/activity error", err);
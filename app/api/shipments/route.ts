@@ -0,0 +1,119 @@
+import { NextResponse } from "next/server";
+import { z } from "zod";
+import { withAuth } from "@/lib/api/withAuth";
+import { withQueryValidation } from "@/lib/api/withValidation";
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import {
+  decodeCursor,
+  keysetAfterFilter,
+  pageSizeSchema,
+  toKeysetPage,
+} from "@/lib/pagination";
+
+const listShipmentsSchema = z.object({
+  cursor: z.string().optional(),
+  limit: pageSizeSchema,
+  status: z.string().trim().min(1).max(40).optional(),
+  origin: z.string().trim().min(1).max(100).optional(),
+  destination: z.string().trim().min(1).max(100).optional(),
+  customerId: z.string().uuid("Invalid customer ID").optional(),
+  q: z.string().trim().max(100).optional(),
+});
+
+type ShipmentListRow = {
+  id: string;
+  shipment_ref: string;
+  customer_id: string | null;
+  customer_name: string | null;
+  origin: string | null;
+  destination: string | null;
+  weight: number | null;
+  status: string | null;
+  progress: number | null;
+  created_at: string;
+  updated_at: string;
+};
+
+/**
+ * Paginated shipments listing
+ * GET /api/shipments?cursor=&limit=&status=&origin=&destination=&customerId=&q=
+ *
+ * Keyset pagination on (created_at, id). The first page also carries a
+ * planner-based count estimate so the UI never triggers an exact count scan.
+ */
+export const GET = withAuth(
+  withQueryValidation(listShipmentsSchema, async (_req, data) => {
+    const cursor = decodeCursor(data.cursor);
+    if (data.cursor && !cursor) {
+      return NextResponse.json(
+        { error: "Invalid cursor", code: "VALIDATION_ERROR" },
+        { status: 400 }
+      );
+    }
+
+    try {
+      let query = supabaseAdmin
+        .from("shipment_list")
+        .select(
+          "id, shipment_ref, customer_id, customer_name, origin, destination, weight, status, progress, created_at, updated_at",
+          cursor ? undefined : { count: "estimated" }
+        )
+        .order("created_at", { ascending: false })
+        .order("id", { ascending: false })
+        .limit(data.limit + 1);
+
+      if (data.status) {
+        query = query.eq("status", data.status);
+      }
+      if (data.origin) {
+        query = query.eq("origin", data.origin);
+      }
+      if (data.destination) {
+        query = query.eq("destination", data.destination);
+      }
+      if (data.customerId) {
+        query = query.eq("customer_id", data.customerId);
+      }
+      if (data.q) {
+        const term = data.q.toLowerCase().replace(/[%_\\]/g, (ch) => `\\${ch}`);
+        query = query.like("search_text", `%${term}%`);
+      }
+      if (cursor) {
+        query = query.or(keysetAfterFilter(cursor));
+      }
+
+      const { data: rows, error, count } = await query;
+      if (error) throw error;
+
+      const { items, nextCursor } = toKeysetPage(
+        (rows ?? []) as ShipmentListRow[],
+        data.limit
+      );
+
+      return NextResponse.json({
+        shipments: items.map((row) => ({
+          id: row.id,
+          shipmentRef: row.shipment_ref,
+          customerId: row.customer_id,
+          customerName: row.customer_name ?? "",
+          origin: row.origin ?? "",
+          destination: row.destination ?? "",
+          weight: Number(row.weight ?? 0),
+          status: row.status ?? "unknown",
+          progress: Number(row.progress ?? 0),
+          createdAt: row.created_at,
+          updatedAt: row.updated_at,
+        })),
+        nextCursor,
+        totalEstimate: cursor ? null : count ?? null,
+      });
+    } catch (error: any) {
+      console.error("/api/shipments error", error);
+      return NextResponse.json(
+        { error: error?.message ?? "Failed to load shipments", code: "INTERNAL_ERROR" },
+        { status: 500 }
+      );
+    }
+  }),
+  { allowedRoles: ["admin", "operator"] }
+);
@@ -1,6 +1,59 @@
-
 import { NextResponse } from "next/server";
+import { z } from "zod";
+import { withAuth } from "@/lib/api/withAuth";
+import { withValidation } from "@/lib/api/withValidation";
+import { RATE_LIMIT_COSTS, withRateLimit } from "@/lib/rateLimit";
+import { queueWhatsAppInvoices } from "@/lib/queues/setup";
+
+export const runtime = "nodejs";
+
+const triggerWhatsAppSchema = z.object({
+  invoiceIds: z
+    .array(z.string().uuid("Invalid invoice ID"))
+    .min(1, "At least one invoice is required")
+    .max(1000, "At most 1000 invoices per request"),
+});
+
+/**
+ * Queue WhatsApp notifications for a batch of invoices
+ * POST /api/trigger-whatsapp-job
+ *
+ * Returns as soon as the jobs are queued; the worker sends them at the
+ * highest rate the WhatsApp account allows. Poll each job's statusUrl.
+ */
+export const POST = withRateLimit(
+  "api",
+  withAuth(
+    withValidation(triggerWhatsAppSchema, async (_req, data) => {
+      try {
+        const invoiceIds = Array.from(new Set(data.invoiceIds));
+        const jobs = await queueWhatsAppInvoices(invoiceIds);
 
-export async function POST(req: Request) {
-  return NextResponse.json({ success: true, jobId: "mock-job-id" });
-}
+        return NextResponse.json(
+          {
+            success: true,
+            count: jobs.length,
+            jobs: jobs.map((job: any, index: number) => ({
+              invoiceId: invoiceIds[index],
+              jobId: job.id,
+              statusUrl: `/api/jobs/${encodeURIComponent(job.id)}?queue=whatsapp`,
+            })),
+          },
+          { status: 202 }
+        );
+      } catch (error: any) {
+        console.error("Error queuing WhatsApp batch:", error);
+        return NextResponse.json(
+          {
+            error: "Failed to queue WhatsApp messages",
+            code: "QUEUE_ERROR",
+            details: error.message,
+          },
+          { status: 500 }
+        );
+      }
+    }),
+    { allowedRoles: ["admin", "operator"] }
+  ),
+  { cost: RATE_LIMIT_COSTS.bulk }
+);
@@ -1,72 +1,85 @@
 import { NextResponse } from "next/server";
-import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import twilio from "twilio";
+import { appendWebhookEvents } from "@/lib/webhook-inbox";
 
-export async function POST(req: Request) {
-  try {
-    const bodyText = await req.text();
-    const params = new URLSearchParams(bodyText);
+// Twilio message status callback (SMS and WhatsApp)
+// Verifies X-Twilio-Signature, records the event in the webhook inbox and
+// acknowledges; the status is applied to the message logs in the background.
 
-    const messageSid =
-      params.get("MessageSid") || params.get("SmsSid");
+export const runtime = "nodejs";
 
-    if (!messageSid) {
-      return NextResponse.json(
-        { error: "Missing MessageSid" },
-        { status: 400 }
-      );
-    }
+function verifyTwilioSignature(
+  req: Request,
+  params: Record<string, string>
+): boolean {
+  const authToken = process.env.TWILIO_AUTH_TOKEN;
+  if (!authToken) {
+    console.error("TWILIO_AUTH_TOKEN is not configured; rejecting Twilio callback.");
+    return false;
+  }
 
-    const messageStatus =
-      params.get("MessageStatus") || params.get("SmsStatus");
-    const errorCode = params.get("ErrorCode");
-    const errorMessage = params.get("ErrorMessage");
-    const to = params.get("To");
+  const signature = req.headers.get("x-twilio-signature");
+  if (!signature) {
+    console.error("Missing X-Twilio-Signature header on Twilio callback.");
+    return false;
+  }
 
-    const updates: any = {
-      status: messageStatus || "unknown",
-      updated_at: new Date().toISOString(),
-      raw_response: Object.fromEntries(params.entries()),
-    };
+  // Twilio signs the URL it was configured with; behind a proxy req.url may
+  // differ, so allow pinning it
+  const url = process.env.TWILIO_STATUS_CALLBACK_URL || req.url;
 
-    if (errorCode || errorMessage) {
-      const parts: string[] = [];
-      if (errorCode) {
-        parts.push(`Code ${errorCode}`);
-      }
-      if (errorMessage) {
-        parts.push(errorMessage);
-      }
-      updates.error_message = parts.join(": ");
-    }
+  return twilio.validateRequest(authToken, signature, url, params);
+}
 
-    if (to) {
-      updates.to_phone = to;
-    }
+export async function POST(req: Request) {
+  const bodyText = await req.text();
+  const params = Object.fromEntries(new URLSearchParams(bodyText).entries());
 
-    const { error: smsError } = await supabaseAdmin
-      .from("twilio_sms_logs")
-      .update(updates)
-      .eq("provider_message_id", messageSid);
+  if (!verifyTwilioSignature(req, params)) {
+    return NextResponse.json({ error: "Invalid signature" }, { status: 401 });
+  }
 
-    if (smsError) {
-      console.error("twilio_sms_logs update error", smsError.message);
-    }
+  const messageSid = params.MessageSid || params.SmsSid;
 
-    const { error: waError } = await supabaseAdmin
-      .from("whatsapp_logs")
-      .update(updates)
-      .eq("provider_message_id", messageSid);
+  if (!messageSid) {
+    return NextResponse.json(
+      { error: "Missing MessageSid" },
+      { status: 400 }
+    );
+  }
 
-    if (waError) {
-      console.error("whatsapp_logs update error", waError.message);
-    }
+  const messageStatus = params.MessageStatus || params.SmsStatus;
+  const errorCode = params.ErrorCode;
+  const errorMessage = params.ErrorMessage;
 
-    return NextResponse.json({ ok: true });
+  const errorParts: string[] = [];
+  if (errorCode) {
+    errorParts.push(`Code ${errorCode}`);
+  }
+  if (errorMessage) {
+    errorParts.push(errorMessage);
+  }
+
+  try {
+    await appendWebhookEvents([
+      {
+        provider: "twilio",
+        eventType: "status",
+        providerMessageId: messageSid,
+        status: messageStatus || "unknown",
+        errorMessage: errorParts.length > 0 ? errorParts.join(": ") : null,
+        phone: params.To || null,
+        payload: params,
+      },
+    ]);
   } catch (err: any) {
+    // Not recorded: a 5xx makes Twilio retry the callback
     console.error("/api/twilio/status-callback error", err);
     return NextResponse.json(
       { error: err?.message ?? "Unknown error" },
       { status: 500 }
     );
   }
+
+  return NextResponse.json({ ok: true });
 }
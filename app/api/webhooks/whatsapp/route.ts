@@ -1,10 +1,13 @@
 import { NextResponse } from "next/server";
 import { createHmac, timingSafeEqual } from "crypto";
-import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import { appendWebhookEvents, type WebhookEvent } from "@/lib/webhook-inbox";
 
 // WhatsApp Cloud API webhook handler
 // Used as Callback URL in Meta WhatsApp Business configuration.
 // Supports both GET (verification) and POST (event notifications).
+// Events are appended to the webhook inbox and applied in the background.
+
+export const runtime = "nodejs";
 
 function safeCompare(a: string, b: string): boolean {
   const aBuf = Buffer.from(a);
@@ -59,80 +62,82 @@ export async function GET(req: Request) {
   return NextResponse.json({ error: "Forbidden" }, { status: 403 });
 }
 
-export async function POST(req: Request) {
-  try {
-    const rawBody = await req.text();
-
-    const signatureHeader = req.headers.get("x-hub-signature-256");
-    const validSignature = verifyMetaSignature(rawBody, signatureHeader);
-    if (!validSignature) {
-      return NextResponse.json({ error: "Invalid signature" }, { status: 401 });
-    }
+function toIso(unixSeconds: unknown): string | null {
+  const seconds = Number(unixSeconds);
+  return Number.isFinite(seconds) && seconds > 0 ? new Date(seconds * 1000).toISOString() : null;
+}
 
-    let body: any = {};
-    if (rawBody) {
-      try {
-        body = JSON.parse(rawBody);
-      } catch {
-        body = {};
+// One inbox event per status / inbound message in the notification
+function collectEvents(body: any): WebhookEvent[] {
+  const events: WebhookEvent[] = [];
+  const entries = Array.isArray(body?.entry) ? body.entry : [];
+
+  for (const entry of entries) {
+    const changes = Array.isArray(entry?.changes) ? entry.changes : [];
+    for (const change of changes) {
+      const value = change?.value ?? {};
+      const statuses = Array.isArray(value.statuses) ? value.statuses : [];
+      const messages = Array.isArray(value.messages) ? value.messages : [];
+
+      for (const statusItem of statuses) {
+        events.push({
+          provider: "meta",
+          eventType: "status",
+          providerMessageId: (statusItem?.id as string | undefined) ?? null,
+          status: (statusItem?.status as string | undefined) ?? "unknown",
+          errorMessage:
+            Array.isArray(statusItem?.errors) && statusItem.errors[0]
+              ? (statusItem.errors[0].title as string | undefined) ?? null
+              : null,
+          phone: (statusItem?.recipient_id as string | undefined) ?? null,
+          occurredAt: toIso(statusItem?.timestamp),
+          payload: statusItem,
+        });
       }
-    }
 
-    // Best-effort logging of webhook payload to whatsapp_logs for observability.
-    // We may not always be able to associate to a specific invoice, so invoice_id is nullable.
-    const entries = Array.isArray((body as any)?.entry) ? (body as any).entry : [];
-
-    for (const entry of entries) {
-      const changes = Array.isArray(entry?.changes) ? entry.changes : [];
-      for (const change of changes) {
-        const value = change?.value ?? {};
-
-        const contactWaId: string | null =
-          (value.contacts?.[0]?.wa_id as string | undefined) ?? null;
-
-        // Status updates
-        const statusItem = Array.isArray(value.statuses)
-          ? (value.statuses[0] as any | undefined)
-          : undefined;
-
-        const messageItem = Array.isArray(value.messages)
-          ? (value.messages[0] as any | undefined)
-          : undefined;
-
-        const providerMessageId: string | null =
-          (statusItem?.id as string | undefined) ??
-          (messageItem?.id as string | undefined) ??
-          null;
-
-        const status: string =
-          (statusItem?.status as string | undefined) ??
-          (messageItem ? "received" : "unknown");
-
-        const errorMessage: string | null =
-          Array.isArray(statusItem?.errors) && statusItem.errors[0]
-            ? (statusItem.errors[0].title as string | undefined) ?? null
-            : null;
-
-        try {
-          await supabaseAdmin.from("whatsapp_logs").insert({
-            invoice_id: null,
-            phone: contactWaId,
-            mode: "meta_webhook",
-            status,
-            error_message: errorMessage,
-            provider_message_id: providerMessageId,
-            raw_response: body,
-          });
-        } catch {
-          // Do not fail the webhook on logging errors
-        }
+      for (const messageItem of messages) {
+        events.push({
+          provider: "meta",
+          eventType: "message",
+          providerMessageId: (messageItem?.id as string | undefined) ?? null,
+          status: "received",
+          phone: (messageItem?.from as string | undefined) ?? null,
+          occurredAt: toIso(messageItem?.timestamp),
+          payload: messageItem,
+        });
       }
     }
+  }
 
-    // Meta requires a 200 OK quickly; the body can be empty.
-    return NextResponse.json({ success: true });
+  return events;
+}
+
+export async function POST(req: Request) {
+  const rawBody = await req.text();
+
+  const signatureHeader = req.headers.get("x-hub-signature-256");
+  const validSignature = verifyMetaSignature(rawBody, signatureHeader);
+  if (!validSignature) {
+    return NextResponse.json({ error: "Invalid signature" }, { status: 401 });
+  }
+
+  let body: any = {};
+  try {
+    body = rawBody ? JSON.parse(rawBody) : {};
   } catch {
-    // On parse error, still return 200 to avoid repeated retries, but note failure.
-    return NextResponse.json({ success: true }, { status: 200 });
+    // Signed but unparseable: retrying will not help, acknowledge it
+    console.error("Unparseable Meta webhook payload");
+    return NextResponse.json({ success: true });
   }
+
+  try {
+    await appendWebhookEvents(collectEvents(body));
+  } catch (error) {
+    // Not recorded: let Meta retry the delivery
+    console.error("Failed to record Meta webhook events", error);
+    return NextResponse.json({ error: "Temporarily unavailable" }, { status: 503 });
+  }
+
+  // Meta requires a 200 OK quickly; the body can be empty.
+  return NextResponse.json({ success: true });
 }
@@ -2,6 +2,7 @@
 
 import Link from "next/link";
 import { useEffect, useState } from "react";
+import type { PaginationState, SortingState } from "@tanstack/react-table";
 import DashboardPageLayout from "@/components/dashboard/layout";
 import EmailIcon from "@/components/icons/email";
 import { Input } from "@/components/ui/input";
@@ -20,14 +21,35 @@ import { useForm } from "react-hook-form";
 import { zodResolver } from "@hookform/resolvers/zod";
 import { supabase } from "@/lib/supabaseClient";
 import { useToast } from "@/hooks/use-toast";
+import { useDebounce } from "@/hooks/useDebounce";
 import { customerSchema, type CustomerFormValues } from "@/lib/validations";
 import type { UICustomer } from "@/features/customers/types";
 import { CustomersDialog } from "@/features/customers/customers-dialog";
 import { CustomersTable } from "@/features/customers/customers-table";
 
+// Table column id -> customer_directory column used for server-side ordering
+const SORT_COLUMNS: Record<string, string> = {
+  name: "name",
+  shipments: "shipment_count",
+  totalRevenue: "total_revenue",
+  outstandingAmount: "outstanding_amount",
+};
+
+// PostgREST `or` filters use commas and parentheses as delimiters
+const sanitizeSearchTerm = (value: string) => value.replace(/[,()%*\\]/g, " ").trim();
+
 export default function CustomersPage() {
   const [customers, setCustomers] = useState<UICustomer[]>([]);
+  const [totalCount, setTotalCount] = useState(0);
   const [loading, setLoading] = useState(true);
+  const [pagination, setPagination] = useState<PaginationState>({
+    pageIndex: 0,
+    pageSize: 20,
+  });
+  const [sorting, setSorting] = useState<SortingState>([]);
+  const [search, setSearch] = useState("");
+  const debouncedSearch = useDebounce(search, 300);
+  const [reloadKey, setReloadKey] = useState(0);
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const [isCreating, setIsCreating] = useState(false);
   const [userRole, setUserRole] = useState<string | null>(null);
@@ -52,129 +74,61 @@ export default function CustomersPage() {
     async function loadCustomers() {
       setLoading(true);
       try {
-        const { data, error } = await supabase
-          .from("customers")
-          .select("id, name, email, phone, city, created_at");
+        const from = pagination.pageIndex * pagination.pageSize;
+        const to = from + pagination.pageSize - 1;
+        const sort = sorting[0];
+        const sortColumn = (sort && SORT_COLUMNS[sort.id]) || "name";
+
+        // customer_directory joins the trigger-maintained customer_metrics,
+        // so a single paginated query returns the aggregates as well.
+        let query = supabase
+          .from("customer_directory")
+          .select(
+            "id, name, email, phone, city, created_at, shipment_count, total_revenue, outstanding_amount, last_invoice_date",
+            { count: "exact" }
+          )
+          .order(sortColumn, { ascending: sort ? !sort.desc : true })
+          .order("id", { ascending: true })
+          .range(from, to);
+
+        const term = sanitizeSearchTerm(debouncedSearch);
+        if (term) {
+          query = query.or(
+            `name.ilike.%${term}%,email.ilike.%${term}%,phone.ilike.%${term}%`
+          );
+        }
+
+        const { data, error, count } = await query;
 
         if (error) {
           console.warn("Supabase customers error", error.message);
           throw error;
         }
 
-        const baseCustomers: UICustomer[] = ((data as any[]) ?? []).map((row) => ({
+        if (cancelled) return;
+
+        const rows: UICustomer[] = ((data as any[]) ?? []).map((row) => ({
           dbId: row.id,
           id: row.id,
           name: row.name ?? "",
           email: row.email ?? "",
           phone: row.phone ?? "",
-          shipments: 0,
-          totalRevenue: 0,
+          shipments: Number(row.shipment_count ?? 0),
+          totalRevenue: Number(row.total_revenue ?? 0),
           city: row.city ?? "",
           joinDate: row.created_at ?? "",
-          outstandingAmount: 0,
-          lastInvoiceDate: "",
+          outstandingAmount: Number(row.outstanding_amount ?? 0),
+          lastInvoiceDate: row.last_invoice_date ?? "",
         }));
 
-        const customerIds = baseCustomers.map((c) => c.dbId);
-        const shipmentsByCustomer = new Map<string, number>();
-        const billingByCustomer = new Map<
-          string,
-          { totalAmount: number; outstandingAmount: number; lastInvoiceDate: string | null }
-        >();
-
-        if (customerIds.length > 0) {
-          try {
-            const { data: shipmentRows, error: shipmentsError } = await supabase
-              .from("shipments")
-              .select("id, customer_id")
-              .in("customer_id", customerIds);
-
-            if (shipmentsError) {
-              console.warn(
-                "Supabase shipments for customers error, skipping shipment metrics",
-                shipmentsError.message
-              );
-            } else {
-              ((shipmentRows as any[]) ?? []).forEach((row) => {
-                const cid = row.customer_id as string | null;
-                if (!cid) return;
-                const current = shipmentsByCustomer.get(cid) ?? 0;
-                shipmentsByCustomer.set(cid, current + 1);
-              });
-            }
-          } catch (shipErr) {
-            console.warn("Supabase shipments for customers error", shipErr);
-          }
-
-          try {
-            const { data: invoiceRows, error: invoicesError } = await supabase
-              .from("invoices")
-              .select("customer_id, amount, status, invoice_date")
-              .in("customer_id", customerIds);
-
-            if (invoicesError) {
-              console.warn(
-                "Supabase invoices for customers error, skipping billing metrics",
-                invoicesError.message
-              );
-            } else {
-              ((invoiceRows as any[]) ?? []).forEach((row) => {
-                const cid = row.customer_id as string | null;
-                if (!cid) return;
-
-                const amount = Number(row.amount ?? 0);
-                const status = (row.status ?? "pending") as string;
-                const invoiceDate: string | null = row.invoice_date ?? null;
-
-                const current =
-                  billingByCustomer.get(cid) ?? {
-                    totalAmount: 0,
-                    outstandingAmount: 0,
-                    lastInvoiceDate: null as string | null,
-                  };
-
-                const next: { totalAmount: number; outstandingAmount: number; lastInvoiceDate: string | null } = {
-                  totalAmount: current.totalAmount + amount,
-                  outstandingAmount:
-                    current.outstandingAmount +
-                    (status === "pending" || status === "overdue" ? amount : 0),
-                  lastInvoiceDate: current.lastInvoiceDate,
-                };
-
-                if (invoiceDate) {
-                  if (!next.lastInvoiceDate || invoiceDate > next.lastInvoiceDate) {
-                    next.lastInvoiceDate = invoiceDate;
-                  }
-                }
-
-                billingByCustomer.set(cid, next);
-              });
-            }
-          } catch (invErr) {
-            console.warn("Supabase invoices for customers error", invErr);
-          }
-        }
-
-        if (cancelled) return;
-
-        const enriched: UICustomer[] = baseCustomers.map((c) => {
-          const billing = billingByCustomer.get(c.dbId);
-
-          return {
-            ...c,
-            shipments: shipmentsByCustomer.get(c.dbId) ?? 0,
-            totalRevenue: billing?.totalAmount ?? 0,
-            outstandingAmount: billing?.outstandingAmount ?? 0,
-            lastInvoiceDate: billing?.lastInvoiceDate ?? "",
-          };
-        });
-
-        setCustomers(enriched);
+        setCustomers(rows);
+        setTotalCount(count ?? rows.length);
         setLoading(false);
       } catch (err) {
         if (cancelled) return;
         console.error("Failed to load customers from Supabase", err);
         setCustomers([]);
+        setTotalCount(0);
         setLoading(false);
       }
     }
@@ -184,7 +138,12 @@ export default function CustomersPage() {
     return () => {
       cancelled = true;
     };
-  }, []);
+  }, [pagination, sorting, debouncedSearch, reloadKey]);
+
+  // Reset to the first page whenever the search term changes
+  useEffect(() => {
+    setPagination((prev) => (prev.pageIndex === 0 ? prev : { ...prev, pageIndex: 0 }));
+  }, [debouncedSearch]);
 
   useEffect(() => {
     let cancelled = false;
@@ -313,6 +272,7 @@ export default function CustomersPage() {
         };
 
         setCustomers((prev) => [newCustomer, ...prev]);
+        setReloadKey((key) => key + 1);
 
         toast({
           title: "Customer created",
@@ -374,6 +334,7 @@ export default function CustomersPage() {
       }
 
       setCustomers((prev) => prev.filter((c) => c.dbId !== customer.dbId));
+      setReloadKey((key) => key + 1);
 
       toast({
         title: "Customer deleted",
@@ -433,6 +394,13 @@ export default function CustomersPage() {
         <CustomersTable
           loading={loading}
           customers={customers}
+          totalCount={totalCount}
+          pagination={pagination}
+          onPaginationChange={setPagination}
+          sorting={sorting}
+          onSortingChange={setSorting}
+          search={search}
+          onSearchChange={setSearch}
           actionLoading={actionLoading}
           canEdit={canEdit}
           onEditCustomer={(customer) => {
@@ -1,6 +1,6 @@
 "use client";
 
-import { Suspense, useEffect, useMemo, useState, useTransition } from "react";
+import { Suspense, useEffect, useState, useTransition } from "react";
 import { useSearchParams } from "next/navigation";
 import DashboardPageLayout from "@/components/dashboard/layout";
 import EmailIcon from "@/components/icons/email";
@@ -23,6 +23,7 @@ import { zodResolver } from "@hookform/resolvers/zod";
 import { supabase } from "@/lib/supabaseClient";
 import { format } from "date-fns";
 import { useToast } from "@/hooks/use-toast";
+import { useDebounce } from "@/hooks/useDebounce";
 import {
   DropdownMenu,
   DropdownMenuTrigger,
@@ -44,6 +45,8 @@ import { InvoicesTable } from "@/features/invoices/invoices-table";
 import { ManageShipmentsDialog } from "@/features/invoices/manage-shipments-dialog";
 import { InvoiceDialog } from "@/features/invoices/invoice-dialog";
 
+const INVOICE_PAGE_SIZE = 50;
+
 const formatDate = (value: string) => {
   if (!value) return "";
   const date = new Date(value);
@@ -56,14 +59,19 @@ function InvoicesPageContent() {
   const [searchTerm, setSearchTerm] = useState(
     () => searchParams.get("q") || ""
   );
+  const debouncedSearch = useDebounce(searchTerm, 300);
   const [filterStatus, setFilterStatus] = useState<string>("all");
+  const [filterCustomerId, setFilterCustomerId] = useState<string>("all");
   const [invoices, setInvoices] = useState<UIInvoice[]>([]);
+  const [pageCursor, setPageCursor] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [actionLoading, setActionLoading] = useState<Record<string, boolean>>({});
   const [twilioStatuses, setTwilioStatuses] = useState<
     Record<string, { status: string; errorMessage: string | null; createdAt: string }>
   >({});
   const [customers, setCustomers] = useState<{ id: string; name: string }[]>([]);
+  const [customersLoaded, setCustomersLoaded] = useState(false);
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const [isCreating, setIsCreating] = useState(false);
   const [activeInvoice, setActiveInvoice] = useState<UIInvoice | null>(null);
@@ -137,117 +145,48 @@ function InvoicesPageContent() {
     async function loadInvoices() {
       setLoading(true);
       try {
-        // Optimize: Fetch invoices and customers in parallel
-        const [invoicesResult, customersResult] = await Promise.all([
-          supabase
-            .from("invoices")
-            .select("id, invoice_ref, customer_id, amount, status, due_date")
-            .order("created_at", { ascending: false }), // Add consistent ordering
-          supabase
-            .from("customers")
-            .select("id, name")
-        ]);
-
-        const { data: invoiceRows, error: invoiceError } = invoicesResult;
-        const { data: customerRows, error: customersError } = customersResult;
-
-        if (invoiceError) {
-          console.error("Supabase invoices error", invoiceError.message);
-          throw invoiceError;
-        }
+        // Server-side filtering and keyset pagination; the view behind this
+        // endpoint joins customer names and aggregates shipment counts.
+        const params = new URLSearchParams({ limit: String(INVOICE_PAGE_SIZE) });
+        if (filterStatus !== "all") params.set("status", filterStatus);
+        if (filterCustomerId !== "all") params.set("customerId", filterCustomerId);
+        if (debouncedSearch.trim()) params.set("q", debouncedSearch.trim());
+        if (pageCursor) params.set("cursor", pageCursor);
+
+        const res = await fetch(`/api/invoices/list?${params.toString()}`);
+        const json = await res.json();
 
-        const rows = (invoiceRows ?? []) as {
-          id: string;
-          invoice_ref: string | null;
-          customer_id: string | null;
-          amount: number | null;
-          status: string | null;
-          due_date: string | null;
-        }[];
-
-        const customersMap = new Map<string, { id: string; name: string | null }>();
-        const shipmentsByInvoice = new Map<string, number>();
-
-        if (customersError) {
-          console.warn(
-            "Supabase customers for invoices error, skipping customer join",
-            customersError.message
-          );
-        } else {
-          (customerRows ?? []).forEach((c: any) => {
-            customersMap.set(c.id, { id: c.id, name: c.name ?? "" });
-          });
-
-          setCustomers(
-            (customerRows ?? []).map((c: any) => ({
-              id: c.id,
-              name: c.name ?? "",
-            }))
+        if (!res.ok) {
+          throw new Error(
+            typeof json?.error === "string" ? json.error : "Could not load invoices."
           );
         }
 
-        const invoiceIds = rows.map((row) => row.id);
-
-        if (invoiceIds.length > 0) {
-          try {
-            const { data: items, error: itemsError } = await supabase
-              .from("invoice_items")
-              .select("invoice_id, shipment_id")
-              .in("invoice_id", invoiceIds);
-
-            if (itemsError) {
-              console.warn(
-                "Supabase invoice_items error (shipments enrichment)",
-                itemsError.message
-              );
-            } else {
-              const map = new Map<string, Set<string>>();
-              (items ?? []).forEach((item: any) => {
-                const invoiceId = item.invoice_id as string | null;
-                if (!invoiceId) return;
-                const shipmentId = item.shipment_id as string | null;
-                const set = map.get(invoiceId) ?? new Set<string>();
-                if (shipmentId) {
-                  set.add(shipmentId);
-                }
-                map.set(invoiceId, set);
-              });
-
-              map.forEach((set, invoiceId) => {
-                shipmentsByInvoice.set(invoiceId, set.size);
-              });
-            }
-          } catch (itemsErr) {
-            console.warn("Supabase invoice_items error", itemsErr);
-          }
-        }
-
-        const normalized: UIInvoice[] = rows.map((row) => {
-          const customer = row.customer_id
-            ? customersMap.get(row.customer_id)
-            : undefined;
-
-          return {
+        const normalized: UIInvoice[] = ((json?.invoices as any[]) ?? []).map(
+          (row) => ({
             dbId: row.id,
-            id: row.invoice_ref ?? row.id,
-            customerId: row.customer_id ?? null,
-            customerName: customer?.name ?? "",
+            id: row.invoiceRef ?? row.id,
+            customerId: row.customerId ?? null,
+            customerName: row.customerName ?? "",
             amount: Number(row.amount ?? 0),
             status: (row.status ?? "pending") as InvoiceStatus,
-            dueDate: row.due_date ?? "",
-            shipments: shipmentsByInvoice.get(row.id) ?? 0,
-          };
-        });
-
+            dueDate: row.dueDate ?? "",
+            shipments: Number(row.shipments ?? 0),
+          })
+        );
 
         if (cancelled) return;
 
-        setInvoices(normalized);
+        setInvoices((prev) => (pageCursor ? [...prev, ...normalized] : normalized));
+        setNextCursor(typeof json?.nextCursor === "string" ? json.nextCursor : null);
         setLoading(false);
-      } catch {
+      } catch (err) {
         if (cancelled) return;
-        console.error("Failed to load invoices from Supabase");
-        setInvoices([]);
+        console.error("Failed to load invoices", err);
+        if (!pageCursor) {
+          setInvoices([]);
+        }
+        setNextCursor(null);
         setLoading(false);
       }
     }
@@ -257,7 +196,36 @@ function InvoicesPageContent() {
     return () => {
       cancelled = true;
     };
-  }, []);
+  }, [filterStatus, filterCustomerId, debouncedSearch, pageCursor]);
+
+  // Any filter change restarts from the first page
+  useEffect(() => {
+    setPageCursor(null);
+  }, [filterStatus, filterCustomerId, debouncedSearch]);
+
+  // Customers are only needed for the invoice dialog and the customer filter,
+  // so they are fetched on first use rather than with every page load.
+  const ensureCustomersLoaded = async () => {
+    if (customersLoaded) return;
+    setCustomersLoaded(true);
+    const { data, error } = await supabase
+      .from("customers")
+      .select("id, name")
+      .order("name", { ascending: true });
+
+    if (error) {
+      console.warn("Supabase customers for invoices error", error.message);
+      setCustomersLoaded(false);
+      return;
+    }
+
+    setCustomers(
+      ((data as any[]) ?? []).map((c) => ({
+        id: c.id,
+        name: c.name ?? "",
+      }))
+    );
+  };
 
   useEffect(() => {
     let cancelled = false;
@@ -306,19 +274,6 @@ function InvoicesPageContent() {
     };
   }, []);
 
-  const filteredInvoices = useMemo(
-    () =>
-      invoices.filter((invoice) => {
-        const matchesSearch =
-          invoice.id.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          invoice.customerName.toLowerCase().includes(searchTerm.toLowerCase());
-        const matchesStatus =
-          filterStatus === "all" || invoice.status === filterStatus;
-        return matchesSearch && matchesStatus;
-      }),
-    [invoices, searchTerm, filterStatus]
-  );
-
   const canEdit = true; // Force enable for testing
   // const canEdit = userRole === "manager" || userRole === "admin";
 
@@ -388,7 +343,7 @@ function InvoicesPageContent() {
   };
 
   const handleExportInvoicesCsv = () => {
-    if (!filteredInvoices.length) {
+    if (!invoices.length) {
       toast({
         title: "No invoices to export",
         description:
@@ -407,7 +362,7 @@ function InvoicesPageContent() {
       "Shipments",
     ];
 
-    const rows = filteredInvoices.map((inv) => [
+    const rows = invoices.map((inv) => [
       inv.id,
       inv.customerName,
       inv.amount,
@@ -762,8 +717,10 @@ function InvoicesPageContent() {
       }));
 
       toast({
-        title: "WhatsApp message sent",
-        description: `Invoice ${invoice.id} was sent via WhatsApp to ${serverTo}.`,
+        title: json?.queued ? "WhatsApp message queued" : "WhatsApp message sent",
+        description: json?.queued
+          ? `Invoice ${invoice.id} will be sent via WhatsApp to ${serverTo} shortly.`
+          : `Invoice ${invoice.id} was sent via WhatsApp to ${serverTo}.`,
       });
     } catch (error: any) {
       console.error("Failed to send invoice via WhatsApp", error);
@@ -1010,6 +967,28 @@ function InvoicesPageContent() {
               className="bg-input text-foreground"
             />
           </div>
+          <div className="w-full sm:w-auto">
+            <label className="text-sm font-medium mb-2 block">Customer</label>
+            <Select
+              value={filterCustomerId}
+              onValueChange={(value) => setFilterCustomerId(value)}
+              onOpenChange={(open) => {
+                if (open) void ensureCustomersLoaded();
+              }}
+            >
+              <SelectTrigger className="w-full sm:w-[200px]">
+                <SelectValue placeholder="All Customers" />
+              </SelectTrigger>
+              <SelectContent>
+                <SelectItem value="all">All Customers</SelectItem>
+                {customers.map((customer) => (
+                  <SelectItem key={customer.id} value={customer.id}>
+                    {customer.name || customer.id}
+                  </SelectItem>
+                ))}
+              </SelectContent>
+            </Select>
+          </div>
           <div className="w-full sm:w-auto">
             <label className="text-sm font-medium mb-2 block">Status</label>
             <Select
@@ -1035,7 +1014,10 @@ function InvoicesPageContent() {
           )}
           <InvoiceDialog
             open={isDialogOpen}
-            onOpenChange={setIsDialogOpen}
+            onOpenChange={(open) => {
+              if (open) void ensureCustomersLoaded();
+              setIsDialogOpen(open);
+            }}
             canEdit={canEdit}
             isCreating={isCreating}
             editingInvoice={editingInvoice}
@@ -1044,6 +1026,7 @@ function InvoicesPageContent() {
             onSubmit={handleSubmitInvoice}
             onNewInvoiceClick={() => {
               if (!canEdit) return;
+              void ensureCustomersLoaded();
               setEditingInvoice(null);
               form.reset({
                 invoiceRef: "",
@@ -1060,8 +1043,8 @@ function InvoicesPageContent() {
 
         {/* Invoices Table */}
         <InvoicesTable
-          loading={loading}
-          invoices={filteredInvoices}
+          loading={loading && invoices.length === 0}
+          invoices={invoices}
           actionLoading={actionLoading}
           canEdit={canEdit}
           renderSmsStatus={renderSmsStatus}
@@ -1070,6 +1053,7 @@ function InvoicesPageContent() {
           onViewInvoice={handleViewInvoice}
           onDownload={handleDownload}
           onEditInvoice={(invoice) => {
+            void ensureCustomersLoaded();
             setEditingInvoice(invoice);
             form.reset({
               invoiceRef: invoice.id,
@@ -1086,11 +1070,25 @@ function InvoicesPageContent() {
           }}
           onSendSms={handleTwilioSmsSend}
           onDeleteInvoice={handleDeleteInvoice}
-          searchTerm={searchTerm}
-          filterStatus={filterStatus}
+          hasActiveFilters={
+            !!searchTerm || filterStatus !== "all" || filterCustomerId !== "all"
+          }
           formatDate={formatDate}
         />
 
+        {nextCursor && (
+          <div className="flex justify-center">
+            <Button
+              variant="outline"
+              size="sm"
+              disabled={loading}
+              onClick={() => setPageCursor(nextCursor)}
+            >
+              {loading ? "Loading..." : "Load more invoices"}
+            </Button>
+          </div>
+        )}
+
         <ManageShipmentsDialog
           open={!!activeInvoice}
           onOpenChange={(open) => {
@@ -113,8 +113,9 @@ export default function OpsActivityPage() {
             .order("created_at", { ascending: false })
             .limit(50),
           supabase
-            .from("whatsapp_logs")
+            .from("message_logs")
             .select("id, invoice_id, status, error_message, created_at")
+            .eq("channel", "whatsapp")
             .order("created_at", { ascending: false })
             .limit(50),
         ]);
@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useMemo, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
 import { useSearchParams } from "next/navigation";
 import dynamic from "next/dynamic";
 import DashboardPageLayout from "@/components/dashboard/layout";
@@ -16,7 +16,7 @@ import { z } from "zod";
 import { zodResolver } from "@hookform/resolvers/zod";
 import { supabase } from "@/lib/supabaseClient";
 import { useToast } from "@/hooks/use-toast";
-import type { ShipmentRecord } from "@/types/logistics";
+import { useDebounce } from "@/hooks/useDebounce";
 import type { UIShipment } from "@/features/shipments/types";
 import {
   Select,
@@ -85,14 +85,22 @@ const shipmentSchema = z.object({
 
 type ShipmentFormValues = z.infer<typeof shipmentSchema>;
 
+const SHIPMENT_PAGE_SIZE = 100;
+
 function ShipmentsTrackingContent() {
   const searchParams = useSearchParams();
   const [searchTerm, setSearchTerm] = useState(
     () => searchParams.get("q") || ""
   );
+  const debouncedSearch = useDebounce(searchTerm, 300);
   const [statusFilter, setStatusFilter] = useState<string>("all");
+  const [routeFilter, setRouteFilter] = useState<string>("all");
   const [shipments, setShipments] = useState<UIShipment[]>([]);
+  const [totalEstimate, setTotalEstimate] = useState<number | null>(null);
+  const [pageCursor, setPageCursor] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedShipment, setSelectedShipment] = useState<UIShipment | null>(null);
   const [updatingStatus, setUpdatingStatus] = useState(false);
   const [shipmentBarcodes, setShipmentBarcodes] = useState<ShipmentBarcode[]>([]);
@@ -103,6 +111,7 @@ function ShipmentsTrackingContent() {
   const [shipmentTimeline, setShipmentTimeline] = useState<ShipmentScanEvent[]>([]);
   const [shipmentTimelineLoading, setShipmentTimelineLoading] = useState(false);
   const [customers, setCustomers] = useState<{ id: string; name: string }[]>([]);
+  const [customersLoaded, setCustomersLoaded] = useState(false);
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const [isCreating, setIsCreating] = useState(false);
   const [generatingBarcode, setGeneratingBarcode] = useState(false);
@@ -130,76 +139,72 @@ function ShipmentsTrackingContent() {
     let cancelled = false;
 
     async function loadShipments() {
-      setLoading(true);
+      if (pageCursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
 
       try {
-        const { data, error } = await supabase
-          .from("shipments")
-          .select(
-            "id, shipment_ref, origin, destination, weight, status, progress, customer_id"
-          );
-
-        if (error) {
-          console.warn("Supabase shipments error", error.message);
-          throw error;
+        // One keyset page at a time; filters are applied on the server and the
+        // total is a planner estimate rather than an exact count.
+        const params = new URLSearchParams({ limit: String(SHIPMENT_PAGE_SIZE) });
+        if (statusFilter !== "all") params.set("status", statusFilter);
+        if (routeFilter !== "all") {
+          const route = SERVICE_ROUTES[Number(routeFilter)];
+          if (route) {
+            params.set("origin", route.origin);
+            params.set("destination", route.destination);
+          }
         }
+        if (debouncedSearch.trim()) params.set("q", debouncedSearch.trim());
+        if (pageCursor) params.set("cursor", pageCursor);
 
-        const shipmentRows: ShipmentRecord[] = (data as ShipmentRecord[] | null) ?? [];
-
-        const customersMap = new Map<string, { id: string; name: string | null }>();
-        let customerOptions: { id: string; name: string }[] = [];
-
-        try {
-          const { data: customerRows, error: customersError } = await supabase
-            .from("customers")
-            .select("id, name");
-
-          if (customersError) {
-            console.warn(
-              "Supabase customers for shipments error, skipping customer join",
-              customersError.message
-            );
-          } else {
-            (customerRows ?? []).forEach((c: any) => {
-              customersMap.set(c.id, { id: c.id, name: c.name ?? "" });
-            });
-
-            customerOptions = (customerRows ?? []).map((c: any) => ({
-              id: c.id,
-              name: c.name ?? "",
-            }));
-          }
-        } catch (customersErr) {
-          console.warn("Supabase customers for shipments error", customersErr);
+        const res = await fetch(`/api/shipments?${params.toString()}`);
+        const json = await res.json();
+
+        if (!res.ok) {
+          throw new Error(
+            typeof json?.error === "string" ? json.error : "Could not load shipments."
+          );
         }
 
-        const normalized: UIShipment[] = shipmentRows.map((s) => {
-          const customer = s.customer_id ? customersMap.get(s.customer_id) : undefined;
-
-          return {
-            dbId: s.id,
-            shipmentId: s.shipment_ref,
-            customerId: (s as any).customer_id ?? null,
-            customer: customer?.name ?? "",
-            origin: s.origin ?? "",
-            destination: s.destination ?? "",
-            weight: Number(s.weight ?? 0),
-            status: s.status ?? "unknown",
-            progress: s.progress ?? 0,
-          };
-        });
+        const normalized: UIShipment[] = ((json?.shipments as any[]) ?? []).map(
+          (row) => ({
+            dbId: row.id,
+            shipmentId: row.shipmentRef,
+            customerId: row.customerId ?? null,
+            customer: row.customerName ?? "",
+            origin: row.origin ?? "",
+            destination: row.destination ?? "",
+            weight: Number(row.weight ?? 0),
+            status: row.status ?? "unknown",
+            progress: Number(row.progress ?? 0),
+          })
+        );
 
         if (cancelled) return;
 
-        setShipments(normalized);
-        setCustomers(customerOptions);
-        setLoading(false);
+        setShipments((prev) => (pageCursor ? [...prev, ...normalized] : normalized));
+        setNextCursor(typeof json?.nextCursor === "string" ? json.nextCursor : null);
+        if (!pageCursor) {
+          setTotalEstimate(
+            typeof json?.totalEstimate === "number" ? json.totalEstimate : null
+          );
+        }
       } catch (err) {
         if (cancelled) return;
-        console.error("Failed to load shipments from Supabase", err);
-        setShipments([]);
-        setCustomers([]);
-        setLoading(false);
+        console.error("Failed to load shipments", err);
+        if (!pageCursor) {
+          setShipments([]);
+          setTotalEstimate(null);
+        }
+        setNextCursor(null);
+      } finally {
+        if (!cancelled) {
+          setLoading(false);
+          setLoadingMore(false);
+        }
       }
     }
 
@@ -208,7 +213,41 @@ function ShipmentsTrackingContent() {
     return () => {
       cancelled = true;
     };
-  }, []);
+  }, [statusFilter, routeFilter, debouncedSearch, pageCursor]);
+
+  // Any filter change restarts from the first page
+  useEffect(() => {
+    setPageCursor(null);
+  }, [statusFilter, routeFilter, debouncedSearch]);
+
+  const handleLoadMore = useCallback(() => {
+    if (!nextCursor || loading || loadingMore) return;
+    setPageCursor(nextCursor);
+  }, [nextCursor, loading, loadingMore]);
+
+  // Customers are only needed by the shipment dialog, so they are fetched on
+  // first use rather than with every page load.
+  const ensureCustomersLoaded = async () => {
+    if (customersLoaded) return;
+    setCustomersLoaded(true);
+    const { data, error } = await supabase
+      .from("customers")
+      .select("id, name")
+      .order("name", { ascending: true });
+
+    if (error) {
+      console.warn("Supabase customers for shipments error", error.message);
+      setCustomersLoaded(false);
+      return;
+    }
+
+    setCustomers(
+      ((data as any[]) ?? []).map((c) => ({
+        id: c.id,
+        name: c.name ?? "",
+      }))
+    );
+  };
 
   useEffect(() => {
     let cancelled = false;
@@ -257,23 +296,6 @@ function ShipmentsTrackingContent() {
     };
   }, []);
 
-  const statuses = useMemo(
-    () => Array.from(new Set(shipments.map((s) => s.status))),
-    [shipments]
-  );
-
-  const filteredShipments = useMemo(
-    () =>
-      shipments.filter((shipment) => {
-        const matchesSearch =
-          shipment.shipmentId.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          shipment.customer.toLowerCase().includes(searchTerm.toLowerCase());
-        const matchesStatus = statusFilter === "all" || shipment.status === statusFilter;
-        return matchesSearch && matchesStatus;
-      }),
-    [shipments, searchTerm, statusFilter]
-  );
-
   useEffect(() => {
     if (loading) {
       return;
@@ -287,9 +309,9 @@ function ShipmentsTrackingContent() {
 
     const contextPayload = {
       type: "shipments",
-      total: shipments.length,
+      total: totalEstimate ?? shipments.length,
       statusCounts,
-      sampleShipments: filteredShipments.slice(0, 10).map((s) => ({
+      sampleShipments: shipments.slice(0, 10).map((s) => ({
         id: s.dbId,
         shipmentId: s.shipmentId,
         customer: s.customer,
@@ -306,7 +328,7 @@ function ShipmentsTrackingContent() {
     return () => {
       setModuleContext(null);
     };
-  }, [loading, shipments, filteredShipments, setModuleContext]);
+  }, [loading, shipments, totalEstimate, setModuleContext]);
 
   // Realtime subscription for shipment updates
   useEffect(() => {
@@ -862,7 +884,7 @@ function ShipmentsTrackingContent() {
         <div className="space-y-6">
           {/* Filters & New Shipment */}
           <div className="space-y-3">
-            <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
+            <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
               <Input
                 placeholder="Search shipment ID or customer..."
                 value={searchTerm}
@@ -877,13 +899,29 @@ function ShipmentsTrackingContent() {
                 </SelectTrigger>
                 <SelectContent>
                   <SelectItem value="all">All Status</SelectItem>
-                  {statuses.map((status) => (
+                  {SHIPMENT_STATUSES.map((status) => (
                     <SelectItem key={status} value={status}>
                       {status.charAt(0).toUpperCase() + status.slice(1)}
                     </SelectItem>
                   ))}
                 </SelectContent>
               </Select>
+              <Select
+                value={routeFilter}
+                onValueChange={(value) => setRouteFilter(value)}
+              >
+                <SelectTrigger className="w-full">
+                  <SelectValue placeholder="All Routes" />
+                </SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="all">All Routes</SelectItem>
+                  {SERVICE_ROUTES.map((route, index) => (
+                    <SelectItem key={route.label} value={String(index)}>
+                      {route.label}
+                    </SelectItem>
+                  ))}
+                </SelectContent>
+              </Select>
             </div>
 
             {roleLoaded && !canEdit && (
@@ -895,7 +933,10 @@ function ShipmentsTrackingContent() {
             <div className="flex justify-end">
               <ShipmentsDialog
                 open={isDialogOpen}
-                onOpenChange={setIsDialogOpen}
+                onOpenChange={(open) => {
+                  if (open) void ensureCustomersLoaded();
+                  setIsDialogOpen(open);
+                }}
                 canEdit={canEdit}
                 isCreating={isCreating}
                 editingShipment={editingShipment}
@@ -904,6 +945,7 @@ function ShipmentsTrackingContent() {
                 onSubmit={handleSubmitShipment as any}
                 onNewShipmentClick={() => {
                   if (!canEdit) return;
+                  void ensureCustomersLoaded();
                   setEditingShipment(null);
                   form.reset({
                     shipmentRef: "",
@@ -922,13 +964,17 @@ function ShipmentsTrackingContent() {
 
           {/* Shipments Table */}
           <ShipmentsTable
-            loading={loading}
-            shipments={filteredShipments}
+            loading={loading && shipments.length === 0}
+            shipments={shipments}
+            totalEstimate={totalEstimate}
+            loadingMore={loadingMore}
+            onLoadMore={handleLoadMore}
             actionLoading={actionLoading}
             canEdit={canEdit}
             getStatusColor={getStatusColor}
             onRowClick={handleRowClick}
             onEditShipment={(shipment) => {
+              void ensureCustomersLoaded();
               setEditingShipment(shipment);
               const routeIndex = SERVICE_ROUTES.findIndex(
                 (r) =>
@@ -948,8 +994,9 @@ function ShipmentsTrackingContent() {
             onDeleteShipment={(shipment) => {
               void handleDeleteShipment(shipment);
             }}
-            searchTerm={searchTerm}
-            statusFilter={statusFilter}
+            hasActiveFilters={
+              !!searchTerm || statusFilter !== "all" || routeFilter !== "all"
+            }
           />
       </div>
 
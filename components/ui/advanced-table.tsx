@@ -4,6 +4,8 @@ import * as React from "react";
 import {
   ColumnDef,
   ColumnFiltersState,
+  OnChangeFn,
+  PaginationState,
   SortingState,
   VisibilityState,
   flexRender,
@@ -49,6 +51,19 @@ interface DataTableProps<TData, TValue> {
   enableFilters?: boolean;
   enablePagination?: boolean;
   pageSize?: number;
+  /**
+   * Server-side mode: rows in `data` are already the current page, sorted and
+   * filtered by the caller. Sorting, pagination and search state are
+   * controlled through the props below.
+   */
+  serverSide?: boolean;
+  rowCount?: number;
+  sorting?: SortingState;
+  onSortingChange?: OnChangeFn<SortingState>;
+  pagination?: PaginationState;
+  onPaginationChange?: OnChangeFn<PaginationState>;
+  searchValue?: string;
+  onSearchChange?: (value: string) => void;
 }
 
 export function AdvancedDataTable<TData, TValue>({
@@ -61,8 +76,22 @@ export function AdvancedDataTable<TData, TValue>({
   enableFilters = true,
   enablePagination = true,
   pageSize = 10,
+  serverSide = false,
+  rowCount,
+  sorting: controlledSorting,
+  onSortingChange,
+  pagination: controlledPagination,
+  onPaginationChange,
+  searchValue,
+  onSearchChange,
 }: DataTableProps<TData, TValue>) {
-  const [sorting, setSorting] = React.useState<SortingState>([]);
+  const [localSorting, setLocalSorting] = React.useState<SortingState>([]);
+  const [localPagination, setLocalPagination] = React.useState<PaginationState>({
+    pageIndex: 0,
+    pageSize,
+  });
+  const sorting = controlledSorting ?? localSorting;
+  const pagination = controlledPagination ?? localPagination;
   const [columnFilters, setColumnFilters] = React.useState<ColumnFiltersState>([]);
   const [columnVisibility, setColumnVisibility] = React.useState<VisibilityState>({});
   const [rowSelection, setRowSelection] = React.useState({});
@@ -70,12 +99,18 @@ export function AdvancedDataTable<TData, TValue>({
   const table = useReactTable({
     data,
     columns,
-    onSortingChange: setSorting,
+    onSortingChange: onSortingChange ?? setLocalSorting,
+    onPaginationChange: onPaginationChange ?? setLocalPagination,
     onColumnFiltersChange: setColumnFilters,
     getCoreRowModel: getCoreRowModel(),
-    getPaginationRowModel: enablePagination ? getPaginationRowModel() : undefined,
-    getSortedRowModel: getSortedRowModel(),
-    getFilteredRowModel: getFilteredRowModel(),
+    getPaginationRowModel:
+      enablePagination && !serverSide ? getPaginationRowModel() : undefined,
+    getSortedRowModel: serverSide ? undefined : getSortedRowModel(),
+    getFilteredRowModel: serverSide ? undefined : getFilteredRowModel(),
+    manualPagination: serverSide,
+    manualSorting: serverSide,
+    manualFiltering: serverSide,
+    rowCount: serverSide ? rowCount ?? data.length : undefined,
     onColumnVisibilityChange: setColumnVisibility,
     onRowSelectionChange: setRowSelection,
     state: {
@@ -83,11 +118,7 @@ export function AdvancedDataTable<TData, TValue>({
       columnFilters,
       columnVisibility,
       rowSelection,
-    },
-    initialState: {
-      pagination: {
-        pageSize,
-      },
+      ...(enablePagination ? { pagination } : {}),
     },
   });
 
@@ -126,10 +157,14 @@ export function AdvancedDataTable<TData, TValue>({
               <Input
                 placeholder={searchPlaceholder}
                 value={
-                  (table.getColumn(searchKey)?.getFilterValue() as string) ?? ""
+                  serverSide
+                    ? searchValue ?? ""
+                    : (table.getColumn(searchKey)?.getFilterValue() as string) ?? ""
                 }
                 onChange={(event) =>
-                  table.getColumn(searchKey)?.setFilterValue(event.target.value)
+                  serverSide
+                    ? onSearchChange?.(event.target.value)
+                    : table.getColumn(searchKey)?.setFilterValue(event.target.value)
                 }
                 className="pl-9"
               />
@@ -246,7 +281,10 @@ export function AdvancedDataTable<TData, TValue>({
                 {table.getFilteredSelectedRowModel().rows.length} of{" "}
               </span>
             )}
-            {table.getFilteredRowModel().rows.length} row(s) total
+            {serverSide
+              ? rowCount ?? data.length
+              : table.getFilteredRowModel().rows.length}{" "}
+            row(s) total
           </div>
           <div className="flex items-center space-x-6 lg:space-x-8">
             <div className="flex items-center space-x-2">
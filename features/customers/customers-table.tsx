@@ -2,7 +2,12 @@
 
 import * as React from "react";
 import Link from "next/link";
-import type { ColumnDef } from "@tanstack/react-table";
+import type {
+  ColumnDef,
+  OnChangeFn,
+  PaginationState,
+  SortingState,
+} from "@tanstack/react-table";
 import { Card } from "@/components/ui/card";
 import { Skeleton } from "@/components/ui/skeleton";
 import { Button } from "@/components/ui/button";
@@ -21,6 +26,13 @@ import type { UICustomer } from "@/features/customers/types";
 interface CustomersTableProps {
   loading: boolean;
   customers: UICustomer[];
+  totalCount: number;
+  pagination: PaginationState;
+  onPaginationChange: OnChangeFn<PaginationState>;
+  sorting: SortingState;
+  onSortingChange: OnChangeFn<SortingState>;
+  search: string;
+  onSearchChange: (value: string) => void;
   actionLoading: Record<string, boolean>;
   canEdit: boolean;
   onEditCustomer: (customer: UICustomer) => void;
@@ -30,6 +42,13 @@ interface CustomersTableProps {
 export function CustomersTable({
   loading,
   customers,
+  totalCount,
+  pagination,
+  onPaginationChange,
+  sorting,
+  onSortingChange,
+  search,
+  onSearchChange,
   actionLoading,
   canEdit,
   onEditCustomer,
@@ -42,16 +61,6 @@ export function CustomersTable({
         header: ({ column }) => (
           <SortableHeader column={column} title="Customer" />
         ),
-        filterFn: (row, _columnId, filterValue) => {
-          const query = (filterValue ?? "").toString().toLowerCase().trim();
-          if (!query) return true;
-          const customer = row.original as UICustomer;
-          return (
-            customer.name.toLowerCase().includes(query) ||
-            customer.email.toLowerCase().includes(query) ||
-            customer.id.toLowerCase().includes(query)
-          );
-        },
         cell: ({ row }) => {
           const customer = row.original;
           return (
@@ -66,6 +75,7 @@ export function CustomersTable({
       {
         accessorKey: "email",
         header: "Email",
+        enableSorting: false,
         cell: ({ row }) => {
           const email = row.original.email;
           return (
@@ -78,6 +88,7 @@ export function CustomersTable({
       {
         accessorKey: "phone",
         header: "Phone",
+        enableSorting: false,
         cell: ({ row }) => {
           const phone = row.original.phone;
           return (
@@ -90,6 +101,7 @@ export function CustomersTable({
       {
         accessorKey: "city",
         header: "City",
+        enableSorting: false,
         cell: ({ row }) => {
           const city = row.original.city;
           return (
@@ -140,6 +152,7 @@ export function CustomersTable({
       {
         accessorKey: "lastInvoiceDate",
         header: "Last invoice",
+        enableSorting: false,
         cell: ({ row }) => {
           const value = row.original.lastInvoiceDate;
           if (!value) {
@@ -213,7 +226,9 @@ export function CustomersTable({
     [actionLoading, canEdit, onEditCustomer, onDeleteCustomer]
   );
 
-  if (loading) {
+  // Only the first load shows the skeleton; later page, sort and search
+  // fetches keep the table (and its search input) mounted.
+  if (loading && customers.length === 0 && !search) {
     return (
       <Card className="border-border/60 bg-background/80">
         <div className="overflow-x-auto">
@@ -271,7 +286,7 @@ export function CustomersTable({
     );
   }
 
-  if (customers.length === 0) {
+  if (!loading && totalCount === 0 && !search) {
     return (
       <Card className="border-border/60 bg-background/80">
         <EmptyState variant="customers" />
@@ -284,11 +299,18 @@ export function CustomersTable({
       columns={columns}
       data={customers}
       searchKey="name"
-      searchPlaceholder="Search name, email, or ID..."
+      searchPlaceholder="Search name, email, or phone..."
       enableExport
       enableFilters
       enablePagination
-      pageSize={20}
+      serverSide
+      rowCount={totalCount}
+      pagination={pagination}
+      onPaginationChange={onPaginationChange}
+      sorting={sorting}
+      onSortingChange={onSortingChange}
+      searchValue={search}
+      onSearchChange={onSearchChange}
     />
   );
 }
@@ -29,8 +29,7 @@ interface InvoicesTableProps {
   onEditInvoice: (invoice: UIInvoice) => void;
   onSendSms: (invoice: UIInvoice) => void;
   onDeleteInvoice: (invoice: UIInvoice) => void;
-  searchTerm: string;
-  filterStatus: string;
+  hasActiveFilters: boolean;
   formatDate: (value: string) => string;
 }
 
@@ -47,8 +46,7 @@ export function InvoicesTable({
   onEditInvoice,
   onSendSms,
   onDeleteInvoice,
-  searchTerm,
-  filterStatus,
+  hasActiveFilters,
   formatDate,
 }: InvoicesTableProps) {
   return (
@@ -187,12 +185,12 @@ export function InvoicesTable({
           <EmptyState
             variant="invoices"
             title={
-              searchTerm || filterStatus !== "all"
+              hasActiveFilters
                 ? "No matching invoices"
                 : "No invoices yet"
             }
             description={
-              searchTerm || filterStatus !== "all"
+              hasActiveFilters
                 ? "Try adjusting your search or filter criteria."
                 : "Create your first invoice to start tracking payments."
             }
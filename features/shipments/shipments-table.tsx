@@ -5,46 +5,71 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Skeleton } from "@/components/ui/skeleton";
 import { EmptyState } from "@/components/ui/empty-state";
 import { Button } from "@/components/ui/button";
+import { useWindowedRows } from "@/hooks/useWindowedRows";
 import type { UIShipment } from "@/features/shipments/types";
 
+// Rows have a fixed height so the visible window can be computed from scrollTop
+const ROW_HEIGHT = 56;
+
 interface ShipmentsTableProps {
   loading: boolean;
   shipments: UIShipment[];
+  totalEstimate: number | null;
+  loadingMore: boolean;
+  onLoadMore: () => void;
   actionLoading: Record<string, boolean>;
   canEdit: boolean;
   getStatusColor: (status: string) => string;
   onRowClick: (shipment: UIShipment) => void;
   onEditShipment: (shipment: UIShipment) => void;
   onDeleteShipment: (shipment: UIShipment) => void;
-  searchTerm: string;
-  statusFilter: string;
+  hasActiveFilters: boolean;
 }
 
 export function ShipmentsTable({
   loading,
   shipments,
+  totalEstimate,
+  loadingMore,
+  onLoadMore,
   actionLoading,
   canEdit,
   getStatusColor,
   onRowClick,
   onEditShipment,
   onDeleteShipment,
-  searchTerm,
-  statusFilter,
+  hasActiveFilters,
 }: ShipmentsTableProps) {
+  const { containerRef, onScroll, start, end, paddingTop, paddingBottom } =
+    useWindowedRows({
+      rowCount: shipments.length,
+      rowHeight: ROW_HEIGHT,
+      onEndReached: onLoadMore,
+    });
+
+  const visibleShipments = shipments.slice(start, end);
+
   return (
     <Card>
       <CardHeader className="px-4 sm:px-6">
         <CardTitle className="text-base sm:text-lg">
           {loading
             ? "Loading shipments..."
-            : `Active Shipments (${shipments.length})`}
+            : `Active Shipments (${
+                totalEstimate !== null && totalEstimate > shipments.length
+                  ? `~${totalEstimate.toLocaleString("en-IN")}`
+                  : shipments.length
+              })`}
         </CardTitle>
       </CardHeader>
       <CardContent className="px-0 sm:px-6">
-        <div className="overflow-x-auto">
+        <div
+          ref={containerRef}
+          onScroll={onScroll}
+          className="overflow-auto max-h-[70vh]"
+        >
           <table className="w-full text-sm min-w-[800px]">
-            <thead>
+            <thead className="sticky top-0 z-10 bg-card">
               <tr className="border-b border-border">
                 <th className="text-left py-2 px-2 font-semibold">Shipment ID</th>
                 <th className="text-left py-2 px-2 font-semibold">Customer</th>
@@ -95,11 +120,15 @@ export function ShipmentsTable({
                   ))}
                 </>
               )}
+              {!loading && paddingTop > 0 && (
+                <tr aria-hidden style={{ height: paddingTop }} />
+              )}
               {!loading &&
-                shipments.map((shipment) => (
+                visibleShipments.map((shipment) => (
                   <tr
-                    key={shipment.shipmentId}
+                    key={shipment.dbId}
                     className="border-b border-border hover:bg-muted/50 cursor-pointer"
+                    style={{ height: ROW_HEIGHT }}
                     onClick={() => onRowClick(shipment)}
                   >
                     <td className="py-3 px-2 font-mono text-xs">
@@ -155,18 +184,26 @@ export function ShipmentsTable({
                     </td>
                   </tr>
                 ))}
+              {!loading && paddingBottom > 0 && (
+                <tr aria-hidden style={{ height: paddingBottom }} />
+              )}
             </tbody>
           </table>
+          {loadingMore && (
+            <p className="py-3 text-center text-xs text-muted-foreground">
+              Loading more shipments...
+            </p>
+          )}
           {!loading && shipments.length === 0 && (
             <EmptyState
               variant="shipments"
               title={
-                searchTerm || statusFilter !== "all"
+                hasActiveFilters
                   ? "No matching shipments"
                   : "No shipments yet"
               }
               description={
-                searchTerm || statusFilter !== "all"
+                hasActiveFilters
                   ? "Try adjusting your search or filter criteria."
                   : "Create your first shipment to get started."
               }
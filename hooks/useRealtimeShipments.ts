@@ -14,17 +14,31 @@ export function useRealtimeShipments() {
     // Initial fetch
     const fetchShipments = async () => {
       try {
-        const { data, error: fetchError } = await supabase
-          .from("shipments")
-          .select("*")
-          .order("created_at", { ascending: false })
-          .limit(100);
+        // Share the paginated listing endpoint used by the shipments page
+        // instead of running a separate unbounded query.
+        const res = await fetch("/api/shipments?limit=100");
+        const json = await res.json();
 
-        if (fetchError) throw fetchError;
-
-        if (data) {
-          setShipments(data);
+        if (!res.ok) {
+          throw new Error(
+            typeof json?.error === "string" ? json.error : "Failed to fetch shipments"
+          );
         }
+
+        setShipments(
+          ((json?.shipments as any[]) ?? []).map((row) => ({
+            id: row.id,
+            shipment_ref: row.shipmentRef,
+            customer_id: row.customerId ?? null,
+            origin: row.origin ?? null,
+            destination: row.destination ?? null,
+            weight: row.weight ?? null,
+            status: row.status ?? null,
+            progress: row.progress ?? null,
+            created_at: row.createdAt,
+            updated_at: row.updatedAt,
+          }))
+        );
       } catch (err) {
         console.error("Error fetching shipments:", err);
         setError(err instanceof Error ? err : new Error("Failed to fetch shipments"));
@@ -0,0 +1,66 @@
+import { useCallback, useEffect, useRef, useState, type UIEvent } from "react";
+
+interface WindowedRowsOptions {
+  rowCount: number;
+  rowHeight: number;
+  overscan?: number;
+  onEndReached?: () => void;
+  endReachedThreshold?: number;
+}
+
+/**
+ * Window a fixed-height row list inside a scroll container
+ * Only rows intersecting the viewport (plus overscan) are rendered, so DOM
+ * size stays constant no matter how many rows are loaded.
+ *
+ * @example
+ * const { containerRef, onScroll, start, end, paddingTop, paddingBottom } =
+ *   useWindowedRows({ rowCount: rows.length, rowHeight: 56 });
+ */
+export function useWindowedRows({
+  rowCount,
+  rowHeight,
+  overscan = 8,
+  onEndReached,
+  endReachedThreshold = 10,
+}: WindowedRowsOptions) {
+  const containerRef = useRef<HTMLDivElement | null>(null);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [viewportHeight, setViewportHeight] = useState(0);
+
+  useEffect(() => {
+    const el = containerRef.current;
+    if (!el) return;
+
+    setViewportHeight(el.clientHeight);
+
+    if (typeof ResizeObserver === "undefined") return;
+    const observer = new ResizeObserver(() => setViewportHeight(el.clientHeight));
+    observer.observe(el);
+    return () => observer.disconnect();
+  }, []);
+
+  const onScroll = useCallback((event: UIEvent<HTMLDivElement>) => {
+    setScrollTop(event.currentTarget.scrollTop);
+  }, []);
+
+  const visibleCount = Math.ceil(viewportHeight / rowHeight);
+  const start = Math.max(0, Math.floor(scrollTop / rowHeight) - overscan);
+  const end = Math.min(rowCount, start + visibleCount + overscan * 2);
+
+  useEffect(() => {
+    if (!onEndReached || rowCount === 0) return;
+    if (end >= rowCount - endReachedThreshold) {
+      onEndReached();
+    }
+  }, [end, rowCount, endReachedThreshold, onEndReached]);
+
+  return {
+    containerRef,
+    onScroll,
+    start,
+    end,
+    paddingTop: start * rowHeight,
+    paddingBottom: Math.max(0, (rowCount - end) * rowHeight),
+  };
+}
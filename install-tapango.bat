@@ -31,12 +31,11 @@ echo.
 echo The following packages are optional but recommended:
 echo.
 echo   - bullmq ioredis         (Background job queue)
-echo   - @upstash/ratelimit     (Rate limiting)
-echo   - @upstash/redis         (Redis client)
+echo   - @upstash/redis         (Rate limit sync)
 echo   - twilio                 (WhatsApp notifications)
 echo.
 echo To install optional packages, run:
-echo   npm install bullmq ioredis @upstash/ratelimit @upstash/redis twilio
+echo   npm install bullmq ioredis @upstash/redis twilio
 echo.
 
 echo ==============================================================
@@ -1,4 +1,5 @@
 import type { UserRole } from "@/types/auth";
+import { compileRouteMatcher } from "@/lib/route-matcher";
 
 export type AppRole = UserRole;
 
@@ -43,7 +44,11 @@ export function hasRoleAtLeast(userRole: string | null | undefined, required: Ap
   return userIndex >= requiredIndex;
 }
 
+// Patterns are plain prefixes: /reports also guards /reports-analytics
+const protectedRouteMatcher = compileRouteMatcher(
+  PROTECTED_ROUTES.map((rule) => ({ path: rule.pattern, value: rule, match: "prefix" as const }))
+);
+
 export function matchProtectedRoute(pathname: string): RouteAccessRule | null {
-  const match = PROTECTED_ROUTES.find((rule) => pathname.startsWith(rule.pattern));
-  return match ?? null;
+  return protectedRouteMatcher(pathname);
 }
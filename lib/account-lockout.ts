@@ -3,12 +3,53 @@ import { supabaseAdmin } from "@/lib/supabaseAdmin";
 const LOCKOUT_THRESHOLD = 5;
 const LOCKOUT_DURATION_MINUTES = 30;
 
+// Failed logins arriving within this window are written in one RPC call
+const FLUSH_DELAY_MS = 250;
+// How long an "not locked" answer from the DB is trusted
+const UNLOCKED_CACHE_TTL_MS = 5_000;
+const MAX_CACHED_ACCOUNTS = 10_000;
+
 type LockoutRow = {
   email_hash: string;
   login_failed_count: number | null;
   locked_until: string | null;
 };
 
+/**
+ * Per-instance lockout state
+ * Lock decisions are cached until `lockedUntil`; counters are incremented in
+ * memory and persisted through the atomic record_failed_logins RPC, so a
+ * credential-stuffing burst costs one DB round trip per flush, not two per
+ * attempt.
+ */
+interface LockoutState {
+  failedCount: number;
+  lockedUntil: number | null;
+  checkedAt: number;
+}
+
+const lockoutCache = new Map<string, LockoutState>();
+const pendingFailures = new Map<string, number>();
+let pendingFlush: Promise<void> | null = null;
+
+function cacheState(emailHash: string, state: LockoutState) {
+  lockoutCache.delete(emailHash);
+  lockoutCache.set(emailHash, state);
+
+  if (lockoutCache.size > MAX_CACHED_ACCOUNTS) {
+    const oldest = lockoutCache.keys().next().value;
+    if (oldest !== undefined) lockoutCache.delete(oldest);
+  }
+}
+
+function stateFromRow(row: LockoutRow | null, now: number): LockoutState {
+  return {
+    failedCount: row?.login_failed_count ?? 0,
+    lockedUntil: row?.locked_until ? new Date(row.locked_until).getTime() : null,
+    checkedAt: now,
+  };
+}
+
 async function getLockoutRow(emailHash: string): Promise<LockoutRow | null> {
   try {
     const { data, error } = await supabaseAdmin
@@ -28,60 +69,108 @@ async function getLockoutRow(emailHash: string): Promise<LockoutRow | null> {
 }
 
 export async function isAccountLocked(emailHash: string): Promise<boolean> {
+  const now = Date.now();
+  const cached = lockoutCache.get(emailHash);
+
+  if (cached?.lockedUntil && cached.lockedUntil > now) return true;
+  if (cached && now - cached.checkedAt < UNLOCKED_CACHE_TTL_MS) return false;
+
   const row = await getLockoutRow(emailHash);
-  if (!row || !row.locked_until) return false;
-  const now = new Date();
-  const lockedUntil = new Date(row.locked_until);
-  return lockedUntil.getTime() > now.getTime();
+  const state = stateFromRow(row, now);
+  state.failedCount += pendingFailures.get(emailHash) ?? 0;
+  cacheState(emailHash, state);
+
+  return state.lockedUntil !== null && state.lockedUntil > now;
 }
 
-export async function registerFailedLogin(emailHash: string): Promise<void> {
+async function flushFailedLogins(): Promise<void> {
+  const batch = Array.from(pendingFailures, ([email_hash, failures]) => ({
+    email_hash,
+    failures,
+  }));
+  pendingFailures.clear();
+  if (batch.length === 0) return;
+
   try {
-    const now = new Date();
-    const row = await getLockoutRow(emailHash);
-    const currentCount = row?.login_failed_count ?? 0;
-    const nextCount = currentCount + 1;
-
-    if (nextCount >= LOCKOUT_THRESHOLD) {
-      const lockedUntil = new Date(
-        now.getTime() + LOCKOUT_DURATION_MINUTES * 60 * 1000,
-      ).toISOString();
-
-      const { error: upsertError } = await supabaseAdmin.from("auth_lockouts").upsert({
-        email_hash: emailHash,
-        login_failed_count: 0,
-        locked_until: lockedUntil,
-        updated_at: now.toISOString(),
+    const { data, error } = await supabaseAdmin.rpc("record_failed_logins", {
+      p_failures: batch,
+      p_threshold: LOCKOUT_THRESHOLD,
+      p_lock_minutes: LOCKOUT_DURATION_MINUTES,
+    });
+
+    if (error) {
+      console.error("Failed to record failed logins", {
+        accounts: batch.length,
+        error,
       });
-      if (upsertError) {
-        console.error("Failed to upsert lockout", { emailHash, error: upsertError });
-      }
-    } else {
-      const { error: upsertError } = await supabaseAdmin
-        .from("auth_lockouts")
-        .upsert({
-          email_hash: emailHash,
-          login_failed_count: nextCount,
-          locked_until: null,
-          updated_at: now.toISOString(),
-        });
-
-      if (upsertError) {
-        console.error("Failed to upsert lockout counter", {
-          emailHash,
-          error: upsertError,
-        });
-      }
+      return;
     }
+
+    const now = Date.now();
+    ((data as LockoutRow[] | null) ?? []).forEach((row) => {
+      const state = stateFromRow(row, now);
+      state.failedCount += pendingFailures.get(row.email_hash) ?? 0;
+      cacheState(row.email_hash, state);
+    });
   } catch (error) {
     console.error("Failed to register failed login for lockout", {
-      emailHash,
+      accounts: batch.length,
       error,
     });
   }
 }
 
+function scheduleFlush(): Promise<void> {
+  if (!pendingFlush) {
+    pendingFlush = new Promise<void>((resolve) => setTimeout(resolve, FLUSH_DELAY_MS))
+      .then(() => {
+        pendingFlush = null;
+        return flushFailedLogins();
+      });
+  }
+  return pendingFlush;
+}
+
+/**
+ * Count a failed login
+ * The account is locked in this instance as soon as the local count reaches
+ * the threshold; the returned promise resolves once the batch containing
+ * this failure has been persisted.
+ */
+export async function registerFailedLogin(emailHash: string): Promise<void> {
+  const now = Date.now();
+  pendingFailures.set(emailHash, (pendingFailures.get(emailHash) ?? 0) + 1);
+
+  const state = lockoutCache.get(emailHash) ?? {
+    failedCount: 0,
+    lockedUntil: null,
+    checkedAt: 0,
+  };
+  state.failedCount += 1;
+  if (state.failedCount >= LOCKOUT_THRESHOLD) {
+    state.failedCount = 0;
+    state.lockedUntil = now + LOCKOUT_DURATION_MINUTES * 60 * 1000;
+  }
+  cacheState(emailHash, state);
+
+  await scheduleFlush();
+}
+
 export async function resetLockout(emailHash: string): Promise<void> {
+  const cached = lockoutCache.get(emailHash);
+  const knownClean =
+    cached &&
+    cached.failedCount === 0 &&
+    !cached.lockedUntil &&
+    !pendingFailures.has(emailHash) &&
+    Date.now() - cached.checkedAt < UNLOCKED_CACHE_TTL_MS;
+
+  pendingFailures.delete(emailHash);
+  cacheState(emailHash, { failedCount: 0, lockedUntil: null, checkedAt: Date.now() });
+
+  // Most successful logins follow a clean state; skip the redundant write
+  if (knownClean) return;
+
   try {
     const now = new Date().toISOString();
     await supabaseAdmin.from("auth_lockouts").upsert({
@@ -1,6 +1,5 @@
 import { NextResponse } from "next/server";
-import { createServerClient } from "@supabase/ssr";
-import { cookies } from "next/headers";
+import { getRequestAuth, runWithRequestScope } from "@/lib/request-auth";
 
 export type UserRole = "admin" | "operator" | "customer";
 
@@ -35,27 +34,12 @@ export function withAuth(
   ) => Promise<NextResponse>,
   options?: WithAuthOptions
 ) {
-  return async (req: Request) => {
+  const authenticated = async (req: Request) => {
     try {
-      const cookieStore = cookies();
+      // Resolved once per request; reuses the context middleware forwarded
+      const auth = await getRequestAuth();
 
-      const supabase = createServerClient(
-        process.env.NEXT_PUBLIC_SUPABASE_URL!,
-        process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!,
-        {
-          cookies: {
-            get(name: string) {
-              return cookieStore.get(name)?.value;
-            },
-          },
-        }
-      );
-
-      const {
-        data: { session },
-      } = await supabase.auth.getSession();
-
-      if (!session) {
+      if (!auth) {
         return NextResponse.json(
           {
             error: "Unauthorized - Authentication required",
@@ -65,47 +49,18 @@ export function withAuth(
         );
       }
 
-      const { data: userData } = await supabase
-        .from("users")
-        .select("role")
-        .eq("id", session.user.id)
-        .maybeSingle();
-
-      const userRole = (userData?.role || "customer") as UserRole;
-
-      // Check required role
-      if (options?.requiredRole) {
-        if (userRole !== options.requiredRole && userRole !== "admin") {
-          return NextResponse.json(
-            {
-              error: `Forbidden - Requires ${options.requiredRole} role`,
-              code: "FORBIDDEN",
-            },
-            { status: 403 }
-          );
-        }
-      }
-
-      // Check allowed roles
-      if (options?.allowedRoles && options.allowedRoles.length > 0) {
-        if (!options.allowedRoles.includes(userRole) && userRole !== "admin") {
-          return NextResponse.json(
-            {
-              error: `Forbidden - Requires one of: ${options.allowedRoles.join(", ")}`,
-              code: "FORBIDDEN",
-            },
-            { status: 403 }
-          );
-        }
-      }
-
-      const context: AuthContext = {
-        userId: session.user.id,
-        userRole,
-        userEmail: session.user.email,
-      };
+      const userRole = (auth.role || "customer") as UserRole;
 
-      return await handler(req, context);
+      return await authorize(
+        handler,
+        req,
+        {
+          userId: auth.userId,
+          userRole,
+          userEmail: auth.email ?? undefined,
+        },
+        options
+      );
     } catch (error) {
       console.error("[API Auth Error]", error);
       return NextResponse.json(
@@ -117,6 +72,46 @@ export function withAuth(
       );
     }
   };
+
+  // The handler and everything it calls share one auth lookup and client
+  return (req: Request) => runWithRequestScope(() => authenticated(req));
+}
+
+async function authorize(
+  handler: (req: Request, context: AuthContext) => Promise<NextResponse>,
+  req: Request,
+  context: AuthContext,
+  options?: WithAuthOptions
+): Promise<NextResponse> {
+  const { userRole } = context;
+
+  // Check required role
+  if (options?.requiredRole) {
+    if (userRole !== options.requiredRole && userRole !== "admin") {
+      return NextResponse.json(
+        {
+          error: `Forbidden - Requires ${options.requiredRole} role`,
+          code: "FORBIDDEN",
+        },
+        { status: 403 }
+      );
+    }
+  }
+
+  // Check allowed roles
+  if (options?.allowedRoles && options.allowedRoles.length > 0) {
+    if (!options.allowedRoles.includes(userRole) && userRole !== "admin") {
+      return NextResponse.json(
+        {
+          error: `Forbidden - Requires one of: ${options.allowedRoles.join(", ")}`,
+          code: "FORBIDDEN",
+        },
+        { status: 403 }
+      );
+    }
+  }
+
+  return await handler(req, context);
 }
 
 /**
@@ -11,22 +11,187 @@ type AuthEventMetadata = {
   [key: string]: unknown;
 };
 
+type AuditLogRow = {
+  event_type: AuthEventType;
+  user_id: string | null;
+  metadata: AuthEventMetadata;
+  created_at: string;
+};
+
+// Flush when this many events are buffered, or after FLUSH_INTERVAL_MS
+const FLUSH_BATCH_SIZE = 50;
+const FLUSH_INTERVAL_MS = 1_000;
+// Oldest events are dropped beyond this, e.g. while the DB is unreachable
+const MAX_BUFFERED_EVENTS = 5_000;
+// Warn once the buffer grows past this many unflushed events
+const BACKLOG_WARN_THRESHOLD = 500;
+// Retry delay after failed flushes doubles up to this
+const MAX_RETRY_DELAY_MS = 30_000;
+// Longest a shutdown waits for the final flush
+const SHUTDOWN_FLUSH_TIMEOUT_MS = 5_000;
+
+/**
+ * In-process audit log buffer
+ * Events are written with multi-row inserts off the request path. A failed
+ * batch is put back at the front of the buffer and retried with exponential
+ * backoff; overflow drops the oldest events and is counted in
+ * getAuditLogStats.
+ */
+const buffer: AuditLogRow[] = [];
+let flushTimer: ReturnType<typeof setTimeout> | null = null;
+let flushing: Promise<void> | null = null;
+let shutdownHooksInstalled = false;
+// Failed flushes since the last successful one
+let consecutiveFailures = 0;
+
+const stats = {
+  written: 0,
+  dropped: 0,
+  failedFlushes: 0,
+  lastFlushAt: null as string | null,
+};
+
+export function getAuditLogStats() {
+  return { ...stats, buffered: buffer.length };
+}
+
+function enqueue(rows: AuditLogRow[], atFront = false) {
+  if (atFront) {
+    buffer.unshift(...rows);
+  } else {
+    buffer.push(...rows);
+  }
+
+  const overflow = buffer.length - MAX_BUFFERED_EVENTS;
+  if (overflow > 0) {
+    buffer.splice(0, overflow);
+    stats.dropped += overflow;
+    console.error("Audit log buffer full, dropped oldest events", {
+      dropped: overflow,
+      totalDropped: stats.dropped,
+    });
+  }
+}
+
+function scheduleFlush() {
+  // While writes are failing, a full batch waits for the backoff like
+  // everything else instead of retrying straight away
+  if (buffer.length >= FLUSH_BATCH_SIZE && consecutiveFailures === 0) {
+    void flushAuditLogs();
+    return;
+  }
+  if (flushTimer) return;
+
+  const delay =
+    consecutiveFailures === 0
+      ? FLUSH_INTERVAL_MS
+      : Math.min(MAX_RETRY_DELAY_MS, FLUSH_INTERVAL_MS * 2 ** consecutiveFailures);
+
+  flushTimer = setTimeout(() => {
+    flushTimer = null;
+    void flushAuditLogs();
+  }, delay);
+}
+
+/**
+ * Write all buffered events
+ * Safe to call concurrently; callers share the in-flight flush.
+ */
+export function flushAuditLogs(): Promise<void> {
+  if (flushing) return flushing;
+
+  flushing = (async () => {
+    if (flushTimer) {
+      clearTimeout(flushTimer);
+      flushTimer = null;
+    }
+
+    while (buffer.length > 0) {
+      const batch = buffer.splice(0, FLUSH_BATCH_SIZE);
+
+      try {
+        const { error } = await supabaseAdmin.from("audit_logs").insert(batch);
+        if (error) throw error;
+        consecutiveFailures = 0;
+        stats.written += batch.length;
+        stats.lastFlushAt = new Date().toISOString();
+      } catch (error) {
+        stats.failedFlushes += 1;
+        consecutiveFailures += 1;
+        enqueue(batch, true);
+        console.error("Failed to write auth audit logs", {
+          events: batch.length,
+          buffered: buffer.length,
+          error,
+        });
+        break;
+      }
+    }
+  })().finally(() => {
+    flushing = null;
+    if (buffer.length > 0) scheduleFlush();
+  });
+
+  return flushing;
+}
+
+function installShutdownHooks() {
+  if (shutdownHooksInstalled) return;
+  shutdownHooksInstalled = true;
+
+  if (process.env.NEXT_RUNTIME === "edge" || typeof process.once !== "function") {
+    return;
+  }
+
+  process.once("beforeExit", () => {
+    void flushAuditLogs();
+  });
+
+  // A signal listener replaces Node's default exit. When another listener
+  // owns shutdown (e.g. the worker process), just flush alongside it;
+  // otherwise flush, then exit as the default handler would have.
+  const drainOnSignal = (signal: "SIGTERM" | "SIGINT", exitCode: number) => {
+    process.once(signal, () => {
+      if (process.listenerCount(signal) > 0) {
+        void flushAuditLogs();
+        return;
+      }
+
+      const forceExit = setTimeout(() => process.exit(exitCode), SHUTDOWN_FLUSH_TIMEOUT_MS);
+      void flushAuditLogs().finally(() => {
+        clearTimeout(forceExit);
+        process.exit(exitCode);
+      });
+    });
+  };
+  drainOnSignal("SIGTERM", 143);
+  drainOnSignal("SIGINT", 130);
+}
+
+/**
+ * Record an auth event
+ * Returns immediately; the event is persisted by the next batched flush.
+ */
 export async function logAuthEvent(
   event: AuthEventType,
   userId: string | null,
   metadata: AuthEventMetadata
 ): Promise<void> {
-  try {
-    await supabaseAdmin.from("audit_logs").insert({
+  installShutdownHooks();
+
+  enqueue([
+    {
       event_type: event,
       user_id: userId,
       metadata,
-    });
-  } catch (error) {
-    console.error("Failed to write auth audit log", {
-      event,
-      userId,
-      error,
-    });
+      // Stamp at enqueue time so batching does not skew event order
+      created_at: new Date().toISOString(),
+    },
+  ]);
+
+  if (buffer.length === BACKLOG_WARN_THRESHOLD) {
+    console.warn("Audit log backlog growing", { buffered: buffer.length });
   }
+
+  scheduleFlush();
 }
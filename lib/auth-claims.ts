@@ -0,0 +1,114 @@
+/**
+ * Access token claims
+ *
+ * The custom access token hook (see 20251220_add_custom_access_token_hook.sql)
+ * embeds `user_role` and `user_location` in every Supabase JWT. Once the token
+ * signature is verified those claims are enough to authorize a request, so
+ * middleware and withAuth can skip the `users` lookup.
+ *
+ * Verification uses SUPABASE_JWT_SECRET (HS256) through Web Crypto so it runs
+ * in both the Edge (middleware) and Node runtimes. When the secret is not set
+ * or the hook has not been enabled yet, callers fall back to the DB lookup.
+ */
+
+export interface AccessTokenClaims {
+  sub: string;
+  email?: string;
+  exp: number;
+  user_role?: string | null;
+  user_location?: string | null;
+}
+
+export interface UserContextClaims {
+  userId: string;
+  email?: string;
+  role: string;
+  location: string;
+}
+
+const jwtSecret = process.env.SUPABASE_JWT_SECRET;
+const encoder = new TextEncoder();
+let signingKey: Promise<CryptoKey> | null = null;
+
+function getSigningKey(secret: string): Promise<CryptoKey> {
+  if (!signingKey) {
+    signingKey = crypto.subtle.importKey(
+      "raw",
+      encoder.encode(secret),
+      { name: "HMAC", hash: "SHA-256" },
+      false,
+      ["verify"]
+    );
+  }
+  return signingKey;
+}
+
+function base64UrlToBytes(value: string): Uint8Array {
+  const base64 = value.replace(/-/g, "+").replace(/_/g, "/");
+  const padded = base64 + "=".repeat((4 - (base64.length % 4)) % 4);
+  const binary = atob(padded);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
+/**
+ * Verify an access token and return its claims
+ * Returns null for malformed, expired or badly signed tokens, and when no
+ * JWT secret is configured.
+ */
+export async function verifyAccessToken(
+  token: string | null | undefined
+): Promise<AccessTokenClaims | null> {
+  if (!token || !jwtSecret) return null;
+
+  const parts = token.split(".");
+  if (parts.length !== 3) return null;
+
+  try {
+    const header = JSON.parse(new TextDecoder().decode(base64UrlToBytes(parts[0])));
+    if (header?.alg !== "HS256") return null;
+
+    const valid = await crypto.subtle.verify(
+      "HMAC",
+      await getSigningKey(jwtSecret),
+      base64UrlToBytes(parts[2]),
+      encoder.encode(`${parts[0]}.${parts[1]}`)
+    );
+    if (!valid) return null;
+
+    const claims = JSON.parse(
+      new TextDecoder().decode(base64UrlToBytes(parts[1]))
+    ) as AccessTokenClaims;
+
+    if (typeof claims.sub !== "string" || typeof claims.exp !== "number") {
+      return null;
+    }
+    if (claims.exp * 1000 <= Date.now()) return null;
+
+    return claims;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Resolve the user context from a verified access token
+ * Returns null if the token cannot be verified or does not carry both the
+ * role and location claims (e.g. issued before the hook was enabled).
+ */
+export async function getUserContextFromToken(
+  token: string | null | undefined
+): Promise<UserContextClaims | null> {
+  const claims = await verifyAccessToken(token);
+  if (!claims?.user_role || !claims.user_location) return null;
+
+  return {
+    userId: claims.sub,
+    email: claims.email,
+    role: claims.user_role,
+    location: claims.user_location,
+  };
+}
@@ -1,6 +1,6 @@
-import { createServerClient } from "@supabase/ssr";
-import { cookies } from "next/headers";
+import { cache } from "react";
 import type { Location } from "@/types/auth";
+import { getRequestAuth, getRequestSupabase } from "@/lib/request-auth";
 
 // Only admin role for this dashboard
 export type UserRole = "admin";
@@ -13,43 +13,33 @@ export interface User {
   location?: Location;  // Primary location (imphal or newdelhi)
 }
 
+// Profile fields not carried in the request auth context
+const getUserProfile = cache(async (userId: string) => {
+  const { data } = await getRequestSupabase()
+    .from("users")
+    .select("name")
+    .eq("id", userId)
+    .maybeSingle();
+
+  return data as { name: string | null } | null;
+});
+
 /**
  * Get the current authenticated user with role
  * Server-side only - use in Server Components and API routes
  */
 export async function getCurrentUser(): Promise<User | null> {
-  const cookieStore = cookies();
-  
-  const supabase = createServerClient(
-    process.env.NEXT_PUBLIC_SUPABASE_URL!,
-    process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!,
-    {
-      cookies: {
-        get(name: string) {
-          return cookieStore.get(name)?.value;
-        },
-      },
-    }
-  );
+  const auth = await getRequestAuth();
+  if (!auth) return null;
 
-  const {
-    data: { session },
-  } = await supabase.auth.getSession();
-
-  if (!session) return null;
-
-  const { data: userData } = await supabase
-    .from("users")
-    .select("role, name, location")
-    .eq("id", session.user.id)
-    .maybeSingle();
+  const profile = await getUserProfile(auth.userId);
 
   return {
-    id: session.user.id,
-    email: session.user.email,
+    id: auth.userId,
+    email: auth.email ?? undefined,
     role: "admin" as UserRole,  // All users in this dashboard are admins
-    name: userData?.name,
-    location: (userData?.location || "imphal") as Location,
+    name: profile?.name ?? undefined,
+    location: (auth.location || "imphal") as Location,
   };
 }
 
@@ -32,11 +32,11 @@ export function getFeatureStatus(): Record<string, FeatureStatus> {
       installCommand: "npm install bullmq ioredis",
     },
     rateLimiting: {
-      name: "Rate Limiting",
+      name: "Distributed Rate Limiting",
       available: rateLimitingAvailable,
-      packages: ["@upstash/ratelimit", "@upstash/redis"],
-      description: "API request throttling and abuse protection",
-      installCommand: "npm install @upstash/ratelimit @upstash/redis",
+      packages: ["@upstash/redis"],
+      description: "Shares API rate limits across instances (per-instance limits always apply)",
+      installCommand: "npm install @upstash/redis",
     },
     whatsapp: {
       name: "WhatsApp Notifications",
@@ -0,0 +1,35 @@
+/**
+ * Invoice content fingerprint
+ *
+ * A short hash of everything the invoice PDF renders (see
+ * generateInvoicePdf): the invoice, its customer, line items with their
+ * shipments, and the customer's unpaid balance. Identical fingerprints mean
+ * an identical PDF, so queued renders can be coalesced; any data change
+ * produces a new fingerprint and therefore a new render.
+ *
+ * Computed in Postgres (invoice_fingerprints), one query per batch.
+ */
+
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+
+/**
+ * Fingerprints by invoice id; ids with no invoice are missing from the map
+ */
+export async function getInvoiceFingerprints(invoiceIds: string[]): Promise<Map<string, string>> {
+  if (invoiceIds.length === 0) return new Map();
+
+  const { data, error } = await supabaseAdmin.rpc("invoice_fingerprints", {
+    p_invoice_ids: invoiceIds,
+  });
+  if (error) throw error;
+
+  return new Map(
+    ((data as any[] | null) ?? []).map((row) => [row.invoice_id as string, row.fingerprint as string])
+  );
+}
+
+export async function getInvoiceFingerprint(invoiceId: string): Promise<string> {
+  const fingerprint = (await getInvoiceFingerprints([invoiceId])).get(invoiceId);
+  if (!fingerprint) throw new Error("Invoice not found");
+  return fingerprint;
+}
@@ -0,0 +1,45 @@
+/**
+ * Outbound message log (message_logs, 20251230_add_message_logs.sql)
+ *
+ * One row per provider message, keyed by (provider, provider_message_id).
+ * Writes go through upsert_message_logs so sends and status callbacks can
+ * arrive in any order without regressing a message's status.
+ */
+
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+
+export interface MessageLogEntry {
+  provider: "meta" | "twilio";
+  channel: "whatsapp" | "sms";
+  providerMessageId: string | null;
+  invoiceId?: string | null;
+  phone?: string | null;
+  mode?: string | null;
+  status: string;
+  errorMessage?: string | null;
+  rawResponse?: unknown;
+}
+
+/**
+ * Record sends or status changes in one batched upsert
+ */
+export async function recordMessageLogs(entries: MessageLogEntry[]) {
+  if (entries.length === 0) return;
+
+  const { error } = await supabaseAdmin.rpc("upsert_message_logs", {
+    p_rows: entries.map((entry) => ({
+      provider: entry.provider,
+      channel: entry.channel,
+      provider_message_id: entry.providerMessageId,
+      invoice_id: entry.invoiceId ?? null,
+      phone: entry.phone ?? null,
+      mode: entry.mode ?? null,
+      status: entry.status,
+      status_at: new Date().toISOString(),
+      error_message: entry.errorMessage ?? null,
+      raw_response: entry.rawResponse ?? null,
+    })),
+  });
+
+  if (error) throw error;
+}
@@ -0,0 +1,74 @@
+import { z } from "zod";
+
+/**
+ * Keyset pagination helpers for list endpoints ordered by (created_at, id).
+ *
+ * Cursors are opaque base64url strings so clients never build them by hand.
+ */
+
+export interface KeysetCursor {
+  createdAt: string;
+  id: string;
+}
+
+export const DEFAULT_PAGE_SIZE = 50;
+export const MAX_PAGE_SIZE = 200;
+
+export const pageSizeSchema = z.coerce
+  .number()
+  .int()
+  .min(1)
+  .max(MAX_PAGE_SIZE)
+  .default(DEFAULT_PAGE_SIZE);
+
+export function encodeCursor(cursor: KeysetCursor): string {
+  return Buffer.from(JSON.stringify([cursor.createdAt, cursor.id])).toString(
+    "base64url"
+  );
+}
+
+export function decodeCursor(value: string | null | undefined): KeysetCursor | null {
+  if (!value) return null;
+  try {
+    const parsed = JSON.parse(Buffer.from(value, "base64url").toString("utf8"));
+    if (
+      Array.isArray(parsed) &&
+      typeof parsed[0] === "string" &&
+      typeof parsed[1] === "string" &&
+      !Number.isNaN(Date.parse(parsed[0]))
+    ) {
+      return { createdAt: parsed[0], id: parsed[1] };
+    }
+  } catch {
+    // fall through
+  }
+  return null;
+}
+
+/**
+ * PostgREST `or` filter selecting rows strictly after the cursor for a
+ * `created_at desc, id desc` ordering. Values are quoted because timestamps
+ * contain reserved characters (`:` and `+`).
+ */
+export function keysetAfterFilter(cursor: KeysetCursor): string {
+  const createdAt = `"${cursor.createdAt}"`;
+  const id = `"${cursor.id}"`;
+  return `created_at.lt.${createdAt},and(created_at.eq.${createdAt},id.lt.${id})`;
+}
+
+/**
+ * Splits a `limit + 1` result into the page and the cursor for the next one.
+ */
+export function toKeysetPage<T extends { created_at: string; id: string }>(
+  rows: T[],
+  limit: number
+): { items: T[]; nextCursor: string | null } {
+  const hasMore = rows.length > limit;
+  const items = hasMore ? rows.slice(0, limit) : rows;
+  const last = items[items.length - 1];
+  return {
+    items,
+    nextCursor:
+      hasMore && last ? encodeCursor({ createdAt: last.created_at, id: last.id }) : null,
+  };
+}
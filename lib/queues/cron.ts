@@ -0,0 +1,126 @@
+/**
+ * Minimal 5-field cron expressions for the scheduler
+ *
+ *   minute hour day-of-month month day-of-week
+ *
+ * Each field accepts *, numbers, lists (1,15), ranges (1-5) and steps
+ * (*\/15, 0-30/10). Expressions are evaluated at a fixed UTC offset rather
+ * than a named time zone, which is enough for IST (no DST).
+ */
+
+export interface CronSchedule {
+  minutes: Set<number>;
+  hours: Set<number>;
+  daysOfMonth: Set<number>;
+  months: Set<number>;
+  daysOfWeek: Set<number>;
+  // Standard cron: when both day fields are restricted, either may match
+  dayOfMonthRestricted: boolean;
+  dayOfWeekRestricted: boolean;
+}
+
+const FIELD_RANGES: [number, number][] = [
+  [0, 59],
+  [0, 23],
+  [1, 31],
+  [1, 12],
+  [0, 7],
+];
+
+function parseField(field: string, [min, max]: [number, number]) {
+  const values = new Set<number>();
+
+  for (const part of field.split(",")) {
+    const [rangePart, stepPart] = part.split("/");
+    const step = stepPart ? Number.parseInt(stepPart, 10) : 1;
+
+    let start = min;
+    let end = max;
+    if (rangePart !== "*") {
+      const [from, to] = rangePart.split("-").map((value) => Number.parseInt(value, 10));
+      start = from;
+      end = to ?? (stepPart ? max : from);
+    }
+
+    if (![start, end, step].every(Number.isFinite) || step < 1 || start < min || end > max) {
+      throw new Error(`Invalid cron field "${field}"`);
+    }
+
+    for (let value = start; value <= end; value += step) {
+      values.add(value);
+    }
+  }
+
+  return values;
+}
+
+export function parseCron(expression: string): CronSchedule {
+  const fields = expression.trim().split(/\s+/);
+  if (fields.length !== 5) {
+    throw new Error(`Invalid cron expression "${expression}": expected 5 fields`);
+  }
+
+  const [minutes, hours, daysOfMonth, months, daysOfWeek] = fields.map((field, index) =>
+    parseField(field, FIELD_RANGES[index])
+  );
+
+  // 7 is also Sunday
+  if (daysOfWeek.delete(7)) daysOfWeek.add(0);
+
+  return {
+    minutes,
+    hours,
+    daysOfMonth,
+    months,
+    daysOfWeek,
+    dayOfMonthRestricted: fields[2] !== "*",
+    dayOfWeekRestricted: fields[4] !== "*",
+  };
+}
+
+function matchesDay(cron: CronSchedule, local: Date) {
+  if (!cron.months.has(local.getUTCMonth() + 1)) return false;
+
+  const dom = cron.daysOfMonth.has(local.getUTCDate());
+  const dow = cron.daysOfWeek.has(local.getUTCDay());
+
+  if (cron.dayOfMonthRestricted && cron.dayOfWeekRestricted) return dom || dow;
+  if (cron.dayOfMonthRestricted) return dom;
+  if (cron.dayOfWeekRestricted) return dow;
+  return true;
+}
+
+/**
+ * Most recent time at or before `at` that matches the schedule
+ * Returns null if nothing matches within the past year.
+ */
+export function previousCronSlot(cron: CronSchedule, at: Date, utcOffsetMinutes = 0) {
+  const offsetMs = utcOffsetMinutes * 60_000;
+  // Work in "local" time stored in the UTC fields of a Date
+  const local = new Date(Math.floor((at.getTime() + offsetMs) / 60_000) * 60_000);
+  const limit = local.getTime() - 366 * 24 * 60 * 60_000;
+
+  while (local.getTime() >= limit) {
+    if (!matchesDay(cron, local)) {
+      // Jump to 23:59 of the previous day
+      local.setUTCHours(0, 0, 0, 0);
+      local.setTime(local.getTime() - 60_000);
+      continue;
+    }
+
+    if (!cron.hours.has(local.getUTCHours())) {
+      // Jump to :59 of the previous hour
+      local.setUTCMinutes(0, 0, 0);
+      local.setTime(local.getTime() - 60_000);
+      continue;
+    }
+
+    if (cron.minutes.has(local.getUTCMinutes())) {
+      return new Date(local.getTime() - offsetMs);
+    }
+
+    local.setTime(local.getTime() - 60_000);
+  }
+
+  return null;
+}
@@ -0,0 +1,62 @@
+/**
+ * Recurring maintenance tasks
+ * Enqueued by the scheduler (lib/queues/scheduler.ts) and run by the
+ * maintenance queue worker. Every task is idempotent, so retries and
+ * catch-up runs are safe. SQL lives in 20260102_add_scheduler.sql.
+ */
+
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import { STORAGE_BUCKET, removeFromStorage } from "@/lib/storageHelpers";
+import { queueDriver } from "@/lib/queues/setup";
+
+async function rpc(name: string, params?: Record<string, unknown>) {
+  const { data, error } = await supabaseAdmin.rpc(name, params);
+  if (error) throw error;
+  return data;
+}
+
+export const MAINTENANCE_TASKS: Record<string, () => Promise<unknown>> = {
+  // Pending invoices past due → overdue, so pages can filter on status
+  "mark-overdue-invoices": async () => ({
+    marked: await rpc("mark_overdue_invoices"),
+  }),
+
+  // Snapshot served by GET /api/finance/ar
+  "refresh-ar-summary": async () => {
+    await rpc("refresh_ar_summary");
+    return { refreshedAt: new Date().toISOString() };
+  },
+
+  // Superseded or orphaned invoice PDFs
+  "cleanup-invoice-pdfs": async () => {
+    const paths = ((await rpc("find_orphaned_invoice_pdfs", {
+      p_bucket: STORAGE_BUCKET,
+    })) ?? []) as string[];
+    await removeFromStorage(paths);
+    return { removed: paths.length };
+  },
+
+  // Keeps the cached dashboard summary warm so page loads never wait on it
+  "refresh-daily-summary": async () => {
+    const { data, error } = await supabaseAdmin.functions.invoke("daily-summary");
+    if (error) throw error;
+    return { cached: (data as any)?.cached ?? null };
+  },
+
+  "prune-queue-jobs": async () => ({
+    pruned: queueDriver === "postgres" ? await rpc("prune_jobs") : 0,
+  }),
+
+  "prune-webhook-inbox": async () => ({
+    pruned: await rpc("prune_webhook_inbox"),
+  }),
+
+  // Next months' audit_logs partitions and retention, for deployments
+  // without pg_cron (SQL in 20251223_partition_audit_logs.sql)
+  "maintain-audit-logs": async () => {
+    await rpc("maintain_audit_logs");
+    return { maintainedAt: new Date().toISOString() };
+  },
+};
+
+export type MaintenanceTask = keyof typeof MAINTENANCE_TASKS;
@@ -0,0 +1,205 @@
+/**
+ * Queue observability: per-queue metrics and job status lookups
+ * Works on both queue drivers; BullMQ figures are computed from the retained
+ * job history (see removeOnComplete / removeOnFail in setup.ts).
+ */
+
+import {
+  QUEUE_NAMES,
+  emailQueue,
+  invoiceQueue,
+  maintenanceQueue,
+  queueDriver,
+  whatsappQueue,
+} from "@/lib/queues/setup";
+
+export type QueueKey = keyof typeof QUEUE_NAMES;
+
+export interface QueueMetrics {
+  queue: string;
+  waiting: number;
+  active: number;
+  completed: number;
+  failed: number;
+  // Jobs that reached a terminal state (completed or failed for good) per
+  // minute over the window; the same definition on both drivers
+  throughputPerMinute: number;
+  failedInWindow: number;
+  p50Ms: number | null;
+  p95Ms: number | null;
+  // Extra attempts spent on jobs finished in the window
+  retries: number;
+  windowMinutes: number;
+}
+
+export interface JobStatus {
+  id: string;
+  queue: string;
+  name: string;
+  status: string;
+  attempts: number;
+  error: string | null;
+  result: unknown;
+  createdAt: string | null;
+  startedAt: string | null;
+  finishedAt: string | null;
+}
+
+const DEFAULT_WINDOW_MINUTES = 60;
+// Finished BullMQ jobs sampled per queue for percentiles
+const BULLMQ_SAMPLE_SIZE = 200;
+
+function percentile(sorted: number[], p: number): number | null {
+  if (sorted.length === 0) return null;
+  const index = Math.min(sorted.length - 1, Math.ceil(p * sorted.length) - 1);
+  return sorted[Math.max(0, index)];
+}
+
+function toIso(value: number | null | undefined) {
+  return value ? new Date(value).toISOString() : null;
+}
+
+const queues: Record<QueueKey, any> = {
+  invoice: invoiceQueue,
+  email: emailQueue,
+  whatsapp: whatsappQueue,
+  maintenance: maintenanceQueue,
+};
+
+async function getBullMqMetrics(queue: any, windowMinutes: number): Promise<QueueMetrics> {
+  const since = Date.now() - windowMinutes * 60_000;
+  const [counts, completedJobs, failedJobs] = await Promise.all([
+    queue.getJobCounts("waiting", "delayed", "active", "completed", "failed"),
+    queue.getCompleted(0, BULLMQ_SAMPLE_SIZE - 1),
+    queue.getFailed(0, BULLMQ_SAMPLE_SIZE - 1),
+  ]);
+
+  const recentCompleted = (completedJobs as any[]).filter((job) => job.finishedOn >= since);
+  const recentFailed = (failedJobs as any[]).filter((job) => job.finishedOn >= since);
+  const durations = recentCompleted
+    .filter((job) => job.processedOn)
+    .map((job) => job.finishedOn - job.processedOn)
+    .sort((a, b) => a - b);
+
+  return {
+    queue: queue.name,
+    waiting: (counts.waiting ?? 0) + (counts.delayed ?? 0),
+    active: counts.active ?? 0,
+    completed: counts.completed ?? 0,
+    failed: counts.failed ?? 0,
+    throughputPerMinute: (recentCompleted.length + recentFailed.length) / windowMinutes,
+    failedInWindow: recentFailed.length,
+    p50Ms: percentile(durations, 0.5),
+    p95Ms: percentile(durations, 0.95),
+    retries: [...recentCompleted, ...recentFailed].reduce(
+      (sum, job) => sum + Math.max(0, (job.attemptsMade ?? 1) - 1),
+      0
+    ),
+    windowMinutes,
+  };
+}
+
+async function getPgMetrics(windowMinutes: number): Promise<QueueMetrics[]> {
+  const { supabaseAdmin } = await import("@/lib/supabaseAdmin");
+  const { data, error } = await supabaseAdmin.rpc("queue_metrics", {
+    p_window_minutes: windowMinutes,
+  });
+  if (error) throw error;
+
+  const rows = new Map(((data as any[] | null) ?? []).map((row) => [row.queue as string, row]));
+
+  return Object.values(QUEUE_NAMES).map((name) => {
+    const row = rows.get(name);
+    return {
+      queue: name,
+      waiting: Number(row?.waiting ?? 0),
+      active: Number(row?.active ?? 0),
+      completed: Number(row?.completed ?? 0),
+      failed: Number(row?.failed ?? 0),
+      throughputPerMinute: Number(row?.finished_in_window ?? 0) / windowMinutes,
+      failedInWindow: Number(row?.failed_in_window ?? 0),
+      p50Ms: row?.p50_ms != null ? Math.round(row.p50_ms) : null,
+      p95Ms: row?.p95_ms != null ? Math.round(row.p95_ms) : null,
+      retries: Number(row?.retries ?? 0),
+      windowMinutes,
+    };
+  });
+}
+
+/**
+ * Metrics for every queue, or [] when no queue driver is configured
+ */
+export async function getQueueMetrics(
+  windowMinutes = DEFAULT_WINDOW_MINUTES
+): Promise<QueueMetrics[]> {
+  if (queueDriver === "postgres") return getPgMetrics(windowMinutes);
+
+  if (queueDriver === "bullmq") {
+    return Promise.all(
+      Object.values(queues)
+        .filter(Boolean)
+        .map((queue) => getBullMqMetrics(queue, windowMinutes))
+    );
+  }
+
+  return [];
+}
+
+// Postgres job ids are jobs.id uuids; anything else cannot match a row
+const JOB_ID_UUID = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+/**
+ * Look up a job by the id returned when it was queued
+ * Returns null if the job does not exist (or has been pruned), or
+ * the id is not a uuid on the Postgres driver.
+ */
+export async function getJobStatus(queue: QueueKey, jobId: string): Promise<JobStatus | null> {
+  if (queueDriver === "postgres") {
+    // Comparing a malformed id against the uuid column fails the whole
+    // query (22P02) rather than matching nothing
+    if (!JOB_ID_UUID.test(jobId)) return null;
+
+    const { supabaseAdmin } = await import("@/lib/supabaseAdmin");
+    const { data, error } = await supabaseAdmin
+      .from("jobs")
+      .select("id, queue, name, status, attempts, last_error, result, created_at, started_at, finished_at")
+      .eq("queue", QUEUE_NAMES[queue])
+      .eq("id", jobId)
+      .maybeSingle();
+
+    if (error) throw error;
+    if (!data) return null;
+
+    return {
+      id: data.id,
+      queue: data.queue,
+      name: data.name,
+      status: data.status,
+      attempts: data.attempts,
+      error: data.last_error,
+      result: data.result,
+      createdAt: data.created_at,
+      startedAt: data.started_at,
+      finishedAt: data.finished_at,
+    };
+  }
+
+  const bullQueue = queues[queue];
+  if (queueDriver !== "bullmq" || !bullQueue) return null;
+
+  const job = await bullQueue.getJob(jobId);
+  if (!job) return null;
+
+  return {
+    id: job.id,
+    queue: bullQueue.name,
+    name: job.name,
+    status: await job.getState(),
+    attempts: job.attemptsMade ?? 0,
+    error: job.failedReason ?? null,
+    result: job.returnvalue ?? null,
+    createdAt: toIso(job.timestamp),
+    startedAt: toIso(job.processedOn),
+    finishedAt: toIso(job.finishedOn),
+  };
+}
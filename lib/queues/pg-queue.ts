@@ -0,0 +1,330 @@
+/**
+ * Postgres Job Queue Driver
+ *
+ * Fallback for deployments without Redis: jobs live in the `jobs` table
+ * (20251225_add_jobs_queue.sql) and workers poll it, claiming due jobs with
+ * FOR UPDATE SKIP LOCKED. A running job's lease is renewed on a heartbeat,
+ * so only a crashed or hung worker lets it expire. Exposes the small subset
+ * of the BullMQ Queue / Worker surface that lib/queues/setup.ts uses.
+ */
+
+import { randomUUID } from "crypto";
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+
+export interface PgJob<T = any> {
+  id: string;
+  queue: string;
+  name: string;
+  data: T;
+  attemptsMade: number;
+  // Return the job to the queue until `timestamp` (ms) without using up an
+  // attempt; the processor then throws DelayedError. The token is BullMQ's
+  // and ignored here.
+  moveToDelayed(timestamp: number, token?: string): Promise<void>;
+}
+
+interface PgJobOptions {
+  // Deduplication key: a second add() while the first is unfinished is a no-op
+  jobId?: string;
+  attempts?: number;
+  backoff?: { delay: number };
+  delay?: number;
+  // Lower runs first; see priorityAgingMs
+  priority?: number;
+}
+
+interface PgQueueOptions {
+  defaultJobOptions?: PgJobOptions;
+}
+
+export class PgQueue {
+  constructor(
+    readonly name: string,
+    private readonly options: PgQueueOptions = {}
+  ) {}
+
+  private toRow(jobName: string, data: unknown, opts: PgJobOptions = {}) {
+    const merged = { ...this.options.defaultJobOptions, ...opts };
+    return {
+      name: jobName,
+      payload: data ?? {},
+      dedupe_key: merged.jobId ?? null,
+      max_attempts: merged.attempts ?? 3,
+      backoff_ms: merged.backoff?.delay ?? 2000,
+      delay_ms: merged.delay ?? 0,
+      priority: merged.priority ?? 0,
+    };
+  }
+
+  async add(jobName: string, data: unknown, opts: PgJobOptions = {}) {
+    const row = this.toRow(jobName, data, opts);
+
+    const { data: id, error } = await supabaseAdmin.rpc("enqueue_job", {
+      p_queue: this.name,
+      p_name: row.name,
+      p_payload: row.payload,
+      p_dedupe_key: row.dedupe_key,
+      p_max_attempts: row.max_attempts,
+      p_backoff_ms: row.backoff_ms,
+      p_delay_ms: row.delay_ms,
+      p_priority: row.priority,
+    });
+
+    if (error) throw error;
+    return { id: id as string, name: jobName, data };
+  }
+
+  /**
+   * Enqueue several jobs in one round trip; mirrors BullMQ's Queue.addBulk
+   */
+  async addBulk(jobs: { name: string; data: unknown; opts?: PgJobOptions }[]) {
+    if (jobs.length === 0) return [];
+
+    const { data: rows, error } = await supabaseAdmin.rpc("enqueue_jobs", {
+      p_queue: this.name,
+      p_jobs: jobs.map((job) => this.toRow(job.name, job.data, job.opts)),
+    });
+
+    if (error) throw error;
+    return ((rows as { id: string }[] | null) ?? []).map((row, index) => ({
+      id: row.id,
+      name: jobs[index].name,
+      data: jobs[index].data,
+    }));
+  }
+}
+
+interface PgWorkerOptions {
+  // Jobs processed at once by this worker
+  concurrency?: number;
+  // Lease length, renewed every third of it while the job runs; a job whose
+  // worker stops renewing is handed to another worker
+  visibilityTimeoutMs?: number;
+  // Poll delay when the queue is empty (backs off up to maxPollIntervalMs)
+  pollIntervalMs?: number;
+  maxPollIntervalMs?: number;
+  // Head start per priority level; older lower-priority jobs still run first
+  // once they have waited this much longer (20251228_add_job_priority.sql)
+  priorityAgingMs?: number;
+}
+
+export class PgWorker<T = any> {
+  readonly id = `${process.pid}-${randomUUID().slice(0, 8)}`;
+  private readonly concurrency: number;
+  private readonly visibilityTimeoutMs: number;
+  private readonly pollIntervalMs: number;
+  private readonly maxPollIntervalMs: number;
+  private readonly priorityAgingMs: number;
+  private readonly active = new Set<Promise<void>>();
+  private readonly listeners: {
+    completed: ((job: PgJob<T>, result: unknown) => void)[];
+    failed: ((job: PgJob<T>, error: Error) => void)[];
+  } = { completed: [], failed: [] };
+  private running = true;
+  private idlePolls = 0;
+  private timer: ReturnType<typeof setTimeout> | null = null;
+  // One claim in flight at a time, or two polls could both see the same
+  // free slots and claim past `concurrency`
+  private polling: Promise<void> | null = null;
+  private pollAgain = false;
+
+  constructor(
+    readonly queue: string,
+    private readonly processor: (job: PgJob<T>) => Promise<unknown>,
+    options: PgWorkerOptions = {}
+  ) {
+    this.concurrency = Math.max(1, options.concurrency ?? 1);
+    this.visibilityTimeoutMs = options.visibilityTimeoutMs ?? 60_000;
+    this.pollIntervalMs = options.pollIntervalMs ?? 1_000;
+    this.maxPollIntervalMs = options.maxPollIntervalMs ?? 10_000;
+    this.priorityAgingMs = options.priorityAgingMs ?? 120_000;
+    this.schedulePoll(0);
+  }
+
+  on(event: "completed", listener: (job: PgJob<T>, result: unknown) => void): this;
+  on(event: "failed", listener: (job: PgJob<T>, error: Error) => void): this;
+  on(event: "completed" | "failed", listener: (...args: any[]) => void): this {
+    this.listeners[event].push(listener);
+    return this;
+  }
+
+  private schedulePoll(delay: number) {
+    if (!this.running || this.timer) return;
+    if (this.polling) {
+      // Picked up as soon as the current poll finishes
+      this.pollAgain = true;
+      return;
+    }
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      this.polling = this.poll();
+    }, delay);
+  }
+
+  private async poll() {
+    let next: number | null;
+    try {
+      next = await this.claim();
+    } finally {
+      this.polling = null;
+    }
+
+    if (this.pollAgain) {
+      this.pollAgain = false;
+      next = 0;
+    }
+    if (next !== null) this.schedulePoll(next);
+  }
+
+  /**
+   * Claim up to the free slots and start them
+   * Returns the delay until the next poll, or null when every slot is busy
+   * (a finishing job triggers the next poll).
+   */
+  private async claim(): Promise<number | null> {
+    const free = this.concurrency - this.active.size;
+    if (free <= 0) return null;
+
+    let claimed: any[] = [];
+    try {
+      const { data, error } = await supabaseAdmin.rpc("claim_jobs", {
+        p_queue: this.queue,
+        p_worker: this.id,
+        p_limit: free,
+        p_visibility_ms: this.visibilityTimeoutMs,
+        p_aging_ms: this.priorityAgingMs,
+      });
+      if (error) throw error;
+      claimed = (data as any[] | null) ?? [];
+    } catch (error) {
+      console.error(`[PgWorker ${this.queue}] Failed to claim jobs:`, error);
+    }
+
+    claimed.forEach((row) => {
+      const run = this.run({
+        id: row.id,
+        queue: row.queue,
+        name: row.name,
+        data: row.payload as T,
+        attemptsMade: row.attempts,
+        moveToDelayed: (timestamp) => this.defer(row.id, timestamp),
+      }).finally(() => {
+        this.active.delete(run);
+        // A slot opened up: look for more work right away
+        this.schedulePoll(0);
+      });
+      this.active.add(run);
+    });
+
+    if (claimed.length > 0) {
+      this.idlePolls = 0;
+      if (claimed.length === free) return null;
+      return this.pollIntervalMs;
+    }
+
+    this.idlePolls += 1;
+    return Math.min(
+      this.maxPollIntervalMs,
+      this.pollIntervalMs * 2 ** Math.min(this.idlePolls, 4)
+    );
+  }
+
+  /**
+   * Renew the job's lease until the returned function is called
+   */
+  private keepLease(job: PgJob<T>) {
+    let lost = false;
+    const timer = setInterval(() => {
+      void supabaseAdmin
+        .rpc("extend_job_lease", {
+          p_id: job.id,
+          p_worker: this.id,
+          p_visibility_ms: this.visibilityTimeoutMs,
+        })
+        .then(({ data, error }) => {
+          if (error) {
+            // Transient: the next beat retries well before the lease runs out
+            console.warn(`[PgWorker ${this.queue}] Failed to renew lease on job ${job.id}:`, error);
+          } else if (data !== true && !lost) {
+            lost = true;
+            // Expired (e.g. the event loop stalled) and possibly running
+            // elsewhere; complete_job will refuse this worker's result
+            console.error(`[PgWorker ${this.queue}] Lost lease on job ${job.id}`);
+          }
+        });
+    }, Math.max(1_000, Math.floor(this.visibilityTimeoutMs / 3)));
+
+    return () => clearInterval(timer);
+  }
+
+  private async defer(jobId: string, timestamp: number) {
+    const { data, error } = await supabaseAdmin.rpc("defer_job", {
+      p_id: jobId,
+      p_worker: this.id,
+      p_delay_ms: Math.max(0, Math.round(timestamp - Date.now())),
+    });
+    if (error) throw error;
+    if (data !== true) throw new Error(`Lease on job ${jobId} was lost before it could be deferred`);
+  }
+
+  private async run(job: PgJob<T>) {
+    const stopLease = this.keepLease(job);
+    let result: unknown;
+
+    try {
+      result = await this.processor(job);
+    } catch (error: any) {
+      stopLease();
+      // Already back in the queue via moveToDelayed (see DelayedError in setup.ts)
+      if (error?.name === "DelayedError") return;
+
+      await supabaseAdmin
+        .rpc("fail_job", {
+          p_id: job.id,
+          p_worker: this.id,
+          p_error: error?.message ?? String(error),
+          // See UnrecoverableError in setup.ts
+          p_retry: error?.name !== "UnrecoverableError",
+        })
+        .then(({ error: failError }) => {
+          if (failError) {
+            console.error(`[PgWorker ${this.queue}] Failed to record failure:`, failError);
+          }
+        });
+      this.listeners.failed.forEach((listener) => listener(job, error));
+      return;
+    }
+
+    stopLease();
+    const { data: completed, error } = await supabaseAdmin.rpc("complete_job", {
+      p_id: job.id,
+      p_worker: this.id,
+      p_result: result === undefined ? null : result,
+    });
+
+    if (error || completed !== true) {
+      // The lease was lost (or the write failed): the job is not recorded as
+      // done and will run again, so don't report it completed
+      const reason = error ?? new Error(`Lease on job ${job.id} was lost before completion`);
+      console.error(`[PgWorker ${this.queue}] Could not complete job ${job.id}:`, reason);
+      this.listeners.failed.forEach((listener) => listener(job, reason as Error));
+      return;
+    }
+
+    this.listeners.completed.forEach((listener) => listener(job, result));
+  }
+
+  /**
+   * Stop claiming new jobs and wait for in-flight ones to finish
+   */
+  async close() {
+    this.running = false;
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    // A claim in flight may still start jobs; wait for it before draining
+    if (this.polling) await this.polling.catch(() => undefined);
+    await Promise.allSettled(Array.from(this.active));
+  }
+}
@@ -0,0 +1,107 @@
+/**
+ * Job processors
+ * Run only in the worker process (workers/index.ts), on either queue driver.
+ */
+
+import { MAINTENANCE_TASKS } from "@/lib/queues/maintenance";
+import { DelayedError, UnrecoverableError } from "@/lib/queues/setup";
+import {
+  WhatsAppError,
+  getWhatsAppConfig,
+  reserveWhatsAppSend,
+  resolveInvoiceRecipient,
+  sendInvoiceWhatsApp,
+} from "@/lib/whatsapp";
+
+export async function processInvoiceJob(job: { data: { invoiceId: string } }) {
+  const { invoiceId } = job.data;
+  console.log(`[Invoice Worker] Generating PDF for invoice ${invoiceId}`);
+
+  try {
+    // Import dynamically so Puppeteer only loads when a job runs
+    const { generateInvoicePdf } = await import("@/lib/invoicePdf");
+    const result = await generateInvoicePdf(invoiceId);
+
+    console.log(`[Invoice Worker] PDF generated: ${result.pdfUrl}`);
+    return result;
+  } catch (error: any) {
+    console.error(`[Invoice Worker] Error:`, error);
+    throw error;
+  }
+}
+
+export async function processEmailJob(job: {
+  data: { to: string; subject: string; html: string; attachments?: any[] };
+}) {
+  const { to, subject } = job.data;
+  console.log(`[Email Worker] Sending email to ${to}`);
+
+  try {
+    // TODO: Implement email sending (Resend, SendGrid, etc.)
+    console.log(`[Email Worker] Email sent to ${to}: ${subject}`);
+    return { success: true, to, subject };
+  } catch (error: any) {
+    console.error(`[Email Worker] Error:`, error);
+    throw error;
+  }
+}
+
+/**
+ * Send an invoice notification over WhatsApp
+ * Paced by the shared account and per-recipient limits: when a limit says
+ * wait, the job is put back in the queue until then instead of sleeping
+ * while it holds its lease. Transient Graph errors are rethrown so the
+ * queue retries them with backoff, anything else fails the job for good.
+ */
+export async function processWhatsAppJob(
+  job: {
+    data: { invoiceId: string };
+    moveToDelayed(timestamp: number, token?: string): Promise<void>;
+  },
+  token?: string
+) {
+  const { invoiceId } = job.data;
+
+  const config = getWhatsAppConfig();
+  if (!config) {
+    // Leave the job retrying: it can succeed once the worker is configured
+    throw new Error("WhatsApp configuration missing on worker");
+  }
+
+  try {
+    const recipient = await resolveInvoiceRecipient(invoiceId, config);
+
+    const waitMs = await reserveWhatsAppSend(config, recipient.to);
+    if (waitMs > 0) {
+      await job.moveToDelayed(Date.now() + waitMs, token);
+      throw new DelayedError();
+    }
+
+    const result = await sendInvoiceWhatsApp(invoiceId, config, recipient);
+    console.log(`[WhatsApp Worker] Sent invoice ${invoiceId} to ${result.to}`);
+    return result;
+  } catch (error: any) {
+    if (error instanceof DelayedError) throw error;
+
+    console.error(`[WhatsApp Worker] Error for invoice ${invoiceId}:`, error?.message);
+    if (error instanceof WhatsAppError && !error.retryable) {
+      throw new UnrecoverableError(error.message);
+    }
+    throw error;
+  }
+}
+
+/**
+ * Run a scheduled maintenance task (job name = task name)
+ */
+export async function processMaintenanceJob(job: { name: string; data: { slot: string } }) {
+  const task = MAINTENANCE_TASKS[job.name];
+  if (!task) {
+    throw new UnrecoverableError(`Unknown maintenance task: ${job.name}`);
+  }
+
+  console.log(`[Maintenance Worker] Running ${job.name} (slot ${job.data.slot})`);
+  const result = await task();
+  console.log(`[Maintenance Worker] ${job.name} done:`, result);
+  return result;
+}
@@ -0,0 +1,160 @@
+/**
+ * Cron-style scheduler for recurring maintenance
+ *
+ * Runs in every worker process; a Postgres lease elects one leader, and
+ * only the leader enqueues. For each schedule the leader computes the most
+ * recent cron slot and, if it is newer than the last one recorded in
+ * scheduled_runs, enqueues the task on the maintenance queue (job id
+ * derived from the slot) and records the slot. Runs missed while no
+ * scheduler was up are caught up once on the next tick, not once per
+ * missed slot.
+ *
+ * Environment:
+ * - SCHEDULER_UTC_OFFSET_MINUTES  offset cron times are written in (default 330, IST)
+ */
+
+import { hostname } from "os";
+import { randomUUID } from "crypto";
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import { parseCron, previousCronSlot } from "@/lib/queues/cron";
+import { queueMaintenanceTask } from "@/lib/queues/setup";
+import { MAINTENANCE_TASKS, type MaintenanceTask } from "@/lib/queues/maintenance";
+
+interface ScheduleDefinition {
+  task: MaintenanceTask;
+  cron: string;
+}
+
+export const SCHEDULES: ScheduleDefinition[] = [
+  { task: "mark-overdue-invoices", cron: "5 * * * *" },
+  { task: "refresh-ar-summary", cron: "*/15 * * * *" },
+  { task: "refresh-daily-summary", cron: "0,30 7-21 * * *" },
+  { task: "cleanup-invoice-pdfs", cron: "30 3 * * *" },
+  { task: "prune-queue-jobs", cron: "0 4 * * *" },
+  { task: "prune-webhook-inbox", cron: "15 4 * * *" },
+  { task: "maintain-audit-logs", cron: "15 0 1 * *" },
+];
+
+const LEASE_NAME = "maintenance-scheduler";
+const UTC_OFFSET_MINUTES = Number(process.env.SCHEDULER_UTC_OFFSET_MINUTES ?? 330);
+
+interface SchedulerOptions {
+  // How often to check for due slots
+  tickMs?: number;
+}
+
+/**
+ * Start the scheduler loop; close() stops it and gives up leadership
+ */
+export function startScheduler(options: SchedulerOptions = {}) {
+  const tickMs = options.tickMs ?? 30_000;
+  const holder = `${hostname()}-${process.pid}-${randomUUID().slice(0, 8)}`;
+  const schedules = SCHEDULES.filter((schedule) => schedule.task in MAINTENANCE_TASKS).map(
+    (schedule) => ({ ...schedule, parsed: parseCron(schedule.cron) })
+  );
+
+  let running = true;
+  let leader = false;
+  let timer: ReturnType<typeof setTimeout> | null = null;
+  let current: Promise<void> | null = null;
+
+  async function tick() {
+    const { data: acquired, error: leaseError } = await supabaseAdmin.rpc(
+      "acquire_scheduler_lease",
+      {
+        p_name: LEASE_NAME,
+        p_holder: holder,
+        // Survives a couple of slow ticks before another instance takes over
+        p_ttl_ms: tickMs * 3,
+      }
+    );
+    if (leaseError) throw leaseError;
+
+    if (acquired !== true) {
+      if (leader) console.log("[Scheduler] Lost leadership");
+      leader = false;
+      return;
+    }
+    if (!leader) console.log(`[Scheduler] Leader: ${holder}`);
+    leader = true;
+
+    const { data: runs, error: runsError } = await supabaseAdmin
+      .from("scheduled_runs")
+      .select("name, last_slot_at");
+    if (runsError) throw runsError;
+
+    const lastSlots = new Map(
+      ((runs as any[] | null) ?? []).map((run) => [run.name as string, Date.parse(run.last_slot_at)])
+    );
+    const now = new Date();
+
+    for (const schedule of schedules) {
+      const slot = previousCronSlot(schedule.parsed, now, UTC_OFFSET_MINUTES);
+      if (!slot || slot.getTime() <= (lastSlots.get(schedule.task) ?? -Infinity)) continue;
+
+      try {
+        // Enqueue first: the slot is only recorded once the job exists, and
+        // the slot-derived job id makes a repeat enqueue harmless
+        const job = await queueMaintenanceTask(schedule.task, slot);
+
+        const { data: claimed, error: claimError } = await supabaseAdmin.rpc(
+          "claim_schedule_slot",
+          { p_name: schedule.task, p_slot: slot.toISOString() }
+        );
+        if (claimError) throw claimError;
+
+        if (claimed === true) {
+          console.log(`[Scheduler] Queued ${schedule.task} for ${slot.toISOString()}`);
+
+          // The slot is already claimed; a missing job id only affects
+          // diagnostics, so it is reported rather than retried
+          const { error: jobIdError } = await supabaseAdmin
+            .from("scheduled_runs")
+            .update({ last_job_id: String(job.id) })
+            .eq("name", schedule.task);
+          if (jobIdError) {
+            console.warn(
+              `[Scheduler] Could not record job ${job.id} for ${schedule.task}:`,
+              jobIdError.message
+            );
+          }
+        }
+      } catch (error: any) {
+        console.error(`[Scheduler] Failed to queue ${schedule.task}:`, error?.message ?? error);
+      }
+    }
+  }
+
+  const schedule = (delay: number) => {
+    if (!running) return;
+    timer = setTimeout(() => {
+      timer = null;
+      current = tick()
+        .catch((error) => console.error("[Scheduler] Tick failed:", error?.message ?? error))
+        .finally(() => {
+          current = null;
+          schedule(tickMs);
+        });
+    }, delay);
+  };
+
+  schedule(0);
+
+  return {
+    async close() {
+      running = false;
+      if (timer) {
+        clearTimeout(timer);
+        timer = null;
+      }
+      if (current) await current;
+      if (leader) {
+        // Hand over right away instead of waiting for the lease to expire
+        await supabaseAdmin.rpc("release_scheduler_lease", {
+          p_name: LEASE_NAME,
+          p_holder: holder,
+        });
+      }
+    },
+  };
+}
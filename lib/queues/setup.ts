@@ -1,17 +1,20 @@
 /**
  * Background Job Queue System
  * 
- * OPTIONAL FEATURE - Requires: npm install bullmq ioredis
- * 
- * If packages are not installed, functions will return error messages
- * but won't break the build.
+ * Drivers:
+ * - BullMQ on Redis - Requires: npm install bullmq ioredis, and REDIS_URL
+ * - Postgres `jobs` table (lib/queues/pg-queue.ts) - used when Redis is not
+ *   configured but the Supabase service role key is
+ *
+ * Set QUEUE_DRIVER=bullmq|postgres to force one. With neither available,
+ * the queue helpers throw.
  */
 
 let Queue: any;
 let Worker: any;
-let QueueEvents: any;
-let Job: any;
 let IORedis: any;
+let BullUnrecoverableError: any;
+let BullDelayedError: any;
 
 // Try to import optional dependencies
 let packagesAvailable = false;
@@ -19,8 +22,8 @@ try {
   const bullmq = require("bullmq");
   Queue = bullmq.Queue;
   Worker = bullmq.Worker;
-  QueueEvents = bullmq.QueueEvents;
-  Job = bullmq.Job;
+  BullUnrecoverableError = bullmq.UnrecoverableError;
+  BullDelayedError = bullmq.DelayedError;
   IORedis = require("ioredis");
   packagesAvailable = true;
 } catch (error) {
@@ -47,17 +50,85 @@ if (queueConfigured) {
       return Math.min(times * 100, 3000);
     },
   });
-} else if (packagesAvailable) {
+}
+
+const pgQueueConfigured =
+  !!process.env.NEXT_PUBLIC_SUPABASE_URL && !!process.env.SUPABASE_SERVICE_ROLE_KEY;
+
+export type QueueDriver = "bullmq" | "postgres";
+
+function selectQueueDriver(): QueueDriver | null {
+  const requested = process.env.QUEUE_DRIVER;
+  if (requested === "postgres") return pgQueueConfigured ? "postgres" : null;
+  if (requested === "bullmq") return queueConfigured ? "bullmq" : null;
+  if (queueConfigured) return "bullmq";
+  if (pgQueueConfigured) return "postgres";
+  return null;
+}
+
+export const queueDriver = selectQueueDriver();
+
+if (!queueDriver) {
   console.warn(
-    "Background job queue packages installed but REDIS_URL not set. Queue system is disabled."
+    "No background job queue configured (REDIS_URL or SUPABASE_SERVICE_ROLE_KEY). Queue system is disabled."
   );
+} else if (queueDriver === "postgres") {
+  console.warn("Redis queue not configured. Using the Postgres job queue.");
+}
+
+// Loaded lazily: it imports supabaseAdmin, which requires the service key
+const { PgQueue, PgWorker } =
+  queueDriver === "postgres"
+    ? (require("./pg-queue") as typeof import("./pg-queue"))
+    : { PgQueue: null, PgWorker: null };
+
+export const QUEUE_NAMES = {
+  invoice: "invoice-generation",
+  email: "email-notifications",
+  whatsapp: "whatsapp-notifications",
+  maintenance: "scheduled-maintenance",
+} as const;
+
+class QueueUnrecoverableError extends Error {
+  constructor(message?: string) {
+    super(message);
+    this.name = "UnrecoverableError";
+  }
+}
+
+/**
+ * Throw from a processor to fail the job without further attempts
+ * BullMQ's own class on that driver; the Postgres worker checks the name.
+ */
+export const UnrecoverableError: typeof QueueUnrecoverableError =
+  queueDriver === "bullmq" && BullUnrecoverableError
+    ? BullUnrecoverableError
+    : QueueUnrecoverableError;
+
+class QueueDelayedError extends Error {
+  constructor(message?: string) {
+    super(message);
+    this.name = "DelayedError";
+  }
 }
 
+/**
+ * Throw from a processor after job.moveToDelayed(timestamp, token): the job
+ * goes back to the queue until then without using up an attempt, and is
+ * neither completed nor failed. BullMQ's own class on that driver.
+ */
+export const DelayedError: typeof QueueDelayedError =
+  queueDriver === "bullmq" && BullDelayedError ? BullDelayedError : QueueDelayedError;
+
 // ========================================
 // Invoice PDF Generation Queue
 // ========================================
 
-export const invoiceQueue = queueConfigured && Queue ? new Queue("invoice-generation", {
+export const invoiceQueue = queueDriver === "postgres" && PgQueue
+  ? new PgQueue(QUEUE_NAMES.invoice, {
+      defaultJobOptions: { attempts: 3, backoff: { delay: 2000 } },
+    })
+  : queueDriver === "bullmq" && Queue ? new Queue(QUEUE_NAMES.invoice, {
   connection,
   defaultJobOptions: {
     attempts: 3,
@@ -74,39 +145,15 @@ export const invoiceQueue = queueConfigured && Queue ? new Queue("invoice-genera
   },
 }) : null;
 
-export const invoiceWorker = queueConfigured && Worker ? new Worker(
-  "invoice-generation",
-  async (job: any) => {
-    const { invoiceId } = job.data;
-    console.log(`[Invoice Worker] Generating PDF for invoice ${invoiceId}`);
-
-    try {
-      // Import dynamically to avoid bundling in client
-      const { generateInvoicePdf } = await import("@/lib/invoicePdf");
-      const result = await generateInvoicePdf(invoiceId);
-
-      console.log(`[Invoice Worker] PDF generated: ${result.pdfUrl}`);
-      return result;
-    } catch (error: any) {
-      console.error(`[Invoice Worker] Error:`, error);
-      throw error;
-    }
-  },
-  {
-    connection,
-    concurrency: 5, // Process 5 jobs simultaneously
-    limiter: {
-      max: 10,
-      duration: 1000, // Max 10 jobs per second
-    },
-  }
-) : null;
-
 // ========================================
 // Email Queue
 // ========================================
 
-export const emailQueue = queueConfigured && Queue ? new Queue("email-notifications", {
+export const emailQueue = queueDriver === "postgres" && PgQueue
+  ? new PgQueue(QUEUE_NAMES.email, {
+      defaultJobOptions: { attempts: 3, backoff: { delay: 3000 } },
+    })
+  : queueDriver === "bullmq" && Queue ? new Queue(QUEUE_NAMES.email, {
   connection,
   defaultJobOptions: {
     attempts: 3,
@@ -117,92 +164,259 @@ export const emailQueue = queueConfigured && Queue ? new Queue("email-notificati
   },
 }) : null;
 
-export const emailWorker = queueConfigured && Worker ? new Worker(
-  "email-notifications",
-  async (job: any) => {
-    const { to, subject, html, attachments } = job.data;
-    console.log(`[Email Worker] Sending email to ${to}`);
-
-    try {
-      // TODO: Implement email sending (Resend, SendGrid, etc.)
-      console.log(`[Email Worker] Email sent to ${to}: ${subject}`);
-      return { success: true, to, subject };
-    } catch (error: any) {
-      console.error(`[Email Worker] Error:`, error);
-      throw error;
-    }
-  },
-  {
-    connection,
-    concurrency: 10,
-  }
-) : null;
-
 // ========================================
-// Event Listeners
+// WhatsApp Notification Queue
 // ========================================
 
-if (queueConfigured && QueueEvents) {
-  const invoiceEvents = new QueueEvents("invoice-generation", { connection });
-  const emailEvents = new QueueEvents("email-notifications", { connection });
+// Graph throttling and outages clear up within minutes; retry patiently
+export const whatsappQueue = queueDriver === "postgres" && PgQueue
+  ? new PgQueue(QUEUE_NAMES.whatsapp, {
+      defaultJobOptions: { attempts: 6, backoff: { delay: 5000 } },
+    })
+  : queueDriver === "bullmq" && Queue ? new Queue(QUEUE_NAMES.whatsapp, {
+  connection,
+  defaultJobOptions: {
+    attempts: 6,
+    backoff: {
+      type: "exponential",
+      delay: 5000,
+    },
+    removeOnComplete: {
+      count: 1000,
+    },
+    removeOnFail: {
+      count: 500,
+    },
+  },
+}) : null;
 
-  invoiceEvents.on("completed", ({ jobId, returnvalue }: { jobId: string; returnvalue: any }) => {
-    console.log(`✅ Invoice job ${jobId} completed:`, returnvalue);
-  });
+// ========================================
+// Scheduled Maintenance Queue
+// ========================================
 
-  invoiceEvents.on("failed", ({ jobId, failedReason }: { jobId: string; failedReason: string }) => {
-    console.error(`❌ Invoice job ${jobId} failed:`, failedReason);
-  });
+// Fed by the scheduler (lib/queues/scheduler.ts); tasks are idempotent
+export const maintenanceQueue = queueDriver === "postgres" && PgQueue
+  ? new PgQueue(QUEUE_NAMES.maintenance, {
+      defaultJobOptions: { attempts: 3, backoff: { delay: 10000 } },
+    })
+  : queueDriver === "bullmq" && Queue ? new Queue(QUEUE_NAMES.maintenance, {
+  connection,
+  defaultJobOptions: {
+    attempts: 3,
+    backoff: {
+      type: "exponential",
+      delay: 10000,
+    },
+    removeOnComplete: {
+      count: 200,
+    },
+    removeOnFail: {
+      count: 100,
+    },
+  },
+}) : null;
 
-  emailEvents.on("completed", ({ jobId }: { jobId: string }) => {
-    console.log(`✅ Email job ${jobId} sent`);
-  });
+// ========================================
+// Workers
+// ========================================
 
-  emailEvents.on("failed", ({ jobId, failedReason }: { jobId: string; failedReason: string }) => {
-    console.error(`❌ Email job ${jobId} failed:`, failedReason);
-  });
+interface QueueWorkerOptions {
+  concurrency: number;
+  // Postgres driver: lease length before a job is handed to another worker
+  visibilityTimeoutMs?: number;
+  // BullMQ driver: max jobs started per duration window, across all workers
+  limiter?: { max: number; duration: number };
 }
 
 // ========================================
-// Graceful Shutdown
+// Priority Lanes
 // ========================================
 
-async function gracefulShutdown() {
-  if (!queueConfigured) return;
-  
-  console.log("Closing queue workers...");
-  const closers = [];
-  if (invoiceWorker) closers.push(invoiceWorker.close());
-  if (emailWorker) closers.push(emailWorker.close());
-  
-  await Promise.all(closers);
-  if (connection) await connection.quit();
-  console.log("Queue workers closed");
+export type JobLane = "interactive" | "bulk";
+
+// Lower runs first on both drivers
+export const JOB_PRIORITIES: Record<JobLane, number> = {
+  interactive: 1,
+  bulk: 2,
+};
+
+// How long a job may wait before it ranks with the lane above it. Postgres
+// applies this in claim_jobs; BullMQ via promoteAgedJobs().
+export const PRIORITY_AGING_MS = Number(process.env.QUEUE_PRIORITY_AGING_MS) || 120_000;
+
+/**
+ * Promote prioritized jobs that have waited longer than PRIORITY_AGING_MS
+ * (BullMQ driver; no-op on Postgres, whose claim order already ages jobs)
+ * The worker process runs this periodically so month-end bulk work keeps
+ * moving while interactive requests jump the queue.
+ */
+export async function promoteAgedJobs(queue: any) {
+  if (queueDriver !== "bullmq" || !queue) return 0;
+
+  const jobs: any[] = await queue.getJobs(["prioritized"], 0, 499, true);
+  const now = Date.now();
+  let promoted = 0;
+
+  for (const job of jobs) {
+    const priority = job.opts?.priority ?? 0;
+    if (priority <= JOB_PRIORITIES.interactive) continue;
+    if (now - job.timestamp < PRIORITY_AGING_MS) continue;
+
+    await job.changePriority({ priority: priority - 1 });
+    promoted += 1;
+  }
+
+  return promoted;
 }
 
-if (queueConfigured) {
-  process.on("SIGTERM", gracefulShutdown);
-  process.on("SIGINT", gracefulShutdown);
+/**
+ * Add a job, coalescing it with an existing job of the same id
+ * - waiting: returned as is, moved to the more urgent lane if needed
+ * - active / completed: returned as is (same id means same content)
+ * - failed: replaced, so a retry is not silently dropped
+ * The Postgres driver does the same in enqueue_job, except that finished
+ * jobs never block a new one.
+ */
+async function addCoalesced(
+  queue: any,
+  name: string,
+  data: unknown,
+  opts: { jobId: string; priority: number }
+) {
+  if (queueDriver === "bullmq") {
+    const existing = await queue.getJob(opts.jobId);
+    if (existing) {
+      const state = await existing.getState();
+      if (state === "failed") {
+        await existing.remove();
+      } else {
+        const current = existing.opts?.priority ?? 0;
+        if (
+          (state === "waiting" || state === "prioritized" || state === "delayed") &&
+          (current === 0 || opts.priority < current)
+        ) {
+          await existing.changePriority({ priority: opts.priority });
+        }
+        return existing;
+      }
+    }
+  }
+
+  return await queue.add(name, data, opts);
+}
+
+/**
+ * Create a worker for a queue on the configured driver
+ * Only the worker process (workers/index.ts) should call this; the web tier
+ * just enqueues. Both drivers emit "completed" and "failed" and drain
+ * in-flight jobs on close().
+ */
+export function createQueueWorker(
+  queueName: string,
+  processor: (job: any, token?: string) => Promise<unknown>,
+  options: QueueWorkerOptions
+) {
+  if (queueDriver === "postgres" && PgWorker) {
+    return new PgWorker(queueName, processor, {
+      concurrency: options.concurrency,
+      visibilityTimeoutMs: options.visibilityTimeoutMs,
+      priorityAgingMs: PRIORITY_AGING_MS,
+    });
+  }
+
+  if (queueDriver === "bullmq" && Worker) {
+    return new Worker(queueName, processor, {
+      connection,
+      concurrency: options.concurrency,
+      limiter: options.limiter,
+    });
+  }
+
+  return null;
+}
+
+/**
+ * Close the shared Redis connection (BullMQ driver)
+ */
+export async function closeQueueConnection() {
+  if (connection) await connection.quit();
 }
 
 // ========================================
 // Helper Functions
 // ========================================
 
-export async function queueInvoiceGeneration(invoiceId: string) {
-  if (!queueConfigured || !invoiceQueue) {
+/**
+ * Queue an invoice PDF render
+ * Deduplicated on the invoice's content fingerprint: requests for an
+ * unchanged invoice coalesce into the pending (or, on BullMQ, finished) job,
+ * while any change to the rendered data queues a fresh render.
+ */
+export async function queueInvoiceGeneration(
+  invoiceId: string,
+  lane: JobLane = "interactive"
+) {
+  if (!invoiceQueue) {
     throw new Error(
-      "Background job queue not available. Install packages: npm install bullmq ioredis"
+      "Background job queue not available. Set REDIS_URL (with bullmq ioredis) or SUPABASE_SERVICE_ROLE_KEY"
     );
   }
-  
-  return await invoiceQueue.add(
-    "generate-pdf",
-    { invoiceId },
-    {
-      jobId: `invoice-${invoiceId}`, // Prevent duplicates
-    }
-  );
+
+  // Loaded lazily: it imports supabaseAdmin, which requires the service key
+  const { getInvoiceFingerprint } = await import("@/lib/invoice-fingerprint");
+  const fingerprint = await getInvoiceFingerprint(invoiceId);
+
+  return await addCoalesced(invoiceQueue, "generate-pdf", { invoiceId, fingerprint }, {
+    jobId: `invoice-${invoiceId}-${fingerprint}`,
+    priority: JOB_PRIORITIES[lane],
+  });
+}
+
+/**
+ * Queue PDF renders for a batch of invoices in the bulk lane
+ * Fingerprints are computed in one query for the whole batch, and on
+ * Postgres the jobs are added in one more. Ids with no invoice are skipped,
+ * so the result may be shorter than the input.
+ */
+export async function queueInvoiceGenerations(invoiceIds: string[]) {
+  if (!invoiceQueue) {
+    throw new Error(
+      "Background job queue not available. Set REDIS_URL (with bullmq ioredis) or SUPABASE_SERVICE_ROLE_KEY"
+    );
+  }
+
+  const { getInvoiceFingerprints } = await import("@/lib/invoice-fingerprint");
+  const fingerprints = await getInvoiceFingerprints(invoiceIds);
+
+  const jobs = invoiceIds
+    .filter((invoiceId) => fingerprints.has(invoiceId))
+    .map((invoiceId) => {
+      const fingerprint = fingerprints.get(invoiceId)!;
+      return {
+        invoiceId,
+        data: { invoiceId, fingerprint },
+        opts: { jobId: `invoice-${invoiceId}-${fingerprint}`, priority: JOB_PRIORITIES.bulk },
+      };
+    });
+
+  if (queueDriver === "postgres") {
+    // enqueue_job coalesces duplicates itself
+    const added = await invoiceQueue.addBulk(
+      jobs.map(({ data, opts }) => ({ name: "generate-pdf", data, opts }))
+    );
+    return jobs.map(({ invoiceId }, index) => ({ invoiceId, job: added[index] }));
+  }
+
+  // BullMQ coalescing inspects each existing job; keep the fan-out bounded
+  const queued: { invoiceId: string; job: any }[] = [];
+  for (let i = 0; i < jobs.length; i += 20) {
+    const chunk = jobs.slice(i, i + 20);
+    const added = await Promise.all(
+      chunk.map(({ data, opts }) => addCoalesced(invoiceQueue, "generate-pdf", data, opts))
+    );
+    chunk.forEach(({ invoiceId }, index) => queued.push({ invoiceId, job: added[index] }));
+  }
+  return queued;
 }
 
 export async function queueEmail(data: {
@@ -211,14 +425,72 @@ export async function queueEmail(data: {
   html: string;
   attachments?: any[];
 }) {
-  if (!queueConfigured || !emailQueue) {
+  if (!emailQueue) {
     throw new Error(
-      "Background job queue not available. Install packages: npm install bullmq ioredis"
+      "Background job queue not available. Set REDIS_URL (with bullmq ioredis) or SUPABASE_SERVICE_ROLE_KEY"
     );
   }
   
   return await emailQueue.add("send-email", data);
 }
 
+export async function queueWhatsAppInvoice(invoiceId: string) {
+  if (!whatsappQueue) {
+    throw new Error(
+      "Background job queue not available. Set REDIS_URL (with bullmq ioredis) or SUPABASE_SERVICE_ROLE_KEY"
+    );
+  }
+
+  return await whatsappQueue.add(
+    "send-invoice",
+    { invoiceId },
+    { priority: JOB_PRIORITIES.interactive }
+  );
+}
+
+/**
+ * Queue WhatsApp notifications for many invoices in one round trip (BullMQ)
+ * The worker paces the sends; see reserveWhatsAppSend in lib/whatsapp.ts.
+ */
+export async function queueWhatsAppInvoices(invoiceIds: string[]) {
+  if (!whatsappQueue) {
+    throw new Error(
+      "Background job queue not available. Set REDIS_URL (with bullmq ioredis) or SUPABASE_SERVICE_ROLE_KEY"
+    );
+  }
+
+  return await whatsappQueue.addBulk(
+    invoiceIds.map((invoiceId) => ({
+      name: "send-invoice",
+      data: { invoiceId },
+      opts: { priority: JOB_PRIORITIES.bulk },
+    }))
+  );
+}
+
+/**
+ * Queue a maintenance task for one scheduled slot
+ * The job id is derived from the slot, but it only dedupes against a job
+ * that is still queued or running (Postgres) or still retained (BullMQ); a
+ * slot enqueued again after its job finished runs again. The scheduler
+ * records each slot once, and every task must be idempotent.
+ */
+export async function queueMaintenanceTask(task: string, slot: Date) {
+  if (!maintenanceQueue) {
+    throw new Error(
+      "Background job queue not available. Set REDIS_URL (with bullmq ioredis) or SUPABASE_SERVICE_ROLE_KEY"
+    );
+  }
+
+  return await maintenanceQueue.add(
+    task,
+    { task, slot: slot.toISOString() },
+    {
+      jobId: `${task}-${slot.getTime()}`,
+      priority: JOB_PRIORITIES.bulk,
+    }
+  );
+}
+
 // Export availability flag for checking
-export const queueSystemAvailable = queueConfigured;
+export const queueSystemAvailable = queueDriver !== null;
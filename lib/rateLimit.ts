@@ -1,29 +1,36 @@
 /**
  * Rate Limiting System
- * 
- * OPTIONAL FEATURE - Requires: npm install @upstash/ratelimit @upstash/redis
- * 
- * If packages are not installed, rate limiting will be disabled
- * but won't break the build.
+ *
+ * Requests are decided locally by an in-process token bucket, so the hot path
+ * never waits on the network. Consumed tokens are synced to Redis in batches
+ * in the background; the shared per-window totals that come back let every
+ * instance see what the others have used.
+ *
+ * OPTIONAL FEATURE - Cross-instance sync requires: npm install @upstash/redis
+ *
+ * Without the package (or UPSTASH_REDIS_REST_URL) limits are enforced per
+ * instance only, which is still a real limit rather than allow-all.
+ *
+ * Policies are budgets of cost units rather than request counts: routes
+ * declare what a call costs, authenticated callers get the budget of their
+ * role's tier, and `burst` lets an idle caller briefly exceed the steady rate.
  */
 
 import { NextResponse } from "next/server";
+import { readUserContextHeaders } from "@/lib/user-context";
 
-let Ratelimit: any;
 let Redis: any;
 
 // Try to import optional dependencies
 let packagesAvailable = false;
 try {
-  const ratelimit = require("@upstash/ratelimit");
   const redis = require("@upstash/redis");
-  Ratelimit = ratelimit.Ratelimit;
   Redis = redis.Redis;
   packagesAvailable = true;
 } catch (error) {
   console.warn(
-    "⚠️  Rate limiting packages not installed. " +
-    "Run: npm install @upstash/ratelimit @upstash/redis"
+    "⚠️  @upstash/redis not installed, rate limits apply per instance only. " +
+    "Run: npm install @upstash/redis"
   );
 }
 
@@ -35,127 +42,403 @@ const redis = packagesAvailable && process.env.UPSTASH_REDIS_REST_URL && Redis
     })
   : null;
 
-// Create rate limiters for different use cases
+interface RateLimitTier {
+  // Cost units refilled per window
+  limit: number;
+  // Extra units an idle caller may spend at once on top of `limit`
+  burst?: number;
+}
+
+interface RateLimitPolicy extends RateLimitTier {
+  windowMs: number;
+  prefix: string;
+  // Per-role budgets for authenticated callers; others get the base tier
+  tiers?: Partial<Record<string, RateLimitTier>>;
+  // Read the shared window total from Redis before the first decision in
+  // each window, instead of trusting a new bucket's full capacity
+  seedFromRemote?: boolean;
+}
+
+// Rate limit policies for different use cases
 export const rateLimiters = {
-  // API endpoints - 10 requests per 10 seconds
-  api: redis
-    ? new Ratelimit({
-        redis,
-        limiter: Ratelimit.slidingWindow(10, "10 s"),
-        analytics: true,
-        prefix: "@ratelimit/api",
-      })
-    : null,
-
-  // Authentication - 5 attempts per minute
-  auth: redis
-    ? new Ratelimit({
-        redis,
-        limiter: Ratelimit.slidingWindow(5, "1 m"),
-        analytics: true,
-        prefix: "@ratelimit/auth",
-      })
-    : null,
+  // API endpoints - 10 units per 10 seconds, more for signed-in staff
+  api: {
+    limit: 10,
+    burst: 5,
+    windowMs: 10_000,
+    prefix: "@ratelimit/api",
+    tiers: {
+      viewer: { limit: 20, burst: 10 },
+      operator: { limit: 40, burst: 20 },
+      manager: { limit: 40, burst: 20 },
+      admin: { limit: 80, burst: 40 },
+    },
+  },
+
+  // Authentication - 5 attempts per minute. Seeded from Redis, so an
+  // attacker spreading attempts across instances, or waiting for their
+  // bucket to be evicted, does not get a fresh budget on each.
+  auth: { limit: 5, windowMs: 60_000, prefix: "@ratelimit/auth", seedFromRemote: true },
 
   // Public tracking - 30 requests per minute
-  tracking: redis
-    ? new Ratelimit({
-        redis,
-        limiter: Ratelimit.slidingWindow(30, "1 m"),
-        analytics: true,
-        prefix: "@ratelimit/tracking",
-      })
-    : null,
+  tracking: { limit: 30, burst: 10, windowMs: 60_000, prefix: "@ratelimit/tracking" },
 
   // File uploads - 5 uploads per 5 minutes
-  uploads: redis
-    ? new Ratelimit({
-        redis,
-        limiter: Ratelimit.slidingWindow(5, "5 m"),
-        analytics: true,
-        prefix: "@ratelimit/uploads",
-      })
-    : null,
-};
+  uploads: { limit: 5, windowMs: 300_000, prefix: "@ratelimit/uploads" },
+
+  // Invoice PDF rendering - 30 units per minute, kept apart from `api` so
+  // heavy generation cannot starve cheap reads
+  invoicePdf: {
+    limit: 30,
+    burst: 10,
+    windowMs: 60_000,
+    prefix: "@ratelimit/invoice-pdf",
+    tiers: {
+      operator: { limit: 60, burst: 20 },
+      admin: { limit: 120, burst: 40 },
+    },
+  },
+
+  // Bulk invoice PDF queueing - charged one unit per invoice, 1000 invoices
+  // per 10 minutes (a month-end run), more for admins
+  invoicePdfBulk: {
+    limit: 1000,
+    windowMs: 600_000,
+    prefix: "@ratelimit/invoice-pdf-bulk",
+    tiers: {
+      admin: { limit: 2000 },
+    },
+  },
+} satisfies Record<string, RateLimitPolicy>;
+
+export type RateLimiterType = keyof typeof rateLimiters;
+
+// Request cost weights shared by routes
+export const RATE_LIMIT_COSTS = {
+  read: 1,
+  write: 2,
+  queuedPdf: 3,
+  bulk: 5,
+  syncPdf: 10,
+} as const;
+
+export interface RateLimitOptions {
+  // Cost units charged per request (default 1)
+  cost?: number | ((req: Request) => number);
+  getIdentifier?: (req: Request) => string;
+}
+
+export interface RateLimitCheckOptions {
+  cost?: number;
+  // Role of an authenticated caller, selects the policy tier
+  role?: string | null;
+}
+
+export interface RateLimitResult {
+  success: boolean;
+  limit: number;
+  remaining: number;
+  reset: number;
+}
+
+// How often local consumption is pushed to Redis
+const SYNC_INTERVAL_MS = 1_000;
+// Upper bound on tracked identifiers per instance (least recently used
+// buckets are evicted beyond it)
+const MAX_BUCKETS = 10_000;
+
+interface Bucket {
+  prefix: string;
+  windowMs: number;
+  // Units per window, and the bucket capacity (limit + burst)
+  limit: number;
+  capacity: number;
+  identifier: string;
+  tokens: number;
+  updatedAt: number;
+  // Tokens consumed here but not yet pushed to Redis
+  pending: number;
+  // Shared total for `remoteWindow` as last reported by Redis
+  remoteCount: number;
+  remoteWindow: number;
+}
+
+// Map iteration order is insertion order, so re-inserting on use keeps the
+// least recently used bucket first
+const buckets = new Map<string, Bucket>();
+let syncTimer: ReturnType<typeof setTimeout> | null = null;
+
+function refill(bucket: Bucket, now: number) {
+  const elapsed = now - bucket.updatedAt;
+  if (elapsed > 0) {
+    bucket.tokens = Math.min(
+      bucket.capacity,
+      bucket.tokens + (elapsed * bucket.limit) / bucket.windowMs
+    );
+    bucket.updatedAt = now;
+  }
+}
+
+function resolveTier(policy: RateLimitPolicy, role?: string | null) {
+  const tier = (role && policy.tiers?.[role]) || policy;
+  return { limit: tier.limit, capacity: tier.limit + (tier.burst ?? 0) };
+}
+
+function getBucket(
+  policy: RateLimitPolicy,
+  identifier: string,
+  role: string | null | undefined,
+  now: number
+) {
+  const key = `${policy.prefix}:${identifier}`;
+  const { limit, capacity } = resolveTier(policy, role);
+  let bucket = buckets.get(key);
+
+  if (bucket) {
+    buckets.delete(key);
+    buckets.set(key, bucket);
+  } else {
+    if (buckets.size >= MAX_BUCKETS) {
+      evictLeastRecentlyUsed();
+    }
+    bucket = {
+      prefix: policy.prefix,
+      windowMs: policy.windowMs,
+      limit,
+      capacity,
+      identifier,
+      tokens: capacity,
+      updatedAt: now,
+      pending: 0,
+      remoteCount: 0,
+      remoteWindow: -1,
+    };
+    buckets.set(key, bucket);
+  }
+
+  refill(bucket, now);
+
+  // A role change moves the caller to another tier
+  bucket.limit = limit;
+  bucket.capacity = capacity;
+  bucket.tokens = Math.min(bucket.tokens, capacity);
+  return bucket;
+}
+
+// O(1) per insert. The evicted caller starts over with a full bucket (for
+// seedFromRemote policies, minus the window's shared total), and
+// consumption not yet synced (at most one sync interval) is dropped; the
+// least recently used bucket has almost always refilled and synced by then.
+function evictLeastRecentlyUsed() {
+  const oldest = buckets.keys().next().value;
+  if (oldest !== undefined) buckets.delete(oldest);
+}
+
+/**
+ * Load the shared total for `window` into a bucket that has not seen it yet
+ * Failures leave the bucket as is, like a failed sync.
+ */
+async function seedBucket(bucket: Bucket, window: number) {
+  if (!redis || bucket.remoteWindow >= window) return;
+
+  try {
+    const total = Number(
+      (await redis.get(`${bucket.prefix}:${bucket.identifier}:${window}`)) ?? 0
+    );
+    if (Number.isFinite(total) && window >= bucket.remoteWindow) {
+      bucket.remoteCount = total;
+      bucket.remoteWindow = window;
+    }
+  } catch (error) {
+    console.warn("Rate limit seed from Redis failed:", error);
+  }
+}
+
+function scheduleSync() {
+  if (!redis || syncTimer) return;
+  syncTimer = setTimeout(() => {
+    syncTimer = null;
+    void syncBuckets();
+  }, SYNC_INTERVAL_MS);
+}
+
+/**
+ * Push pending consumption to Redis in one pipeline and record the shared
+ * per-window totals it returns
+ */
+async function syncBuckets() {
+  if (!redis) return;
+
+  const now = Date.now();
+  const batch: { bucket: Bucket; amount: number; window: number }[] = [];
+  buckets.forEach((bucket) => {
+    if (bucket.pending > 0) {
+      batch.push({
+        bucket,
+        amount: bucket.pending,
+        window: Math.floor(now / bucket.windowMs),
+      });
+      bucket.pending = 0;
+    }
+  });
+  if (batch.length === 0) return;
+
+  try {
+    const pipeline = redis.pipeline();
+    batch.forEach(({ bucket, amount, window }) => {
+      const key = `${bucket.prefix}:${bucket.identifier}:${window}`;
+      pipeline.incrby(key, amount);
+      pipeline.pexpire(key, bucket.windowMs * 2);
+    });
+    const results: unknown[] = await pipeline.exec();
+
+    batch.forEach(({ bucket, window }, index) => {
+      const total = Number(results[index * 2]);
+      if (Number.isFinite(total) && window >= bucket.remoteWindow) {
+        bucket.remoteCount = total;
+        bucket.remoteWindow = window;
+      }
+    });
+  } catch (error) {
+    // Keep the consumption so the next sync retries it
+    batch.forEach(({ bucket, amount }) => {
+      bucket.pending += amount;
+    });
+    console.warn("Rate limit sync to Redis failed:", error);
+  }
+
+  scheduleSync();
+}
 
 /**
  * Check rate limit for an identifier
- * Returns { success: true } if allowed, { success: false, ... } if rate limited
+ * Charges `cost` units against the caller's tier and returns
+ * { success: false, ... } when the budget is exhausted
  */
 export async function checkRateLimit(
-  limiterType: keyof typeof rateLimiters,
-  identifier: string
-) {
-  const limiter = rateLimiters[limiterType];
+  limiterType: RateLimiterType,
+  identifier: string,
+  options: RateLimitCheckOptions = {}
+): Promise<RateLimitResult> {
+  const policy: RateLimitPolicy = rateLimiters[limiterType];
+  const now = Date.now();
+  const bucket = getBucket(policy, identifier, options.role, now);
+  const cost = Math.max(0, options.cost ?? 1);
+
+  const window = Math.floor(now / policy.windowMs);
+  const windowReset = (window + 1) * policy.windowMs;
+  if (policy.seedFromRemote) {
+    await seedBucket(bucket, window);
+  }
+  const sharedUsed =
+    bucket.remoteWindow === window ? bucket.remoteCount + bucket.pending : 0;
+
+  // Other instances have already used this window's budget
+  if (sharedUsed + cost > bucket.capacity) {
+    return { success: false, limit: bucket.limit, remaining: 0, reset: windowReset };
+  }
 
-  // If rate limiting not configured, allow all requests
-  if (!limiter) {
-    console.warn(`Rate limiting not configured for ${limiterType}`);
-    return { success: true };
+  if (bucket.tokens < cost) {
+    // A cost above capacity can never succeed; report a full window
+    const msUntilTokens =
+      cost > bucket.capacity
+        ? policy.windowMs
+        : ((cost - bucket.tokens) * policy.windowMs) / bucket.limit;
+    return {
+      success: false,
+      limit: bucket.limit,
+      remaining: Math.floor(bucket.tokens),
+      reset: now + Math.ceil(msUntilTokens),
+    };
   }
 
-  const { success, limit, reset, remaining } = await limiter.limit(identifier);
+  bucket.tokens -= cost;
+  bucket.pending += cost;
+  scheduleSync();
+
+  const remaining = Math.min(
+    Math.floor(bucket.tokens),
+    bucket.remoteWindow === window ? bucket.capacity - (sharedUsed + cost) : bucket.capacity
+  );
 
   return {
-    success,
-    limit,
-    remaining,
-    reset,
+    success: true,
+    limit: bucket.limit,
+    remaining: Math.max(0, remaining),
+    reset:
+      now + Math.ceil(((bucket.capacity - bucket.tokens) * policy.windowMs) / bucket.limit),
   };
 }
 
+/**
+ * 429 response for a failed check, for routes that charge costs known only
+ * after parsing the request
+ */
+export function rateLimitExceeded(rateLimit: RateLimitResult) {
+  const retryAfter = Math.max(1, Math.ceil((rateLimit.reset - Date.now()) / 1000));
+  return NextResponse.json(
+    {
+      error: "Rate limit exceeded: please try again later",
+      code: "RATE_LIMIT_EXCEEDED",
+      retryAfter,
+    },
+    {
+      status: 429,
+      headers: {
+        "X-RateLimit-Limit": rateLimit.limit.toString(),
+        "X-RateLimit-Remaining": rateLimit.remaining.toString(),
+        "X-RateLimit-Reset": rateLimit.reset.toString(),
+        "Retry-After": retryAfter.toString(),
+      },
+    }
+  );
+}
+
 /**
  * Middleware wrapper to rate limit API routes
+ * Callers authenticated by middleware are limited per user on their role's
+ * tier; everyone else per IP on the base tier.
+ *
+ * @example
+ * export const POST = withRateLimit("invoicePdf", handler, {
+ *   cost: RATE_LIMIT_COSTS.syncPdf,
+ * });
  */
 export function withRateLimit(
-  limiterType: keyof typeof rateLimiters,
+  limiterType: RateLimiterType,
   handler: (req: Request) => Promise<NextResponse>,
-  getIdentifier?: (req: Request) => string
+  options?: RateLimitOptions | ((req: Request) => string)
 ) {
+  const { cost, getIdentifier }: RateLimitOptions =
+    typeof options === "function" ? { getIdentifier: options } : options ?? {};
+
   return async (req: Request) => {
-    // Get identifier (default to IP address)
+    const user = await readUserContextHeaders(req.headers);
+
+    // Get identifier (default to the signed-in user, then IP address)
     const identifier =
       getIdentifier?.(req) ||
+      (user ? `user:${user.userId}` : null) ||
       req.headers.get("x-forwarded-for") ||
       req.headers.get("x-real-ip") ||
       "anonymous";
 
     // Check rate limit
-    const rateLimit = await checkRateLimit(limiterType, identifier);
+    const rateLimit = await checkRateLimit(limiterType, identifier, {
+      cost: typeof cost === "function" ? cost(req) : cost,
+      role: user?.role,
+    });
 
     if (!rateLimit.success) {
-      return NextResponse.json(
-        {
-          error: "Rate limit exceeded: please try again later",
-          code: "RATE_LIMIT_EXCEEDED",
-          retryAfter: rateLimit.reset
-            ? Math.ceil((rateLimit.reset - Date.now()) / 1000)
-            : 60,
-        },
-        {
-          status: 429,
-          headers: {
-            "X-RateLimit-Limit": rateLimit.limit?.toString() || "0",
-            "X-RateLimit-Remaining": rateLimit.remaining?.toString() || "0",
-            "X-RateLimit-Reset": rateLimit.reset?.toString() || "0",
-            "Retry-After": rateLimit.reset
-              ? Math.ceil((rateLimit.reset - Date.now()) / 1000).toString()
-              : "60",
-          },
-        }
-      );
+      return rateLimitExceeded(rateLimit);
     }
 
     // Add rate limit headers to response
     const response = await handler(req);
-    
-    if (rateLimit.limit) {
-      response.headers.set("X-RateLimit-Limit", rateLimit.limit.toString());
-      response.headers.set("X-RateLimit-Remaining", rateLimit.remaining?.toString() || "0");
-      if (rateLimit.reset) {
-        response.headers.set("X-RateLimit-Reset", rateLimit.reset.toString());
-      }
-    }
+
+    response.headers.set("X-RateLimit-Limit", rateLimit.limit.toString());
+    response.headers.set("X-RateLimit-Remaining", rateLimit.remaining.toString());
+    response.headers.set("X-RateLimit-Reset", rateLimit.reset.toString());
 
     return response;
   };
@@ -165,17 +448,18 @@ export function withRateLimit(
  * Rate limit check for server components
  */
 export async function requireRateLimit(
-  limiterType: keyof typeof rateLimiters,
+  limiterType: RateLimiterType,
   identifier: string
 ): Promise<void> {
   const result = await checkRateLimit(limiterType, identifier);
 
   if (!result.success) {
-    throw new Error(`Rate limit exceeded. Try again in ${result.reset ? Math.ceil((result.reset - Date.now()) / 1000) : 60} seconds.`);
+    throw new Error(`Rate limit exceeded. Try again in ${Math.max(1, Math.ceil((result.reset - Date.now()) / 1000))} seconds.`);
   }
 }
 
 /**
- * Check if rate limiting is available
+ * Check if limits are shared across instances (Redis sync configured)
+ * Local per-instance limiting is always active.
  */
 export const rateLimitingAvailable = packagesAvailable && redis !== null;
@@ -0,0 +1,100 @@
+import { AsyncLocalStorage } from "async_hooks";
+import { cache } from "react";
+import { cookies, headers } from "next/headers";
+import { createServerClient } from "@supabase/ssr";
+import { getUserContextFromToken } from "@/lib/auth-claims";
+import { readUserContextHeaders, resolveUserContext } from "@/lib/user-context";
+
+export interface RequestAuth {
+  userId: string;
+  email: string | null;
+  role: string | null;
+  location: string | null;
+}
+
+interface RequestScope {
+  supabase?: ReturnType<typeof createRequestSupabase>;
+  auth?: Promise<RequestAuth | null>;
+}
+
+// React's cache() only memoizes while a Server Component tree renders; in
+// route handlers it calls through every time. Handlers get the same
+// once-per-request behaviour from a scope opened by withAuth.
+const requestScope = new AsyncLocalStorage<RequestScope>();
+
+/**
+ * Run `fn` with its own per-request scope for getRequestSupabase and
+ * getRequestAuth. Nested calls reuse the outer scope.
+ */
+export function runWithRequestScope<T>(fn: () => T): T {
+  if (requestScope.getStore()) return fn();
+  return requestScope.run({}, fn);
+}
+
+function createRequestSupabase() {
+  const cookieStore = cookies();
+
+  return createServerClient(
+    process.env.NEXT_PUBLIC_SUPABASE_URL!,
+    process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!,
+    {
+      cookies: {
+        get(name: string) {
+          return cookieStore.get(name)?.value;
+        },
+      },
+    }
+  );
+}
+
+async function resolveRequestAuth(): Promise<RequestAuth | null> {
+  const forwarded = await readUserContextHeaders(headers());
+  if (forwarded) return forwarded;
+
+  const supabase = getRequestSupabase();
+  const {
+    data: { session },
+  } = await supabase.auth.getSession();
+
+  if (!session) return null;
+
+  const tokenContext = await getUserContextFromToken(session.access_token);
+  const userData = tokenContext ?? (await resolveUserContext(supabase, session.user.id));
+
+  return {
+    userId: session.user.id,
+    email: session.user.email ?? null,
+    role: userData?.role ?? null,
+    location: userData?.location ?? null,
+  };
+}
+
+const cachedRequestSupabase = cache(createRequestSupabase);
+const cachedRequestAuth = cache(resolveRequestAuth);
+
+/**
+ * Supabase client bound to the current request's cookies
+ * Created once per request and shared by everything that renders it.
+ */
+export function getRequestSupabase() {
+  const scope = requestScope.getStore();
+  if (!scope) return cachedRequestSupabase();
+  return (scope.supabase ??= createRequestSupabase());
+}
+
+/**
+ * Resolve the signed-in user for the current request, once
+ * Server-side only - use in Server Components, route handlers and withAuth
+ * (route handlers outside withAuth should wrap themselves in
+ * runWithRequestScope to share the result).
+ *
+ * Middleware has usually resolved the user already and forwarded it in the
+ * signed X-User-* request headers; otherwise the session is read from cookies and
+ * role/location come from the token claims or the cached users lookup.
+ * Returns null when there is no session.
+ */
+export function getRequestAuth(): Promise<RequestAuth | null> {
+  const scope = requestScope.getStore();
+  if (!scope) return cachedRequestAuth();
+  return (scope.auth ??= resolveRequestAuth());
+}
@@ -0,0 +1,74 @@
+/**
+ * Route matcher
+ *
+ * Compiles a route table into a character trie once, at module load, so a
+ * lookup walks the pathname a single time instead of testing every route.
+ * Safe to use from middleware (Edge runtime): no Node APIs.
+ */
+
+export type RouteMatchMode =
+  /** Matches the path itself only */
+  | "exact"
+  /** Matches the path and anything below it (`/track`, `/track/abc`, not `/tracking`) */
+  | "segment"
+  /** Plain string prefix, same as `pathname.startsWith(path)` */
+  | "prefix";
+
+export interface RouteEntry<T> {
+  path: string;
+  value: T;
+  match?: RouteMatchMode;
+}
+
+interface TrieNode<T> {
+  children: Map<string, TrieNode<T>>;
+  terminal?: { value: T; match: RouteMatchMode };
+}
+
+/**
+ * Build a matcher returning the value of the longest route matching a path
+ *
+ * @example
+ * const isPublic = compileRouteMatcher([{ path: "/track", value: true }]);
+ * isPublic("/track/ABC123"); // true
+ */
+export function compileRouteMatcher<T>(
+  routes: RouteEntry<T>[]
+): (pathname: string) => T | null {
+  const root: TrieNode<T> = { children: new Map() };
+
+  routes.forEach(({ path, value, match = "segment" }) => {
+    let node = root;
+    for (const char of path) {
+      let next = node.children.get(char);
+      if (!next) {
+        next = { children: new Map() };
+        node.children.set(char, next);
+      }
+      node = next;
+    }
+    node.terminal = { value, match };
+  });
+
+  return (pathname: string) => {
+    let node: TrieNode<T> | undefined = root;
+    let matched: T | null = null;
+
+    for (let i = 0; i <= pathname.length && node; i++) {
+      const terminal = node.terminal;
+      if (terminal) {
+        const atEnd = i === pathname.length;
+        if (
+          terminal.match === "prefix" ||
+          (terminal.match === "exact" && atEnd) ||
+          (terminal.match === "segment" && (atEnd || pathname[i] === "/"))
+        ) {
+          matched = terminal.value;
+        }
+      }
+      node = i < pathname.length ? node.children.get(pathname[i]) : undefined;
+    }
+
+    return matched;
+  };
+}
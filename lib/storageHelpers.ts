@@ -77,3 +77,15 @@ export async function createSignedUrl(path: string, expiresSeconds = 60 * 60) {
 
   return data.signedUrl;
 }
+
+export async function removeFromStorage(paths: string[]) {
+  if (paths.length === 0) return;
+
+  const { error } = await supabaseAdmin.storage.from(DEFAULT_BUCKET).remove(paths);
+
+  if (error) {
+    throw error;
+  }
+}
+
+export const STORAGE_BUCKET = DEFAULT_BUCKET;
@@ -115,11 +115,65 @@ export function useLocationForNewRecord() {
   return locationScope === 'all' ? userHomeLocation : locationScope;
 }
 
+type LocationStats = { imphal: number; newdelhi: number; total: number };
+
+// Dashboard widgets mount together and ask for the same tables, so counts are
+// shared across hook instances and kept briefly before refetching.
+const LOCATION_STATS_TTL_MS = 30_000;
+const locationStatsCache = new Map<
+  string,
+  { expiresAt: number; promise: Promise<LocationStats> }
+>();
+
+async function fetchLocationStats(tableName: string): Promise<LocationStats> {
+  // One grouped query per table (a planner estimate for operators and admins
+  // on large tables)
+  const { data, error } = await supabase.rpc("location_counts", {
+    table_name: tableName,
+  });
+
+  if (error) {
+    throw new Error(error.message);
+  }
+
+  const stats: LocationStats = { imphal: 0, newdelhi: 0, total: 0 };
+  ((data as { location: string | null; row_count: number }[] | null) ?? []).forEach(
+    (row) => {
+      const count = Number(row.row_count ?? 0);
+      if (row.location === "imphal") stats.imphal += count;
+      if (row.location === "newdelhi") stats.newdelhi += count;
+    }
+  );
+  stats.total = stats.imphal + stats.newdelhi;
+  return stats;
+}
+
+export function getLocationStats(tableName: string): Promise<LocationStats> {
+  const now = Date.now();
+  const cached = locationStatsCache.get(tableName);
+  if (cached && cached.expiresAt > now) {
+    return cached.promise;
+  }
+
+  const promise = fetchLocationStats(tableName);
+  locationStatsCache.set(tableName, {
+    expiresAt: now + LOCATION_STATS_TTL_MS,
+    promise,
+  });
+  // Do not keep failures around for the whole TTL
+  promise.catch(() => {
+    if (locationStatsCache.get(tableName)?.promise === promise) {
+      locationStatsCache.delete(tableName);
+    }
+  });
+  return promise;
+}
+
 /**
  * Hook to get counts by location for dashboard stats
  */
 export function useLocationStats(tableName: string) {
-  const [stats, setStats] = useState<{ imphal: number; newdelhi: number; total: number }>({
+  const [stats, setStats] = useState<LocationStats>({
     imphal: 0,
     newdelhi: 0,
     total: 0,
@@ -127,27 +181,29 @@ export function useLocationStats(tableName: string) {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
+    let cancelled = false;
+
     async function fetchStats() {
       setLoading(true);
       try {
-        const [imphalResult, delhiResult] = await Promise.all([
-          supabase.from(tableName).select("id", { count: "exact", head: true }).eq("location", "imphal"),
-          supabase.from(tableName).select("id", { count: "exact", head: true }).eq("location", "newdelhi"),
-        ]);
-
-        setStats({
-          imphal: imphalResult.count || 0,
-          newdelhi: delhiResult.count || 0,
-          total: (imphalResult.count || 0) + (delhiResult.count || 0),
-        });
+        const result = await getLocationStats(tableName);
+        if (!cancelled) {
+          setStats(result);
+        }
       } catch (err) {
         console.error(`Failed to fetch ${tableName} stats:`, err);
       } finally {
-        setLoading(false);
+        if (!cancelled) {
+          setLoading(false);
+        }
       }
     }
 
     fetchStats();
+
+    return () => {
+      cancelled = true;
+    };
   }, [tableName]);
 
   return { stats, loading };
@@ -0,0 +1,250 @@
+/**
+ * User context (role + location) resolution shared by middleware and withAuth
+ *
+ * Lookups go through a small per-instance LRU with a short TTL so busy routes
+ * (e.g. scanners posting to /api/scans) do not query `users` on every call.
+ * Middleware forwards the resolved context to route handlers through the
+ * X-User-* request headers, which withAuth reads instead of re-querying.
+ * The headers carry an HMAC signature (USER_CONTEXT_SECRET, falling back
+ * to the service role key), so handlers only accept context that
+ * middleware produced - a request that skipped middleware cannot forge it.
+ *
+ * Staleness is bounded by the TTL. In the Node runtime the cache also
+ * subscribes to Realtime changes on `users` and evicts entries as soon as a
+ * row changes; in-process writers can call invalidateUserContext directly.
+ */
+
+export interface UserContext {
+  role: string | null;
+  location: string | null;
+}
+
+export const USER_CONTEXT_HEADERS = {
+  id: "x-user-id",
+  email: "x-user-email",
+  role: "x-user-role",
+  location: "x-user-location",
+  signature: "x-user-signature",
+} as const;
+
+export interface ForwardedUserContext extends UserContext {
+  userId: string;
+  email: string | null;
+}
+
+const USER_CONTEXT_TTL_MS = 15_000;
+const USER_CONTEXT_MAX_ENTRIES = 1_000;
+
+// Map iteration order is insertion order, so re-inserting on read keeps the
+// least recently used entry first.
+const cache = new Map<string, { value: UserContext; expiresAt: number }>();
+
+export function getCachedUserContext(userId: string): UserContext | null {
+  const entry = cache.get(userId);
+  if (!entry) return null;
+
+  if (entry.expiresAt <= Date.now()) {
+    cache.delete(userId);
+    return null;
+  }
+
+  cache.delete(userId);
+  cache.set(userId, entry);
+  return entry.value;
+}
+
+export function setCachedUserContext(userId: string, value: UserContext): void {
+  cache.delete(userId);
+  cache.set(userId, { value, expiresAt: Date.now() + USER_CONTEXT_TTL_MS });
+
+  while (cache.size > USER_CONTEXT_MAX_ENTRIES) {
+    const oldest = cache.keys().next().value;
+    if (oldest === undefined) break;
+    cache.delete(oldest);
+  }
+}
+
+/**
+ * Drop a cached entry (or all entries when no id is given)
+ */
+export function invalidateUserContext(userId?: string): void {
+  if (userId) {
+    cache.delete(userId);
+  } else {
+    cache.clear();
+  }
+}
+
+type UsersQueryClient = {
+  from: (table: "users") => any;
+};
+
+/**
+ * Resolve role and location for a user, using the cache when possible
+ * Returns null if the user has no row in `users`.
+ */
+export async function resolveUserContext(
+  client: UsersQueryClient,
+  userId: string
+): Promise<UserContext | null> {
+  ensureUsersSubscription();
+
+  const cached = getCachedUserContext(userId);
+  if (cached) return cached;
+
+  const { data } = await client
+    .from("users")
+    .select("role, location")
+    .eq("id", userId)
+    .maybeSingle();
+
+  if (!data) return null;
+
+  const value: UserContext = {
+    role: (data.role as string | null) ?? null,
+    location: (data.location as string | null) ?? null,
+  };
+  setCachedUserContext(userId, value);
+  return value;
+}
+
+// Forwarded context only has to survive one hop inside the server
+const USER_CONTEXT_SIGNATURE_MAX_AGE_MS = 60_000;
+
+const encoder = new TextEncoder();
+let signingKey: { secret: string; key: Promise<CryptoKey> } | null = null;
+
+function getSigningKey(): Promise<CryptoKey> | null {
+  const secret = process.env.USER_CONTEXT_SECRET || process.env.SUPABASE_SERVICE_ROLE_KEY;
+  if (!secret) return null;
+
+  if (signingKey?.secret !== secret) {
+    signingKey = {
+      secret,
+      // Web Crypto: available in both the Edge (middleware) and Node runtimes
+      key: crypto.subtle.importKey(
+        "raw",
+        encoder.encode(secret),
+        { name: "HMAC", hash: "SHA-256" },
+        false,
+        ["sign", "verify"]
+      ),
+    };
+  }
+  return signingKey.key;
+}
+
+function signedPayload(user: ForwardedUserContext, issuedAt: string) {
+  return encoder.encode(
+    JSON.stringify([issuedAt, user.userId, user.email, user.role, user.location])
+  );
+}
+
+function toHex(bytes: ArrayBuffer) {
+  return Array.from(new Uint8Array(bytes), (byte) => byte.toString(16).padStart(2, "0")).join("");
+}
+
+function fromHex(hex: string) {
+  if (!/^(?:[0-9a-f]{2})+$/.test(hex)) return null;
+  const bytes = new Uint8Array(hex.length / 2);
+  for (let i = 0; i < bytes.length; i++) {
+    bytes[i] = Number.parseInt(hex.slice(i * 2, i * 2 + 2), 16);
+  }
+  return bytes;
+}
+
+/**
+ * Set the signed X-User-* headers for a resolved user (middleware only)
+ * Returns false, leaving the headers unset, when no signing secret is
+ * configured; handlers then resolve the session themselves.
+ */
+export async function writeUserContextHeaders(
+  headers: Headers,
+  user: ForwardedUserContext
+): Promise<boolean> {
+  const key = getSigningKey();
+  if (!key) return false;
+
+  const issuedAt = Date.now().toString();
+  const signature = await crypto.subtle.sign("HMAC", await key, signedPayload(user, issuedAt));
+
+  headers.set(USER_CONTEXT_HEADERS.id, user.userId);
+  headers.set(USER_CONTEXT_HEADERS.role, user.role ?? "");
+  if (user.location) headers.set(USER_CONTEXT_HEADERS.location, user.location);
+  if (user.email) headers.set(USER_CONTEXT_HEADERS.email, user.email);
+  headers.set(USER_CONTEXT_HEADERS.signature, `${issuedAt}.${toHex(signature)}`);
+  return true;
+}
+
+/**
+ * Read the context middleware forwarded on the request, if any
+ * Returns null unless the headers carry a valid, recent signature.
+ */
+export async function readUserContextHeaders(
+  headers: Headers
+): Promise<ForwardedUserContext | null> {
+  const userId = headers.get(USER_CONTEXT_HEADERS.id);
+  const role = headers.get(USER_CONTEXT_HEADERS.role);
+  const [issuedAt, signatureHex] = headers.get(USER_CONTEXT_HEADERS.signature)?.split(".") ?? [];
+  if (!userId || !role || !issuedAt || !signatureHex) return null;
+
+  const age = Date.now() - Number(issuedAt);
+  if (!(age >= 0 && age <= USER_CONTEXT_SIGNATURE_MAX_AGE_MS)) return null;
+
+  const key = getSigningKey();
+  const signature = fromHex(signatureHex);
+  if (!key || !signature) return null;
+
+  const user: ForwardedUserContext = {
+    userId,
+    email: headers.get(USER_CONTEXT_HEADERS.email),
+    role,
+    location: headers.get(USER_CONTEXT_HEADERS.location),
+  };
+
+  const valid = await crypto.subtle.verify(
+    "HMAC",
+    await key,
+    signature,
+    signedPayload(user, issuedAt)
+  );
+  return valid ? user : null;
+}
+
+/**
+ * Remove any client-supplied X-User-* headers so only middleware can set them
+ */
+export function stripUserContextHeaders(headers: Headers): void {
+  Object.values(USER_CONTEXT_HEADERS).forEach((name) => headers.delete(name));
+}
+
+let usersSubscriptionStarted = false;
+
+function ensureUsersSubscription(): void {
+  if (usersSubscriptionStarted) return;
+  usersSubscriptionStarted = true;
+
+  // Long-lived sockets are only reliable in the Node runtime
+  if (process.env.NEXT_RUNTIME !== "nodejs") return;
+  if (!process.env.SUPABASE_SERVICE_ROLE_KEY) return;
+
+  void import("@/lib/supabaseAdmin")
+    .then(({ supabaseAdmin }) => {
+      supabaseAdmin
+        .channel("user-context-cache")
+        .on(
+          "postgres_changes",
+          { event: "*", schema: "public", table: "users" },
+          (payload) => {
+            const id =
+              ((payload.new as any)?.id as string | undefined) ??
+              ((payload.old as any)?.id as string | undefined);
+            invalidateUserContext(id);
+          }
+        )
+        .subscribe();
+    })
+    .catch((error) => {
+      console.warn("[user-context] users change subscription unavailable", error);
+    });
+}
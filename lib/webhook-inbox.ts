@@ -0,0 +1,111 @@
+/**
+ * Webhook inbox
+ *
+ * Provider webhooks only append their events here (one insert per request)
+ * and acknowledge immediately; the consumer applies them to the message
+ * logs in batches via process_webhook_inbox (20251229_add_webhook_inbox.sql).
+ * This keeps callback bursts after a bulk send from backing up the
+ * providers' retry queues.
+ */
+
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+
+export type WebhookProvider = "meta" | "twilio";
+
+export interface WebhookEvent {
+  provider: WebhookProvider;
+  eventType: "status" | "message";
+  providerMessageId: string | null;
+  status: string | null;
+  errorMessage?: string | null;
+  phone?: string | null;
+  // Provider's event time; defaults to receipt time
+  occurredAt?: string | null;
+  payload: unknown;
+}
+
+/**
+ * Durably record webhook events
+ * Throws if the insert fails so the handler can return 5xx and let the
+ * provider retry.
+ */
+export async function appendWebhookEvents(events: WebhookEvent[]) {
+  if (events.length === 0) return;
+
+  const { error } = await supabaseAdmin.from("webhook_inbox").insert(
+    events.map((event) => ({
+      provider: event.provider,
+      event_type: event.eventType,
+      provider_message_id: event.providerMessageId,
+      status: event.status,
+      error_message: event.errorMessage ?? null,
+      phone: event.phone ?? null,
+      payload: event.payload ?? {},
+      ...(event.occurredAt ? { occurred_at: event.occurredAt } : {}),
+    }))
+  );
+
+  if (error) throw error;
+}
+
+interface WebhookInboxConsumerOptions {
+  // Events applied per round trip
+  batchSize?: number;
+  // Delay between polls while the inbox is empty
+  pollIntervalMs?: number;
+}
+
+/**
+ * Apply pending inbox events until closed
+ * Runs in the worker process (workers/index.ts). Full batches are followed
+ * by another one right away, so a backlog drains at database speed.
+ */
+export function startWebhookInboxConsumer(options: WebhookInboxConsumerOptions = {}) {
+  const batchSize = options.batchSize ?? 500;
+  const pollIntervalMs = options.pollIntervalMs ?? 1_000;
+
+  let running = true;
+  let timer: ReturnType<typeof setTimeout> | null = null;
+  let current: Promise<void> | null = null;
+
+  const schedule = (delay: number) => {
+    if (!running) return;
+    timer = setTimeout(() => {
+      timer = null;
+      current = tick().finally(() => {
+        current = null;
+      });
+    }, delay);
+  };
+
+  async function tick() {
+    let consumed = 0;
+    try {
+      const { data, error } = await supabaseAdmin.rpc("process_webhook_inbox", {
+        p_limit: batchSize,
+      });
+      if (error) throw error;
+      consumed = Number(data ?? 0);
+    } catch (error) {
+      console.error("[WebhookInbox] Failed to process batch:", error);
+    }
+
+    schedule(consumed >= batchSize ? 0 : pollIntervalMs);
+  }
+
+  schedule(0);
+
+  return {
+    /**
+     * Stop polling and wait for the batch in flight
+     */
+    async close() {
+      running = false;
+      if (timer) {
+        clearTimeout(timer);
+        timer = null;
+      }
+      if (current) await current;
+    },
+  };
+}
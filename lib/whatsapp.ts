@@ -0,0 +1,438 @@
+/**
+ * WhatsApp Cloud API (Graph) invoice notifications
+ *
+ * Shared by /api/send-whatsapp (inline fallback when no queue driver is
+ * configured) and the whatsapp queue processor (lib/queues/processors.ts).
+ *
+ * WhatsApp Business API requires template messages for business-initiated
+ * conversations. Free-form text messages only work within a 24-hour window
+ * after the customer messages first.
+ * See: https://developers.facebook.com/docs/whatsapp/conversation-types
+ */
+
+import { recordMessageLogs } from "@/lib/message-logs";
+import { supabaseAdmin } from "@/lib/supabaseAdmin";
+import { createSignedUrl } from "@/lib/storageHelpers";
+
+const GRAPH_API_VERSION = "v19.0";
+const SEND_TIMEOUT_MS = 15_000;
+const PDF_LINK_TTL_SECONDS = 60 * 60 * 24;
+// Signed links are reused for an hour, well inside their 24h lifetime
+const PDF_LINK_REUSE_MS = 60 * 60 * 1000;
+// Upper bound on cached links per process
+const PDF_LINK_CACHE_MAX = 1_000;
+
+// Graph error codes worth retrying: API throttling, temporary outages and
+// the per-recipient pair rate limit
+// https://developers.facebook.com/docs/whatsapp/cloud-api/support/error-codes
+const TRANSIENT_GRAPH_ERROR_CODES = new Set([1, 2, 4, 80007, 130429, 131000, 131016, 131056, 133004]);
+
+export interface WhatsAppConfig {
+  token: string;
+  phoneNumberId: string;
+  templateName: string;
+  templateLanguage: string;
+  includeDocument: boolean;
+  defaultCountryCode?: string;
+}
+
+export class WhatsAppError extends Error {
+  // HTTP status for API responses
+  readonly status: number;
+  // Graph error code, when the API returned one
+  readonly code?: number;
+  // Whether sending again later may succeed
+  readonly retryable: boolean;
+
+  constructor(
+    message: string,
+    options: { status?: number; code?: number; retryable?: boolean } = {}
+  ) {
+    super(message);
+    this.name = "WhatsAppError";
+    this.status = options.status ?? 500;
+    this.code = options.code;
+    this.retryable = options.retryable ?? false;
+  }
+}
+
+export interface WhatsAppSendResult {
+  success: true;
+  invoiceId: string;
+  messageId: string | null;
+  to: string;
+}
+
+export function getWhatsAppConfig(): WhatsAppConfig | null {
+  const token = process.env.WHATSAPP_ACCESS_TOKEN;
+  const phoneNumberId = process.env.WHATSAPP_PHONE_NUMBER_ID;
+  if (!token || !phoneNumberId) return null;
+
+  return {
+    token,
+    phoneNumberId,
+    templateName: process.env.WHATSAPP_TEMPLATE_NAME || "invoice",
+    templateLanguage: process.env.WHATSAPP_TEMPLATE_LANGUAGE || "en_US",
+    includeDocument: process.env.WHATSAPP_TEMPLATE_INCLUDE_DOCUMENT === "true",
+    defaultCountryCode: process.env.WHATSAPP_DEFAULT_COUNTRY_CODE,
+  };
+}
+
+/**
+ * Normalize a stored phone number to E.164
+ * Country code for 10-digit numbers is configurable via
+ * WHATSAPP_DEFAULT_COUNTRY_CODE.
+ */
+export function normalizeWhatsAppPhone(rawPhone: string, defaultCountryCode?: string) {
+  let to = rawPhone.replace(/\s+/g, "");
+  if (to.startsWith("+")) return to;
+
+  const digitsOnly = to.replace(/\D+/g, "");
+
+  if (digitsOnly.length === 10) {
+    if (!defaultCountryCode) {
+      console.warn("10-digit phone number requires WHATSAPP_DEFAULT_COUNTRY_CODE env var");
+      throw new WhatsAppError(
+        "Phone number requires country code. Please update to include country code (e.g., +91XXXXXXXXXX)",
+        { status: 400 }
+      );
+    }
+    // 10-digit number with configured country code → prepend it
+    to = `+${defaultCountryCode}${digitsOnly}`;
+  } else if (digitsOnly.length >= 11 && digitsOnly.length <= 15) {
+    // Assume full international number without + (11-15 digits per E.164)
+    to = `+${digitsOnly}`;
+  } else if (digitsOnly.startsWith("00") && digitsOnly.length > 2) {
+    // 00-prefixed international format → replace 00 with +
+    to = `+${digitsOnly.slice(2)}`;
+  } else if (digitsOnly.length > 0) {
+    // Fallback: best-effort international format
+    to = `+${digitsOnly}`;
+  }
+
+  return to;
+}
+
+export function isTransientWhatsAppError(httpStatus: number, code?: number) {
+  if (httpStatus === 429 || httpStatus >= 500) return true;
+  return code !== undefined && TRANSIENT_GRAPH_ERROR_CODES.has(code);
+}
+
+// ========================================
+// Invoice PDF links
+// ========================================
+
+// Every entry lives PDF_LINK_REUSE_MS, so insertion order is expiry order:
+// the oldest entries are the first to expire and the first to go when full
+const pdfLinkCache = new Map<string, { url: string; expiresAt: number }>();
+
+function cachePdfLink(pdfPath: string, url: string) {
+  const now = Date.now();
+  pdfLinkCache.delete(pdfPath);
+  for (const [path, entry] of pdfLinkCache) {
+    if (entry.expiresAt > now && pdfLinkCache.size < PDF_LINK_CACHE_MAX) break;
+    pdfLinkCache.delete(path);
+  }
+  pdfLinkCache.set(pdfPath, { url, expiresAt: now + PDF_LINK_REUSE_MS });
+}
+
+/**
+ * Link to the invoice PDF for the document header
+ * Reuses the stored PDF (and a recently signed link to it) when there is
+ * one; only renders when the invoice has never been generated.
+ */
+async function getInvoicePdfLink(invoiceId: string, pdfPath: string | null) {
+  if (pdfPath) {
+    const cached = pdfLinkCache.get(pdfPath);
+    if (cached) {
+      if (cached.expiresAt > Date.now()) return cached.url;
+      pdfLinkCache.delete(pdfPath);
+    }
+
+    try {
+      const url = await createSignedUrl(pdfPath, PDF_LINK_TTL_SECONDS);
+      cachePdfLink(pdfPath, url);
+      return url;
+    } catch (error) {
+      // Stored file is gone; render a fresh one below
+      console.warn(`[WhatsApp] Stored PDF for invoice ${invoiceId} unavailable, regenerating:`, error);
+    }
+  }
+
+  // Import dynamically so Puppeteer only loads when a PDF must be rendered
+  const { generateInvoicePdf } = await import("@/lib/invoicePdf");
+  const result = await generateInvoicePdf(invoiceId);
+  return ((result as any)?.pdfUrl as string | undefined) ?? null;
+}
+
+// ========================================
+// Sending
+// ========================================
+
+function buildTemplateMessage(
+  config: WhatsAppConfig,
+  params: { to: string; customerName: string; invoiceRef: string; pdfUrl: string | null }
+): Record<string, unknown> {
+  const { templateName, templateLanguage } = config;
+  const { to, customerName, invoiceRef, pdfUrl } = params;
+
+  if (templateName === "hello_world") {
+    // Meta's pre-approved test template (no parameters needed)
+    return {
+      messaging_product: "whatsapp",
+      to,
+      type: "template",
+      template: {
+        name: "hello_world",
+        language: { code: templateLanguage },
+      },
+    };
+  }
+
+  // Template must be pre-approved in Meta Business Manager.
+  // Default template: "Hello {{1}}, Your invoice for order {{2}} is attached..."
+  // {{1}} = customer name, {{2}} = invoice ref
+  const bodyParameters =
+    templateName === "order_update"
+      ? [{ type: "text", text: invoiceRef }]
+      : templateName === "invoice_pdf"
+      ? []
+      : [
+          { type: "text", text: customerName },
+          { type: "text", text: invoiceRef },
+        ];
+
+  const components: any[] = [];
+  if (config.includeDocument && pdfUrl) {
+    components.push({
+      type: "header",
+      parameters: [
+        {
+          type: "document",
+          document: {
+            link: pdfUrl,
+            filename: `Invoice-${invoiceRef}.pdf`,
+          },
+        },
+      ],
+    });
+  }
+
+  if (bodyParameters.length > 0) {
+    components.push({
+      type: "body",
+      parameters: bodyParameters,
+    });
+  }
+
+  return {
+    messaging_product: "whatsapp",
+    to,
+    type: "template",
+    template: {
+      name: templateName,
+      language: { code: templateLanguage },
+      components,
+    },
+  };
+}
+
+async function logWhatsAppSend(entry: {
+  invoiceId: string;
+  to: string;
+  status: "sent" | "error";
+  errorMessage: string | null;
+  messageId: string | null;
+  rawResponse: unknown;
+}) {
+  try {
+    await recordMessageLogs([
+      {
+        provider: "meta",
+        channel: "whatsapp",
+        providerMessageId: entry.messageId,
+        invoiceId: entry.invoiceId,
+        phone: entry.to,
+        mode: "meta_send",
+        status: entry.status,
+        errorMessage: entry.errorMessage,
+        rawResponse: entry.rawResponse,
+      },
+    ]);
+  } catch {
+    // Logging failure should not break the send
+  }
+}
+
+/**
+ * Load the invoice's recipient, normalized, without sending anything
+ * The queue processor uses this to throttle per recipient before the send.
+ */
+export async function resolveInvoiceRecipient(invoiceId: string, config: WhatsAppConfig) {
+  const { data, error } = await supabaseAdmin
+    .from("invoices")
+    .select("id, invoice_ref, pdf_path, customer_id, customers:customer_id ( id, name, phone )")
+    .eq("id", invoiceId)
+    .maybeSingle();
+
+  if (error) {
+    throw new WhatsAppError(error.message, { status: 500, retryable: true });
+  }
+
+  if (!data) {
+    throw new WhatsAppError("Invoice not found", { status: 404 });
+  }
+
+  const invoice = data as any;
+  const customer = invoice.customers as { id: string; name: string | null; phone: string | null } | null;
+
+  const rawPhone = customer?.phone?.trim();
+  if (!rawPhone) {
+    throw new WhatsAppError("Customer does not have a phone number", { status: 400 });
+  }
+
+  return {
+    to: normalizeWhatsAppPhone(rawPhone, config.defaultCountryCode),
+    invoiceRef: (invoice.invoice_ref as string | null) || invoice.id,
+    customerName: customer?.name?.trim() || "Customer",
+    pdfPath: (invoice.pdf_path as string | null) ?? null,
+  };
+}
+
+/**
+ * Send the invoice template message to the invoice's customer
+ * Throws WhatsAppError; `retryable` marks throttling, timeouts and Graph
+ * outages that are worth another attempt.
+ */
+export async function sendInvoiceWhatsApp(
+  invoiceId: string,
+  config: WhatsAppConfig,
+  recipient?: Awaited<ReturnType<typeof resolveInvoiceRecipient>>
+): Promise<WhatsAppSendResult> {
+  const { to, invoiceRef, customerName, pdfPath } =
+    recipient ?? (await resolveInvoiceRecipient(invoiceId, config));
+
+  let pdfUrl: string | null = null;
+  if (config.includeDocument) {
+    try {
+      pdfUrl = await getInvoicePdfLink(invoiceId, pdfPath);
+    } catch (error: any) {
+      throw new WhatsAppError(
+        error?.message || "Failed to generate invoice PDF for WhatsApp attachment",
+        { status: 500, retryable: true }
+      );
+    }
+  }
+
+  const messageBody = buildTemplateMessage(config, { to, customerName, invoiceRef, pdfUrl });
+  const url = `https://graph.facebook.com/${GRAPH_API_VERSION}/${config.phoneNumberId}/messages`;
+
+  const controller = new AbortController();
+  const timeoutId = setTimeout(() => controller.abort(), SEND_TIMEOUT_MS);
+
+  let waRes: Response;
+  try {
+    waRes = await fetch(url, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Authorization: `Bearer ${config.token}`,
+      },
+      body: JSON.stringify(messageBody),
+      signal: controller.signal,
+    });
+  } catch (error: any) {
+    const timedOut = error?.name === "AbortError";
+    const message = timedOut
+      ? "WhatsApp request timed out"
+      : error?.message || "WhatsApp request failed";
+
+    await logWhatsAppSend({
+      invoiceId,
+      to,
+      status: "error",
+      errorMessage: message,
+      messageId: null,
+      rawResponse: null,
+    });
+
+    throw new WhatsAppError(message, { status: timedOut ? 504 : 502, retryable: true });
+  } finally {
+    clearTimeout(timeoutId);
+  }
+
+  const waJson = await waRes.json().catch(() => null);
+  const messageId: string | null = (waJson?.messages?.[0]?.id as string | undefined) ?? null;
+  const metaError = (waJson?.error as Record<string, unknown> | undefined) ?? undefined;
+  const metaErrorCode = (metaError?.code as number | undefined) ?? undefined;
+  const errorMessage: string | null = waRes.ok
+    ? null
+    : (metaError?.message as string | undefined) ?? "Unknown WhatsApp error";
+
+  await logWhatsAppSend({
+    invoiceId,
+    to,
+    status: waRes.ok ? "sent" : "error",
+    errorMessage,
+    messageId,
+    rawResponse: waJson,
+  });
+
+  if (!waRes.ok) {
+    console.error("WhatsApp send failed", {
+      invoiceId,
+      to,
+      templateName: config.templateName,
+      metaError,
+    });
+
+    throw new WhatsAppError(
+      metaErrorCode && errorMessage
+        ? `WhatsApp error (${metaErrorCode}): ${errorMessage}`
+        : errorMessage || "Failed to send WhatsApp message",
+      {
+        status: 502,
+        code: metaErrorCode,
+        retryable: isTransientWhatsAppError(waRes.status, metaErrorCode),
+      }
+    );
+  }
+
+  return { success: true, invoiceId, messageId, to };
+}
+
+// ========================================
+// Throttling
+// ========================================
+
+function readPositiveNumber(name: string, fallback: number) {
+  const value = Number(process.env[name]);
+  return Number.isFinite(value) && value > 0 ? value : fallback;
+}
+
+export const WHATSAPP_MESSAGES_PER_SECOND = readPositiveNumber("WHATSAPP_MESSAGES_PER_SECOND", 80);
+export const WHATSAPP_PAIR_INTERVAL_MS = readPositiveNumber("WHATSAPP_PAIR_INTERVAL_MS", 6_000);
+
+/**
+ * Reserve a send to `recipient` against the shared WhatsApp limits
+ * - account: token bucket at WHATSAPP_MESSAGES_PER_SECOND per business phone
+ *   number (Cloud API default throughput is 80 msg/s)
+ * - recipient: at most one message per WHATSAPP_PAIR_INTERVAL_MS to the
+ *   same phone (Meta's pair rate limit, error 131056)
+ *
+ * The state lives in Postgres (reserve_send_slot in
+ * 20260103_add_send_throttle.sql), so the limits hold across every worker
+ * process. Returns 0 when the message may be sent now, otherwise the
+ * milliseconds to wait; the queue worker defers the job by that much rather
+ * than sleeping while it holds the job.
+ */
+export async function reserveWhatsAppSend(config: WhatsAppConfig, recipient: string) {
+  const { data, error } = await supabaseAdmin.rpc("reserve_send_slot", {
+    p_bucket: `whatsapp:${config.phoneNumberId}`,
+    p_rate_per_second: WHATSAPP_MESSAGES_PER_SECOND,
+    p_recipient: recipient,
+    p_pair_interval_ms: WHATSAPP_PAIR_INTERVAL_MS,
+  });
+  if (error) throw error;
+  return Number(data ?? 0);
+}
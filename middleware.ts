@@ -1,6 +1,13 @@
 import { createServerClient } from "@supabase/ssr";
 import { type NextRequest, NextResponse } from "next/server";
 import { hasRoleAtLeast, matchProtectedRoute } from "@/lib/access-control";
+import { getUserContextFromToken } from "@/lib/auth-claims";
+import { compileRouteMatcher } from "@/lib/route-matcher";
+import {
+  resolveUserContext,
+  stripUserContextHeaders,
+  writeUserContextHeaders,
+} from "@/lib/user-context";
 
 // Public routes that don't require authentication
 const PUBLIC_ROUTES = [
@@ -13,12 +20,23 @@ const PUBLIC_ROUTES = [
   // Meta / WhatsApp webhooks (must be publicly accessible for verification callbacks)
   "/api/webhooks/whatsapp",
   "/api/meta-data-deletion",
+  // Twilio status callbacks (signature-verified in the handler)
+  "/api/twilio/status-callback",
   // Only expose dev seeding endpoint in development
   ...(process.env.NODE_ENV === "development"
     ? ["/api/dev/seed-test-users"]
     : []),
 ];
 
+// "/" is the landing page only; every other entry covers its subpaths
+const isPublicRoute = compileRouteMatcher(
+  PUBLIC_ROUTES.map((path) => ({
+    path,
+    value: true,
+    match: path === "/" ? ("exact" as const) : ("segment" as const),
+  }))
+);
+
 // API routes that need special handling
 const API_ROUTES_PREFIX = "/api/";
 
@@ -33,9 +51,24 @@ function isSafeRedirect(path: string): boolean {
 }
 
 export async function middleware(request: NextRequest) {
+  // Handlers trust X-User-* request headers, so never forward client values
+  const requestHeaders = new Headers(request.headers);
+  stripUserContextHeaders(requestHeaders);
+
+  const pathname = request.nextUrl.pathname;
+
+  // Public routes skip the Supabase client and session lookup entirely
+  if (isPublicRoute(pathname)) {
+    return NextResponse.next({
+      request: {
+        headers: requestHeaders,
+      },
+    });
+  }
+
   let response = NextResponse.next({
     request: {
-      headers: request.headers,
+      headers: requestHeaders,
     },
   });
 
@@ -51,7 +84,7 @@ export async function middleware(request: NextRequest) {
           request.cookies.set({ name, value, ...options });
           response = NextResponse.next({
             request: {
-              headers: request.headers,
+              headers: requestHeaders,
             },
           });
           response.cookies.set({ name, value, ...options });
@@ -60,7 +93,7 @@ export async function middleware(request: NextRequest) {
           request.cookies.set({ name, value: "", ...options });
           response = NextResponse.next({
             request: {
-              headers: request.headers,
+              headers: requestHeaders,
             },
           });
           response.cookies.set({ name, value: "", ...options });
@@ -74,26 +107,12 @@ export async function middleware(request: NextRequest) {
     data: { session },
   } = await supabase.auth.getSession();
 
-  const pathname = request.nextUrl.pathname;
-
   const protectedRule = matchProtectedRoute(pathname);
   const needsUserForPage = Boolean(protectedRule);
   const needsUserForApi = pathname.startsWith(API_ROUTES_PREFIX);
 
   let userData: { role?: string | null; location?: string | null } | null = null;
 
-  // Allow public routes
-  const isPublicRoute = PUBLIC_ROUTES.some((route) => {
-    if (route === "/") {
-      return pathname === "/";
-    }
-    return pathname === route || pathname.startsWith(`${route}/`);
-  });
-
-  if (isPublicRoute) {
-    return response;
-  }
-
   // Check if user is authenticated for protected routes
   if (!session) {
     // For API routes, return 401 instead of redirect
@@ -112,11 +131,13 @@ export async function middleware(request: NextRequest) {
   }
 
   if (needsUserForPage || needsUserForApi) {
-    const { data } = await supabase
-      .from("users")
-      .select("role, location")
-      .eq("id", session.user.id)
-      .maybeSingle();
+    // Prefer the role/location claims from the verified access token; only
+    // tokens issued before the access token hook was enabled need the lookup.
+    const tokenContext = await getUserContextFromToken(session.access_token);
+
+    const data = tokenContext
+      ? { role: tokenContext.role, location: tokenContext.location }
+      : await resolveUserContext(supabase, session.user.id);
 
     if (!data) {
       if (needsUserForApi) {
@@ -158,15 +179,53 @@ export async function middleware(request: NextRequest) {
       );
     }
 
+    response = await forwardUserContext(response, requestHeaders, {
+      userId: session.user.id,
+      email: session.user.email ?? null,
+      role: userData.role,
+      location: userData.location,
+    });
+
     // Add user context to headers for API routes
     response.headers.set("X-User-Role", userData.role);
     response.headers.set("X-User-ID", session.user.id);
     response.headers.set("X-User-Location", userData.location);
+  } else if (userData?.role) {
+    // Protected pages: let server components reuse the resolved user
+    response = await forwardUserContext(response, requestHeaders, {
+      userId: session.user.id,
+      email: session.user.email ?? null,
+      role: userData.role,
+      location: userData.location ?? null,
+    });
   }
 
   return response;
 }
 
+/**
+ * Forward the resolved user to route handlers and server components via the
+ * signed X-User-* request headers (read by getRequestAuth), so they do not
+ * resolve the session again. Cookies already set on `response` are carried
+ * over.
+ */
+async function forwardUserContext(
+  response: NextResponse,
+  requestHeaders: Headers,
+  user: { userId: string; email: string | null; role: string; location: string | null }
+): Promise<NextResponse> {
+  // Without a signing secret handlers fall back to their own session lookup
+  if (!(await writeUserContextHeaders(requestHeaders, user))) return response;
+
+  const forwarded = NextResponse.next({
+    request: {
+      headers: requestHeaders,
+    },
+  });
+  response.cookies.getAll().forEach((cookie) => forwarded.cookies.set(cookie));
+  return forwarded;
+}
+
 export const config = {
   matcher: [
     "/((?!_next/static|_next/image|favicon.ico|.*\\.(?:svg|png|jpg|jpeg|gif|webp)$).*)",
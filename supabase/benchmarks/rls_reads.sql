@@ -0,0 +1,170 @@
+-- Large-table reads under RLS
+--
+-- 1. Before/after timings: the policy predicates from before
+--    20251224_optimize_rls_policies.sql (per-row users/customers subquery)
+--    and after it (initPlan helpers), applied to the same data in the same
+--    session. Prints one row per read with the median of :runs runs, so a
+--    single run after the migration gives both numbers.
+-- 2. The reads behind the customers, barcodes and shipments pages through
+--    the real policies, with EXPLAIN ANALYZE: the role check should be an
+--    InitPlan with loops=1, not a SubPlan with loops=<rows>.
+--
+--   psql "$DATABASE_URL" \
+--     -v operator_id="'<users.id of an operator>'" \
+--     -v customer_user_id="'<auth user id linked to a customer>'" \
+--     -v runs=5 \
+--     -f supabase/benchmarks/rls_reads.sql
+--
+-- Run as the table owner (section 1 bypasses RLS to compare the bare
+-- predicates). Everything runs in a transaction that is rolled back.
+-- Record the section 1 output in the PR that changes the policies.
+--
+-- Recorded for 20251224_optimize_rls_policies.sql on a local Postgres 16
+-- (1 vCPU, default settings) with synthetic data, not production: 1M
+-- shipments, 300k invoices, 20k customers (5k with a login), 200 staff;
+-- runs=5, medians in ms, two invocations:
+--
+--   read                      |  before_ms  |  after_ms
+--   operator: count shipments | 79.3 / 83.1 | 81.3 / 70.4
+--   customer: count shipments |  0.2 / 0.2  |  0.1 / 0.1
+--   customer: count invoices  |  0.2 / 0.2  |  0.1 / 0.1
+--
+-- The bare predicates are within noise of each other: with the table owner
+-- and no RLS on users, the planner already runs the uncorrelated EXISTS
+-- once (an InitPlan and a One-Time Filter) and turns the customers IN into
+-- a nested loop over idx_customers_user_id. Section 2 on a production-sized
+-- database is the measurement that shows what the policies cost.
+
+\timing on
+
+\if :{?runs}
+\else
+  \set runs 5
+\endif
+
+begin;
+
+-- ========================================
+-- 1. Before/after predicates
+-- ========================================
+
+-- Median wall time of p_runs executions, in ms
+create function pg_temp.time_query(p_sql text, p_runs integer)
+returns numeric as $$
+declare
+  v_times double precision[] := '{}';
+  v_start timestamptz;
+begin
+  for i in 1..p_runs loop
+    v_start := clock_timestamp();
+    execute p_sql;
+    v_times := v_times || extract(epoch from clock_timestamp() - v_start) * 1000;
+  end loop;
+  return (
+    select percentile_cont(0.5) within group (order by t)
+    from unnest(v_times) as t
+  )::numeric;
+end;
+$$ language plpgsql;
+
+select set_config(
+  'request.jwt.claims',
+  json_build_object('sub', :operator_id, 'role', 'authenticated')::text,
+  true
+);
+
+select
+  'operator: count shipments' as read,
+  round(pg_temp.time_query($q$
+    select count(*) from public.shipments
+    where exists (
+      select 1 from public.users
+      where users.id = auth.uid() and users.role in ('operator', 'admin')
+    )
+  $q$, :runs), 1) as before_ms,
+  round(pg_temp.time_query($q$
+    select count(*) from public.shipments
+    where (select public.is_operator_or_admin((select auth.uid())))
+  $q$, :runs), 1) as after_ms;
+
+select set_config(
+  'request.jwt.claims',
+  json_build_object('sub', :customer_user_id, 'role', 'authenticated')::text,
+  true
+);
+
+select
+  'customer: count shipments' as read,
+  round(pg_temp.time_query($q$
+    select count(*) from public.shipments
+    where customer_id in (select id from public.customers where user_id = auth.uid())
+  $q$, :runs), 1) as before_ms,
+  round(pg_temp.time_query($q$
+    select count(*) from public.shipments
+    where customer_id = any ((select public.owned_customer_ids())::uuid[])
+  $q$, :runs), 1) as after_ms
+union all
+select
+  'customer: count invoices',
+  round(pg_temp.time_query($q$
+    select count(*) from public.invoices
+    where customer_id in (select id from public.customers where user_id = auth.uid())
+  $q$, :runs), 1),
+  round(pg_temp.time_query($q$
+    select count(*) from public.invoices
+    where customer_id = any ((select public.owned_customer_ids())::uuid[])
+  $q$, :runs), 1);
+
+-- ========================================
+-- 2. Page reads through the policies
+-- ========================================
+
+-- As operator
+
+set local role authenticated;
+select set_config(
+  'request.jwt.claims',
+  json_build_object('sub', :operator_id, 'role', 'authenticated')::text,
+  true
+);
+
+-- app/barcodes/page.tsx
+explain (analyze, buffers, costs off)
+select id, barcode_number, shipment_id, status, last_scanned_at
+from public.barcodes;
+
+-- app/customers/page.tsx
+explain (analyze, buffers, costs off)
+select *
+from public.customer_directory
+order by name
+limit 50;
+
+-- app/api/shipments (first page)
+explain (analyze, buffers, costs off)
+select *
+from public.shipment_list
+order by created_at desc, id desc
+limit 100;
+
+explain (analyze, buffers, costs off)
+select count(*) from public.shipments;
+
+-- As customer
+
+select set_config(
+  'request.jwt.claims',
+  json_build_object('sub', :customer_user_id, 'role', 'authenticated')::text,
+  true
+);
+
+explain (analyze, buffers, costs off)
+select count(*) from public.shipments;
+
+explain (analyze, buffers, costs off)
+select count(*) from public.barcodes;
+
+explain (analyze, buffers, costs off)
+select count(*) from public.invoices;
+
+rollback;
@@ -3,4 +3,7 @@ export class Resend {
   emails: {
     send(input: any): Promise<any>;
   };
+  batch: {
+    send(input: any[]): Promise<any>;
+  };
 }
@@ -12,43 +12,171 @@ const openAiKey = Deno.env.get("OPENAI_API_KEY")!;
 const supabase = createClient(supabaseUrl, supabaseServiceKey);
 const openai = createOpenAI({ apiKey: openAiKey });
 
-serve(async (req: Request) => {
-  try {
-    // 1. Fetch key metrics for the day
-    const { count: shipmentCount } = await supabase
-      .from("shipments")
-      .select("*", { count: "exact", head: true })
-      .gte("created_at", new Date().toISOString().split("T")[0]);
-
-    const { count: ticketsCount } = await supabase
-      .from("tickets")
-      .select("*", { count: "exact", head: true })
-      .eq("status", "open");
-
-    const { data: alerts } = await supabase
-      .from("alerts")
-      .select("message, severity")
-      .eq("is_read", false)
-      .limit(5);
-
-    // 2. Generate Summary with AI
-    const prompt = `
+const MODEL = "gpt-4o-mini";
+
+// A stored summary is reused until it is this old...
+const SUMMARY_TTL_MS = Number(Deno.env.get("SUMMARY_TTL_MINUTES") || 60) * 60_000;
+// ...or a metric moves by at least this much (absolute, or relative share)
+const MATERIAL_CHANGE_ABS = 5;
+const MATERIAL_CHANGE_RATIO = 0.2;
+// How long a caller without a summary waits for a concurrent regeneration
+const GENERATION_WAIT_MS = 20_000;
+const GENERATION_POLL_MS = 1_000;
+
+// summary_metrics() in 20260101_add_daily_summary_cache.sql
+interface SummaryMetrics {
+  day: string;
+  new_shipments: number;
+  // Of today's new shipments, how many are delivered
+  new_shipments_delivered: number;
+  open_tickets: number;
+  unread_alerts: number;
+}
+
+const COMPARED_METRICS = [
+  "new_shipments",
+  "new_shipments_delivered",
+  "open_tickets",
+  "unread_alerts",
+] as const;
+
+function changedMaterially(previous: SummaryMetrics, current: SummaryMetrics) {
+  if (previous.day !== current.day) return true;
+
+  return COMPARED_METRICS.some((key) => {
+    const before = Number(previous[key] ?? 0);
+    const after = Number(current[key] ?? 0);
+    const delta = Math.abs(after - before);
+    return (
+      delta >= MATERIAL_CHANGE_ABS ||
+      (delta > 0 && delta >= MATERIAL_CHANGE_RATIO * Math.max(before, after))
+    );
+  });
+}
+
+async function generateSummary(metrics: SummaryMetrics) {
+  // Only fetched when a new summary is actually generated
+  const { data: alerts } = await supabase
+    .from("alerts")
+    .select("message, severity")
+    .eq("is_read", false)
+    .limit(5);
+
+  const prompt = `
       You are an operations assistant for a logistics company.
       Summarize the current status based on these metrics:
-      - New shipments today: ${shipmentCount || 0}
-      - Open support tickets: ${ticketsCount || 0}
-      - Recent alerts: ${JSON.stringify(alerts)}
+      - New shipments today: ${metrics.new_shipments}
+      - Of those, already delivered: ${metrics.new_shipments_delivered}
+      - Open support tickets: ${metrics.open_tickets}
+      - Unread alerts: ${metrics.unread_alerts}
+      - Recent alerts: ${JSON.stringify(alerts ?? [])}
 
       Provide a concise 2-sentence summary for the dashboard header.
     `;
 
-    const { text } = await generateText({
-      model: openai("gpt-4o-mini"),
-      prompt: prompt,
+  const { text } = await generateText({
+    model: openai(MODEL),
+    prompt: prompt,
+  });
+
+  return text;
+}
+
+async function readSummary(day: string) {
+  const { data, error } = await supabase
+    .from("daily_summaries")
+    .select("summary, metrics, generated_at")
+    .eq("day", day)
+    .maybeSingle();
+  if (error) throw error;
+  return data;
+}
+
+function cachedResponse(
+  stored: { summary: string; generated_at: string },
+  metrics: SummaryMetrics
+) {
+  return new Response(
+    JSON.stringify({
+      summary: stored.summary,
+      metrics,
+      generatedAt: stored.generated_at,
+      cached: true,
+    }),
+    { headers: { "Content-Type": "application/json" } }
+  );
+}
+
+serve(async (req: Request) => {
+  try {
+    const url = new URL(req.url);
+    const force = url.searchParams.get("refresh") === "true";
+
+    // 1. Current metrics from the rollup counters
+    const { data: metricsData, error: metricsError } = await supabase.rpc("summary_metrics");
+    if (metricsError) throw metricsError;
+    const metrics = metricsData as SummaryMetrics;
+
+    // 2. Reuse today's summary while it is fresh and still accurate
+    const cached = await readSummary(metrics.day);
+
+    if (
+      cached?.summary &&
+      !force &&
+      Date.now() - new Date(cached.generated_at).getTime() < SUMMARY_TTL_MS &&
+      !changedMaterially(cached.metrics as SummaryMetrics, metrics)
+    ) {
+      return cachedResponse(cached, metrics);
+    }
+
+    // 3. One caller regenerates; the others serve what is stored
+    const { data: claimed, error: claimError } = await supabase.rpc("claim_daily_summary", {
+      p_day: metrics.day,
+    });
+    if (claimError) throw claimError;
+
+    if (!claimed) {
+      if (cached?.summary) return cachedResponse(cached, metrics);
+
+      // Nothing stored yet for today: wait for the caller generating it
+      const deadline = Date.now() + GENERATION_WAIT_MS;
+      while (Date.now() < deadline) {
+        await new Promise((resolve) => setTimeout(resolve, GENERATION_POLL_MS));
+        const stored = await readSummary(metrics.day);
+        if (stored?.summary) return cachedResponse(stored, metrics);
+      }
+
+      return new Response(JSON.stringify({ error: "Summary is being generated" }), {
+        status: 503,
+        headers: { "Content-Type": "application/json", "Retry-After": "10" },
+      });
+    }
+
+    // 4. Generate Summary with AI and store it
+    let summary: string;
+    try {
+      summary = await generateSummary(metrics);
+    } catch (error) {
+      await supabase.rpc("release_daily_summary", { p_day: metrics.day });
+      throw error;
+    }
+    const generatedAt = new Date().toISOString();
+
+    const { error: saveError } = await supabase.from("daily_summaries").upsert({
+      day: metrics.day,
+      summary,
+      metrics,
+      model: MODEL,
+      generated_at: generatedAt,
+      generating_at: null,
     });
+    if (saveError) {
+      console.error("Failed to store daily summary:", saveError);
+      await supabase.rpc("release_daily_summary", { p_day: metrics.day });
+    }
 
     return new Response(
-      JSON.stringify({ summary: text }),
+      JSON.stringify({ summary, metrics, generatedAt, cached: false }),
       { headers: { "Content-Type": "application/json" } }
     );
   } catch (error: any) {
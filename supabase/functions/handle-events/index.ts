@@ -10,6 +10,16 @@ const resendApiKey = Deno.env.get("RESEND_API_KEY")!;
 const supabase = createClient(supabaseUrl, supabaseServiceKey);
 const resend = new Resend(resendApiKey);
 
+// Resend accepts up to 100 emails per batch call
+const EMAIL_BATCH_SIZE = 100;
+// Resend's default rate limit is 2 requests/s: batch calls start at least
+// this far apart, and one rejected with 429 is retried after a backoff
+const EMAIL_BATCH_INTERVAL_MS = 500;
+const EMAIL_RATE_LIMIT_BACKOFF_MS = 1_000;
+const EMAIL_MAX_ATTEMPTS = 3;
+
+const EMAIL_FROM = "Tapango Logistics <notifications@tapango.com>"; // Valid sender required
+
 interface WebhookPayload {
   type: "INSERT" | "UPDATE" | "DELETE";
   table: string;
@@ -18,21 +28,84 @@ interface WebhookPayload {
   schema: string;
 }
 
+// Statement-level payload (20251231_add_batched_event_triggers.sql): every
+// row touched by one statement, old_records aligned with records
+interface BatchedWebhookPayload {
+  type: "INSERT" | "UPDATE" | "DELETE";
+  table: string;
+  schema: string;
+  records: any[];
+  old_records?: any[] | null;
+}
+
+interface AlertInput {
+  type: string;
+  message: string;
+  severity: string;
+}
+
+interface CustomerNotification {
+  customerId: string;
+  subject: string;
+  text: string;
+}
+
+// Work collected from every event in the request, applied in bulk
+interface EventEffects {
+  alerts: AlertInput[];
+  notifications: CustomerNotification[];
+}
+
+/**
+ * Accepts a single database webhook payload (row-level), an array of them,
+ * or a statement-level batch, and flattens them to per-row events.
+ */
+function toEvents(body: any): WebhookPayload[] {
+  const payloads: any[] = Array.isArray(body) ? body : [body];
+
+  return payloads.flatMap((payload) => {
+    if (!Array.isArray(payload?.records)) return [payload as WebhookPayload];
+
+    const batch = payload as BatchedWebhookPayload;
+    return batch.records.map((record, index) => ({
+      type: batch.type,
+      table: batch.table,
+      schema: batch.schema,
+      record,
+      old_record: batch.old_records?.[index] ?? null,
+    }));
+  });
+}
+
 Deno.serve(async (req: Request) => {
   try {
-    const payload: WebhookPayload = await req.json();
+    const events = toEvents(await req.json());
+
+    console.log(`Received ${events.length} event(s)`);
 
-    console.log(`Received ${payload.type} event from ${payload.table}`);
+    const effects: EventEffects = { alerts: [], notifications: [] };
 
-    if (payload.table === "shipments") {
-      await handleShipmentEvent(payload);
-    } else if (payload.table === "tickets") {
-      await handleTicketEvent(payload);
+    for (const event of events) {
+      if (event.table === "shipments") {
+        collectShipmentEffects(event, effects);
+      } else if (event.table === "tickets") {
+        collectTicketEffects(event, effects);
+      }
     }
 
-    return new Response(JSON.stringify({ success: true }), {
-      headers: { "Content-Type": "application/json" },
-    });
+    await Promise.all([createAlerts(effects.alerts), notifyCustomers(effects.notifications)]);
+
+    return new Response(
+      JSON.stringify({
+        success: true,
+        events: events.length,
+        alerts: effects.alerts.length,
+        notifications: effects.notifications.length,
+      }),
+      {
+        headers: { "Content-Type": "application/json" },
+      }
+    );
   } catch (error: any) {
     console.error("Error processing webhook:", error);
     return new Response(JSON.stringify({ error: error.message || "Unknown error" }), {
@@ -42,13 +115,13 @@ Deno.serve(async (req: Request) => {
   }
 });
 
-async function handleShipmentEvent(payload: WebhookPayload) {
+function collectShipmentEffects(payload: WebhookPayload, effects: EventEffects) {
   const { record, old_record, type } = payload;
 
   // Scenario 1: Shipment Created
   if (type === "INSERT") {
     // Notify Admin/Ops
-    await createAlert({
+    effects.alerts.push({
       type: "shipment",
       message: `New shipment created: ${record.shipment_ref} (${record.origin} -> ${record.destination})`,
       severity: "info",
@@ -56,80 +129,130 @@ async function handleShipmentEvent(payload: WebhookPayload) {
 
     // Notify Customer (if email exists)
     if (record.customer_id) {
-       await notifyCustomer(record.customer_id, "Shipment Created", 
-         `Your shipment ${record.shipment_ref} has been created and is ready for processing.`);
+      effects.notifications.push({
+        customerId: record.customer_id,
+        subject: "Shipment Created",
+        text: `Your shipment ${record.shipment_ref} has been created and is ready for processing.`,
+      });
     }
   }
 
   // Scenario 2: Status Changed to 'delivered'
-  if (type === "UPDATE" && record.status === "delivered" && old_record.status !== "delivered") {
-    await createAlert({
+  if (type === "UPDATE" && record.status === "delivered" && old_record?.status !== "delivered") {
+    effects.alerts.push({
       type: "shipment",
       message: `Shipment delivered: ${record.shipment_ref}`,
       severity: "success",
     });
 
     if (record.customer_id) {
-        await notifyCustomer(record.customer_id, "Shipment Delivered", 
-          `Good news! Your shipment ${record.shipment_ref} has been delivered successfully.`);
-     }
+      effects.notifications.push({
+        customerId: record.customer_id,
+        subject: "Shipment Delivered",
+        text: `Good news! Your shipment ${record.shipment_ref} has been delivered successfully.`,
+      });
+    }
   }
-  
+
   // Scenario 3: Status Changed to 'cancelled'
-  if (type === "UPDATE" && record.status === "cancelled" && old_record.status !== "cancelled") {
-      await createAlert({
-        type: "shipment",
-        message: `Shipment cancelled: ${record.shipment_ref}`,
-        severity: "warning",
-      });
+  if (type === "UPDATE" && record.status === "cancelled" && old_record?.status !== "cancelled") {
+    effects.alerts.push({
+      type: "shipment",
+      message: `Shipment cancelled: ${record.shipment_ref}`,
+      severity: "warning",
+    });
   }
 }
 
-async function handleTicketEvent(payload: WebhookPayload) {
-    const { record, type } = payload;
-    
-    if (type === "INSERT") {
-        await createAlert({
-            type: "support",
-            message: `New support ticket: ${record.subject} (${record.priority})`,
-            severity: record.priority === 'high' ? 'warning' : 'info',
-        });
-    }
+function collectTicketEffects(payload: WebhookPayload, effects: EventEffects) {
+  const { record, type } = payload;
+
+  if (type === "INSERT") {
+    effects.alerts.push({
+      type: "support",
+      message: `New support ticket: ${record.subject} (${record.priority})`,
+      severity: record.priority === "high" ? "warning" : "info",
+    });
+  }
 }
 
-async function createAlert(alert: { type: string; message: string; severity: string }) {
-  const { error } = await supabase.from("alerts").insert({
-    type: alert.type,
-    message: alert.message,
-    severity: alert.severity,
-    is_read: false,
-  });
+async function createAlerts(alerts: AlertInput[]) {
+  if (alerts.length === 0) return;
+
+  const { error } = await supabase.from("alerts").insert(
+    alerts.map((alert) => ({
+      type: alert.type,
+      message: alert.message,
+      severity: alert.severity,
+      is_read: false,
+    }))
+  );
 
   if (error) {
-    console.error("Failed to create alert:", error);
+    console.error("Failed to create alerts:", error);
   }
 }
 
-async function notifyCustomer(customerId: string, subject: string, text: string) {
-    // 1. Get customer email
-    const { data: customer } = await supabase
-        .from("customers")
-        .select("email, name")
-        .eq("id", customerId)
-        .single();
-    
-    if (!customer?.email) return;
-
-    // 2. Send Email via Resend
+async function notifyCustomers(notifications: CustomerNotification[]) {
+  if (notifications.length === 0) return;
+
+  // 1. Get customer emails in one query
+  const customerIds = Array.from(new Set(notifications.map((n) => n.customerId)));
+  const { data: customers, error } = await supabase
+    .from("customers")
+    .select("id, email, name")
+    .in("id", customerIds);
+
+  if (error) {
+    console.error("Failed to load customers for notifications:", error);
+    return;
+  }
+
+  const customersById = new Map<string, { email: string | null; name: string | null }>(
+    ((customers as any[] | null) ?? []).map((customer) => [customer.id, customer])
+  );
+
+  const emails = notifications.flatMap((notification) => {
+    const customer = customersById.get(notification.customerId);
+    if (!customer?.email) return [];
+
+    return [
+      {
+        from: EMAIL_FROM,
+        to: [customer.email],
+        subject: `[Tapango] ${notification.subject}`,
+        html: `<p>Hi ${customer.name},</p><p>${notification.text}</p><p>Track here: <a href="https://tapango.com/track">Track Shipment</a></p>`,
+      },
+    ];
+  });
+
+  // 2. Send via Resend's batch API, paced to its rate limit
+  let nextSendAt = 0;
+  for (let i = 0; i < emails.length; i += EMAIL_BATCH_SIZE) {
+    const batch = emails.slice(i, i + EMAIL_BATCH_SIZE);
     try {
-        await resend.emails.send({
-            from: "Tapango Logistics <notifications@tapango.com>", // Valid sender required
-            to: [customer.email],
-            subject: `[Tapango] ${subject}`,
-            html: `<p>Hi ${customer.name},</p><p>${text}</p><p>Track here: <a href="https://tapango.com/track">Track Shipment</a></p>`,
-        });
-        console.log(`Email sent to ${customer.email}`);
+      for (let attempt = 1; ; attempt++) {
+        const wait = nextSendAt - Date.now();
+        if (wait > 0) await sleep(wait);
+        nextSendAt = Date.now() + EMAIL_BATCH_INTERVAL_MS;
+
+        const { error: sendError } = (await resend.batch.send(batch)) ?? {};
+        if (!sendError) break;
+        if (!isRateLimited(sendError) || attempt >= EMAIL_MAX_ATTEMPTS) throw sendError;
+
+        nextSendAt = Date.now() + EMAIL_RATE_LIMIT_BACKOFF_MS * attempt;
+      }
+      console.log(`Sent ${batch.length} email(s)`);
     } catch (err) {
-        console.error("Failed to send email", err);
+      console.error(`Failed to send ${batch.length} email(s)`, err);
     }
+  }
+}
+
+function isRateLimited(error: any) {
+  return error?.statusCode === 429 || error?.name === "rate_limit_exceeded";
+}
+
+function sleep(ms: number) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
 }
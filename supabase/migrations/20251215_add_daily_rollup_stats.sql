@@ -0,0 +1,218 @@
+-- Daily rollup tables for the analytics page
+-- Maintained incrementally by triggers on shipments and invoices so the
+-- dashboard reads at most one row per day instead of a year of raw rows.
+
+-- Days are bucketed in IST to match how the dashboard labels dates.
+create or replace function public.rollup_day(ts timestamptz)
+returns date as $$
+  select (ts at time zone 'Asia/Kolkata')::date;
+$$ language sql immutable;
+
+create table if not exists public.daily_shipment_stats (
+  day date primary key,
+  shipment_count integer not null default 0,
+  delivered_count integer not null default 0,
+  total_weight numeric(14,2) not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+create table if not exists public.daily_revenue_stats (
+  day date primary key,
+  invoice_count integer not null default 0,
+  revenue numeric(14,2) not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+-- ========================================
+-- Incremental maintenance
+-- ========================================
+
+create or replace function public.apply_shipment_stats_delta(
+  p_created_at timestamptz,
+  p_weight numeric,
+  p_status text,
+  p_sign integer
+)
+returns void as $$
+begin
+  if p_created_at is null then
+    return;
+  end if;
+
+  insert into public.daily_shipment_stats as s (
+    day, shipment_count, delivered_count, total_weight, updated_at
+  )
+  values (
+    public.rollup_day(p_created_at),
+    p_sign,
+    case when p_status = 'delivered' then p_sign else 0 end,
+    p_sign * coalesce(p_weight, 0),
+    now()
+  )
+  on conflict (day) do update set
+    shipment_count = s.shipment_count + excluded.shipment_count,
+    delivered_count = s.delivered_count + excluded.delivered_count,
+    total_weight = s.total_weight + excluded.total_weight,
+    updated_at = now();
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.apply_revenue_stats_delta(
+  p_invoice_date timestamptz,
+  p_amount numeric,
+  p_sign integer
+)
+returns void as $$
+begin
+  if p_invoice_date is null then
+    return;
+  end if;
+
+  insert into public.daily_revenue_stats as r (
+    day, invoice_count, revenue, updated_at
+  )
+  values (
+    public.rollup_day(p_invoice_date),
+    p_sign,
+    p_sign * coalesce(p_amount, 0),
+    now()
+  )
+  on conflict (day) do update set
+    invoice_count = r.invoice_count + excluded.invoice_count,
+    revenue = r.revenue + excluded.revenue,
+    updated_at = now();
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.shipments_daily_stats_trigger()
+returns trigger as $$
+begin
+  if tg_op = 'UPDATE'
+    and new.created_at is not distinct from old.created_at
+    and new.weight is not distinct from old.weight
+    and new.status is not distinct from old.status then
+    return new;
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.apply_shipment_stats_delta(old.created_at, old.weight, old.status, -1);
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.apply_shipment_stats_delta(new.created_at, new.weight, new.status, 1);
+    return new;
+  end if;
+
+  return old;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.invoices_daily_stats_trigger()
+returns trigger as $$
+begin
+  if tg_op = 'UPDATE'
+    and new.invoice_date is not distinct from old.invoice_date
+    and new.amount is not distinct from old.amount then
+    return new;
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.apply_revenue_stats_delta(old.invoice_date, old.amount, -1);
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.apply_revenue_stats_delta(new.invoice_date, new.amount, 1);
+    return new;
+  end if;
+
+  return old;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+drop trigger if exists shipments_daily_stats on public.shipments;
+create trigger shipments_daily_stats
+  after insert or update or delete on public.shipments
+  for each row execute function public.shipments_daily_stats_trigger();
+
+drop trigger if exists invoices_daily_stats on public.invoices;
+create trigger invoices_daily_stats
+  after insert or update or delete on public.invoices
+  for each row execute function public.invoices_daily_stats_trigger();
+
+-- ========================================
+-- Backfill
+-- ========================================
+
+-- Recomputes the rollups for [p_from, p_to] from the source tables.
+-- Safe to re-run; used for the initial load and to repair drift.
+create or replace function public.backfill_daily_stats(
+  p_from date default null,
+  p_to date default null
+)
+returns void as $$
+declare
+  v_from date := coalesce(p_from, '-infinity'::date);
+  v_to date := coalesce(p_to, 'infinity'::date);
+begin
+  delete from public.daily_shipment_stats where day between v_from and v_to;
+  delete from public.daily_revenue_stats where day between v_from and v_to;
+
+  insert into public.daily_shipment_stats (
+    day, shipment_count, delivered_count, total_weight, updated_at
+  )
+  select
+    public.rollup_day(created_at) as day,
+    count(*),
+    count(*) filter (where status = 'delivered'),
+    coalesce(sum(weight), 0),
+    now()
+  from public.shipments
+  where created_at is not null
+    and public.rollup_day(created_at) between v_from and v_to
+  group by 1;
+
+  insert into public.daily_revenue_stats (
+    day, invoice_count, revenue, updated_at
+  )
+  select
+    public.rollup_day(invoice_date) as day,
+    count(*),
+    coalesce(sum(amount), 0),
+    now()
+  from public.invoices
+  where invoice_date is not null
+    and public.rollup_day(invoice_date) between v_from and v_to
+  group by 1;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+select public.backfill_daily_stats();
+
+-- ========================================
+-- Row Level Security
+-- ========================================
+
+alter table public.daily_shipment_stats enable row level security;
+alter table public.daily_revenue_stats enable row level security;
+
+drop policy if exists "operators_view_daily_shipment_stats" on public.daily_shipment_stats;
+create policy "operators_view_daily_shipment_stats" on public.daily_shipment_stats
+  for select
+  using (
+    exists (
+      select 1 from users
+      where users.id = auth.uid()
+      and users.role in ('operator', 'admin')
+    )
+  );
+
+drop policy if exists "operators_view_daily_revenue_stats" on public.daily_revenue_stats;
+create policy "operators_view_daily_revenue_stats" on public.daily_revenue_stats
+  for select
+  using (
+    exists (
+      select 1 from users
+      where users.id = auth.uid()
+      and users.role in ('operator', 'admin')
+    )
+  );
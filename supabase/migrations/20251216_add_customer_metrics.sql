@@ -0,0 +1,285 @@
+-- Per-customer aggregates for the customers page
+-- customer_metrics is kept current by delta triggers on shipments and
+-- invoices; customer_directory joins it onto customers so the page can
+-- paginate and sort on metrics with a single query.
+
+create table if not exists public.customer_metrics (
+  customer_id uuid primary key
+    references public.customers (id) on delete cascade,
+  shipment_count integer not null default 0,
+  total_revenue numeric(14,2) not null default 0,
+  outstanding_amount numeric(14,2) not null default 0,
+  last_invoice_date timestamptz,
+  updated_at timestamptz not null default now()
+);
+
+create index if not exists customer_metrics_total_revenue_idx
+  on public.customer_metrics (total_revenue desc);
+
+create index if not exists customer_metrics_outstanding_amount_idx
+  on public.customer_metrics (outstanding_amount desc);
+
+-- Applies a change to one customer's row, the way the daily rollups do:
+-- counters move by deltas under the row lock, so concurrent writers for the
+-- same customer add up instead of overwriting each other, and each write
+-- costs O(1) regardless of the customer's history.
+-- Only ever updates: customers_metrics_insert_trigger (and the backfill
+-- below) create the rows. A customer being deleted has no row left to
+-- update, so the cascading shipment and invoice deletes neither recreate it
+-- (an FK violation) nor leave negative counters behind.
+create or replace function public.apply_customer_metrics_delta(
+  p_customer_id uuid,
+  p_shipments integer,
+  p_revenue numeric,
+  p_outstanding numeric,
+  p_invoice_date timestamptz default null
+)
+returns void as $$
+begin
+  if p_customer_id is null then
+    return;
+  end if;
+
+  update public.customer_metrics m
+  set
+    shipment_count = m.shipment_count + p_shipments,
+    total_revenue = m.total_revenue + p_revenue,
+    outstanding_amount = m.outstanding_amount + p_outstanding,
+    last_invoice_date = greatest(m.last_invoice_date, p_invoice_date),
+    updated_at = now()
+  where m.customer_id = p_customer_id;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Recomputes one customer's row from the source tables. Not used by the
+-- triggers; run it to repair a customer whose metrics have drifted.
+create or replace function public.refresh_customer_metrics(p_customer_id uuid)
+returns void as $$
+begin
+  if p_customer_id is null then
+    return;
+  end if;
+
+  insert into public.customer_metrics (
+    customer_id,
+    shipment_count,
+    total_revenue,
+    outstanding_amount,
+    last_invoice_date,
+    updated_at
+  )
+  select
+    c.id,
+    (select count(*) from public.shipments s where s.customer_id = c.id),
+    coalesce(inv.total_revenue, 0),
+    coalesce(inv.outstanding_amount, 0),
+    inv.last_invoice_date,
+    now()
+  from public.customers c
+  left join lateral (
+    select
+      sum(i.amount) as total_revenue,
+      sum(i.amount) filter (where i.status in ('pending', 'overdue')) as outstanding_amount,
+      max(i.invoice_date) as last_invoice_date
+    from public.invoices i
+    where i.customer_id = c.id
+  ) inv on true
+  where c.id = p_customer_id
+  on conflict (customer_id) do update set
+    shipment_count = excluded.shipment_count,
+    total_revenue = excluded.total_revenue,
+    outstanding_amount = excluded.outstanding_amount,
+    last_invoice_date = excluded.last_invoice_date,
+    updated_at = now();
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.shipments_customer_metrics_trigger()
+returns trigger as $$
+begin
+  if tg_op = 'UPDATE' and new.customer_id is not distinct from old.customer_id then
+    return new;
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.apply_customer_metrics_delta(old.customer_id, -1, 0, 0);
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.apply_customer_metrics_delta(new.customer_id, 1, 0, 0);
+    return new;
+  end if;
+
+  return old;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.invoices_customer_metrics_trigger()
+returns trigger as $$
+begin
+  if tg_op = 'UPDATE'
+    and new.customer_id is not distinct from old.customer_id
+    and new.amount is not distinct from old.amount
+    and new.status is not distinct from old.status
+    and new.invoice_date is not distinct from old.invoice_date then
+    return new;
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.apply_customer_metrics_delta(
+      old.customer_id,
+      0,
+      -coalesce(old.amount, 0),
+      case when old.status in ('pending', 'overdue') then -coalesce(old.amount, 0) else 0 end
+    );
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.apply_customer_metrics_delta(
+      new.customer_id,
+      0,
+      coalesce(new.amount, 0),
+      case when new.status in ('pending', 'overdue') then coalesce(new.amount, 0) else 0 end,
+      new.invoice_date
+    );
+  end if;
+
+  -- last_invoice_date is a max, not a sum: only when the latest invoice is
+  -- deleted, moved to another customer or back-dated does it need a rescan
+  if tg_op in ('UPDATE', 'DELETE')
+    and old.invoice_date is not null
+    and (
+      tg_op = 'DELETE'
+      or new.customer_id is distinct from old.customer_id
+      or new.invoice_date is distinct from old.invoice_date
+    ) then
+    update public.customer_metrics m
+    set last_invoice_date = (
+      select max(i.invoice_date)
+      from public.invoices i
+      where i.customer_id = old.customer_id
+    )
+    where m.customer_id = old.customer_id
+      and m.last_invoice_date <= old.invoice_date;
+  end if;
+
+  if tg_op = 'DELETE' then
+    return old;
+  end if;
+  return new;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.customers_metrics_insert_trigger()
+returns trigger as $$
+begin
+  insert into public.customer_metrics (customer_id)
+  values (new.id)
+  on conflict (customer_id) do nothing;
+  return new;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+drop trigger if exists shipments_customer_metrics on public.shipments;
+create trigger shipments_customer_metrics
+  after insert or update or delete on public.shipments
+  for each row execute function public.shipments_customer_metrics_trigger();
+
+drop trigger if exists invoices_customer_metrics on public.invoices;
+create trigger invoices_customer_metrics
+  after insert or update or delete on public.invoices
+  for each row execute function public.invoices_customer_metrics_trigger();
+
+drop trigger if exists customers_metrics_insert on public.customers;
+create trigger customers_metrics_insert
+  after insert on public.customers
+  for each row execute function public.customers_metrics_insert_trigger();
+
+-- Trigger and maintenance helpers only; a delta callable over RPC would let
+-- any user rewrite the metrics
+revoke execute on function public.apply_customer_metrics_delta(uuid, integer, numeric, numeric, timestamptz) from public, anon, authenticated;
+revoke execute on function public.refresh_customer_metrics(uuid) from public, anon, authenticated;
+
+-- Initial backfill for existing customers
+insert into public.customer_metrics (
+  customer_id,
+  shipment_count,
+  total_revenue,
+  outstanding_amount,
+  last_invoice_date,
+  updated_at
+)
+select
+  c.id,
+  coalesce(s.shipment_count, 0),
+  coalesce(i.total_revenue, 0),
+  coalesce(i.outstanding_amount, 0),
+  i.last_invoice_date,
+  now()
+from public.customers c
+left join (
+  select customer_id, count(*) as shipment_count
+  from public.shipments
+  where customer_id is not null
+  group by customer_id
+) s on s.customer_id = c.id
+left join (
+  select
+    customer_id,
+    sum(amount) as total_revenue,
+    sum(amount) filter (where status in ('pending', 'overdue')) as outstanding_amount,
+    max(invoice_date) as last_invoice_date
+  from public.invoices
+  where customer_id is not null
+  group by customer_id
+) i on i.customer_id = c.id
+on conflict (customer_id) do update set
+  shipment_count = excluded.shipment_count,
+  total_revenue = excluded.total_revenue,
+  outstanding_amount = excluded.outstanding_amount,
+  last_invoice_date = excluded.last_invoice_date,
+  updated_at = now();
+
+-- ========================================
+-- Directory view
+-- ========================================
+
+-- security_invoker keeps the customers RLS policies in force for callers.
+create or replace view public.customer_directory
+with (security_invoker = true) as
+select
+  c.id,
+  c.name,
+  c.email,
+  c.phone,
+  c.city,
+  c.created_at,
+  coalesce(m.shipment_count, 0) as shipment_count,
+  coalesce(m.total_revenue, 0) as total_revenue,
+  coalesce(m.outstanding_amount, 0) as outstanding_amount,
+  m.last_invoice_date
+from public.customers c
+left join public.customer_metrics m on m.customer_id = c.id;
+
+alter table public.customer_metrics enable row level security;
+
+drop policy if exists "operators_view_customer_metrics" on public.customer_metrics;
+create policy "operators_view_customer_metrics" on public.customer_metrics
+  for select
+  using (
+    exists (
+      select 1 from users
+      where users.id = auth.uid()
+      and users.role in ('operator', 'admin')
+    )
+  );
+
+drop policy if exists "customers_own_metrics" on public.customer_metrics;
+create policy "customers_own_metrics" on public.customer_metrics
+  for select
+  using (
+    customer_id in (
+      select id from customers
+      where user_id = auth.uid()
+    )
+  );
@@ -0,0 +1,38 @@
+-- Paginated invoices listing
+-- invoice_list joins the customer name and an aggregated shipment count so
+-- /api/invoices/list can page through invoices with keyset pagination on
+-- (created_at, id) without shipping invoice_items rows to the browser.
+
+create index if not exists idx_invoices_created_at_id
+  on public.invoices (created_at desc, id desc);
+
+create index if not exists idx_invoices_status_created_at_id
+  on public.invoices (status, created_at desc, id desc);
+
+create index if not exists idx_invoices_customer_created_at_id
+  on public.invoices (customer_id, created_at desc, id desc);
+
+create index if not exists idx_invoice_items_invoice_id
+  on public.invoice_items (invoice_id);
+
+-- The shipment count is a correlated subquery in the select list, so it is
+-- only evaluated for the rows that survive the LIMIT of a page.
+create or replace view public.invoice_list
+with (security_invoker = true) as
+select
+  i.id,
+  i.invoice_ref,
+  i.customer_id,
+  c.name as customer_name,
+  i.amount,
+  i.status,
+  i.due_date,
+  i.created_at,
+  lower(coalesce(i.invoice_ref, '') || ' ' || coalesce(c.name, '')) as search_text,
+  (
+    select count(distinct ii.shipment_id)
+    from public.invoice_items ii
+    where ii.invoice_id = i.id
+  ) as shipment_count
+from public.invoices i
+left join public.customers c on c.id = i.customer_id;
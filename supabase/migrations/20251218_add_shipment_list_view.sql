@@ -0,0 +1,34 @@
+-- Paginated shipments listing
+-- shipment_list joins the customer name so GET /api/shipments can serve
+-- keyset pages ordered by (created_at, id) with server-side filters.
+
+create index if not exists idx_shipments_created_at_id
+  on public.shipments (created_at desc, id desc);
+
+create index if not exists idx_shipments_status_created_at_id
+  on public.shipments (status, created_at desc, id desc);
+
+create index if not exists idx_shipments_customer_created_at_id
+  on public.shipments (customer_id, created_at desc, id desc);
+
+create index if not exists idx_shipments_route_created_at_id
+  on public.shipments (origin, destination, created_at desc, id desc);
+
+create or replace view public.shipment_list
+with (security_invoker = true) as
+select
+  s.id,
+  s.shipment_ref,
+  s.customer_id,
+  c.name as customer_name,
+  s.origin,
+  s.destination,
+  s.weight,
+  s.status,
+  s.progress,
+  s.location,
+  s.created_at,
+  s.updated_at,
+  lower(coalesce(s.shipment_ref, '') || ' ' || coalesce(c.name, '')) as search_text
+from public.shipments s
+left join public.customers c on c.id = s.customer_id;
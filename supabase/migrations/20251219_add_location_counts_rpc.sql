@@ -0,0 +1,56 @@
+-- Per-location row counts for dashboard stats
+-- One GROUP BY per table instead of one exact count query per hub. For
+-- operators and admins on large tables the counts come from planner
+-- statistics (reltuples and the most-common-values histogram on location),
+-- so no table scan runs. Statistics ignore RLS, so everyone else always gets
+-- the exact count of the rows they can see.
+
+create or replace function public.location_counts(table_name text)
+returns table (location text, row_count bigint, estimated boolean) as $$
+declare
+  -- Below this many rows the exact count is cheap enough
+  v_estimate_threshold constant bigint := 100000;
+  v_reltuples double precision;
+begin
+  if table_name not in (
+    'shipments', 'customers', 'invoices', 'inventory_items', 'barcodes', 'manifests', 'users'
+  ) then
+    raise exception 'location_counts: unsupported table %', table_name
+      using errcode = '22023';
+  end if;
+
+  if public.is_operator_or_admin((select auth.uid())) then
+    select c.reltuples into v_reltuples
+    from pg_class c
+    join pg_namespace n on n.oid = c.relnamespace
+    where n.nspname = 'public' and c.relname = table_name;
+  end if;
+
+  if coalesce(v_reltuples, -1) > v_estimate_threshold then
+    return query
+      select
+        v.val::text,
+        round(v_reltuples * v.freq)::bigint,
+        true
+      from pg_stats s
+      cross join lateral unnest(
+        s.most_common_vals::text::text[],
+        s.most_common_freqs
+      ) as v(val, freq)
+      where s.schemaname = 'public'
+        and s.tablename = table_name
+        and s.attname = 'location';
+
+    if found then
+      return;
+    end if;
+  end if;
+
+  return query execute format(
+    'select location::text, count(*)::bigint, false from public.%I group by location',
+    table_name
+  );
+end;
+$$ language plpgsql stable;
+
+grant execute on function public.location_counts(text) to authenticated;
@@ -0,0 +1,51 @@
+-- Custom access token hook: embed role and location claims in the JWT
+-- Enable in the Supabase dashboard under Authentication > Hooks
+-- ("Customize Access Token (JWT) Claims" -> public.custom_access_token_hook),
+-- or in config.toml:
+--   [auth.hook.custom_access_token]
+--   enabled = true
+--   uri = "pg-functions://postgres/public/custom_access_token_hook"
+--
+-- middleware.ts and withAuth read `user_role` and `user_location` from the
+-- verified token instead of querying users on every request.
+
+create or replace function public.custom_access_token_hook(event jsonb)
+returns jsonb as $$
+declare
+  claims jsonb;
+  v_role text;
+  v_location text;
+begin
+  select role, location into v_role, v_location
+  from public.users
+  where id = (event->>'user_id')::uuid;
+
+  claims := event->'claims';
+
+  if v_role is not null then
+    claims := jsonb_set(claims, '{user_role}', to_jsonb(v_role));
+  else
+    claims := jsonb_set(claims, '{user_role}', 'null');
+  end if;
+
+  if v_location is not null then
+    claims := jsonb_set(claims, '{user_location}', to_jsonb(v_location));
+  else
+    claims := jsonb_set(claims, '{user_location}', 'null');
+  end if;
+
+  return jsonb_set(event, '{claims}', claims);
+end;
+$$ language plpgsql stable;
+
+grant usage on schema public to supabase_auth_admin;
+grant execute on function public.custom_access_token_hook(jsonb) to supabase_auth_admin;
+revoke execute on function public.custom_access_token_hook(jsonb) from authenticated, anon, public;
+
+grant select (id, role, location) on table public.users to supabase_auth_admin;
+
+drop policy if exists "auth_admin_read_users" on public.users;
+create policy "auth_admin_read_users" on public.users
+  as permissive for select
+  to supabase_auth_admin
+  using (true);
@@ -0,0 +1,17 @@
+-- Publish users changes so server instances can evict cached user context
+-- (role/location) as soon as a row changes. See lib/user-context.ts.
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_publication_tables
+    WHERE pubname = 'supabase_realtime'
+      AND schemaname = 'public'
+      AND tablename = 'users'
+  ) THEN
+    ALTER PUBLICATION supabase_realtime ADD TABLE public.users;
+  END IF;
+END $$;
+
+-- The cache only needs the id, which delete events carry under the default
+-- replica identity (primary key), so the table keeps it.
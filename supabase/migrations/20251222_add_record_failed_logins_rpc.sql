@@ -0,0 +1,46 @@
+-- Batched, atomic failed-login counters for account lockout
+-- lib/account-lockout.ts coalesces failures per instance and flushes them
+-- here in one call. Each entry is an increment, not a read-then-write, so
+-- concurrent instances never lose counts. Reaching the threshold locks the
+-- account and resets the counter, matching the previous upsert behaviour.
+
+create or replace function public.record_failed_logins(
+  p_failures jsonb,
+  p_threshold integer,
+  p_lock_minutes integer
+)
+returns table (email_hash text, login_failed_count integer, locked_until timestamptz) as $$
+#variable_conflict use_column
+begin
+  return query
+  insert into auth_lockouts as l (email_hash, login_failed_count, locked_until, updated_at)
+  select
+    f.email_hash,
+    case when f.failures >= p_threshold then 0 else f.failures end,
+    case
+      when f.failures >= p_threshold then now() + make_interval(mins => p_lock_minutes)
+      else null
+    end,
+    now()
+  from jsonb_to_recordset(p_failures) as f(email_hash text, failures integer)
+  on conflict on constraint auth_lockouts_pkey do update
+    set
+      login_failed_count = case
+        when l.login_failed_count + excluded.login_failed_count >= p_threshold
+          or excluded.locked_until is not null
+          then 0
+        else l.login_failed_count + excluded.login_failed_count
+      end,
+      locked_until = case
+        when l.login_failed_count + excluded.login_failed_count >= p_threshold
+          or excluded.locked_until is not null
+          then now() + make_interval(mins => p_lock_minutes)
+        else l.locked_until
+      end,
+      updated_at = now()
+  returning l.email_hash, l.login_failed_count, l.locked_until;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+revoke execute on function public.record_failed_logins(jsonb, integer, integer) from public, anon, authenticated;
+grant execute on function public.record_failed_logins(jsonb, integer, integer) to service_role;
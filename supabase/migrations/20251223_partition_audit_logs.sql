@@ -0,0 +1,206 @@
+-- Monthly range partitions for audit_logs, with retention
+-- Inserts only touch the current month's partition and its small indexes;
+-- time-range scans use a BRIN index on created_at; expiring history is a
+-- DROP of whole partitions rather than a DELETE.
+
+-- ========================================
+-- Partitioned table
+-- ========================================
+
+alter table if exists public.audit_logs rename to audit_logs_legacy;
+
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'audit_logs_pkey'
+  ) THEN
+    ALTER TABLE public.audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey;
+  END IF;
+END $$;
+
+drop index if exists public.idx_audit_logs_event_type;
+drop index if exists public.idx_audit_logs_user_id;
+drop index if exists public.idx_audit_logs_created_at;
+drop index if exists public.idx_audit_logs_event_user;
+
+create table public.audit_logs (
+  id uuid not null default gen_random_uuid(),
+  event_type text not null,
+  user_id uuid null,
+  metadata jsonb not null,
+  created_at timestamptz not null default now(),
+  -- The partition key must be part of the primary key
+  primary key (id, created_at)
+) partition by range (created_at);
+
+-- Catches rows outside any monthly partition instead of failing the insert
+create table public.audit_logs_default partition of public.audit_logs default;
+
+create index idx_audit_logs_created_at_brin on public.audit_logs using brin (created_at);
+create index idx_audit_logs_user_created on public.audit_logs (user_id, created_at desc)
+  where user_id is not null;
+
+-- ========================================
+-- Partition management
+-- ========================================
+
+create or replace function public.create_audit_logs_partition(p_month date)
+returns text as $$
+declare
+  v_start date := date_trunc('month', p_month)::date;
+  v_end date := (date_trunc('month', p_month) + interval '1 month')::date;
+  v_name text := format('audit_logs_y%sm%s', to_char(v_start, 'YYYY'), to_char(v_start, 'MM'));
+begin
+  if to_regclass(format('public.%I', v_name)) is null then
+    -- Rows for this month may already sit in the default partition, which
+    -- would make the new partition's range overlap it. Detach the default,
+    -- create the partition, move the month's rows into it and re-attach.
+    alter table public.audit_logs detach partition public.audit_logs_default;
+
+    execute format(
+      'create table public.%I partition of public.audit_logs for values from (%L) to (%L)',
+      v_name, v_start, v_end
+    );
+
+    with moved as (
+      delete from public.audit_logs_default
+      where created_at >= v_start and created_at < v_end
+      returning id, event_type, user_id, metadata, created_at
+    )
+    insert into public.audit_logs (id, event_type, user_id, metadata, created_at)
+    select id, event_type, user_id, metadata, created_at from moved;
+
+    alter table public.audit_logs attach partition public.audit_logs_default default;
+  end if;
+  return v_name;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Drop monthly partitions whose whole range is older than the retention
+create or replace function public.prune_audit_logs(p_keep_months integer default 12)
+returns integer as $$
+declare
+  v_cutoff date := (date_trunc('month', now()) - make_interval(months => p_keep_months))::date;
+  v_partition record;
+  v_dropped integer := 0;
+begin
+  for v_partition in
+    select c.relname
+    from pg_inherits i
+    join pg_class c on c.oid = i.inhrelid
+    join pg_class p on p.oid = i.inhparent
+    join pg_namespace n on n.oid = p.relnamespace
+    where n.nspname = 'public'
+      and p.relname = 'audit_logs'
+      and c.relname ~ '^audit_logs_y[0-9]{4}m[0-9]{2}$'
+  loop
+    -- Partition names end in YYYYmMM
+    if to_date(right(v_partition.relname, 7), 'YYYY"m"MM') < v_cutoff then
+      execute format('drop table public.%I', v_partition.relname);
+      v_dropped := v_dropped + 1;
+    end if;
+  end loop;
+
+  delete from public.audit_logs_default where created_at < v_cutoff;
+
+  return v_dropped;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Keep the next months' partitions in place and expire old ones
+create or replace function public.maintain_audit_logs(p_keep_months integer default 12)
+returns void as $$
+begin
+  perform public.create_audit_logs_partition((now() + make_interval(months => m))::date)
+  from generate_series(0, 3) as m;
+  perform public.prune_audit_logs(p_keep_months);
+end;
+$$ language plpgsql security definer set search_path = public;
+
+revoke execute on function public.create_audit_logs_partition(date) from public, anon, authenticated;
+revoke execute on function public.prune_audit_logs(integer) from public, anon, authenticated;
+revoke execute on function public.maintain_audit_logs(integer) from public, anon, authenticated;
+
+-- ========================================
+-- Move existing rows
+-- ========================================
+
+-- Every row is copied, whatever its age: expiring history is the retention
+-- job's decision (maintain_audit_logs, scheduled below), not the
+-- migration's. Partitions are created for every month present, plus the
+-- next few.
+
+DO $$
+DECLARE
+  v_month date;
+BEGIN
+  IF to_regclass('public.audit_logs_legacy') IS NOT NULL THEN
+    FOR v_month IN
+      SELECT DISTINCT date_trunc('month', created_at)::date
+      FROM public.audit_logs_legacy
+    LOOP
+      PERFORM public.create_audit_logs_partition(v_month);
+    END LOOP;
+  END IF;
+END $$;
+
+select public.create_audit_logs_partition((now() + make_interval(months => m))::date)
+from generate_series(0, 3) as m;
+
+DO $$
+DECLARE
+  v_expected bigint;
+  v_copied bigint;
+BEGIN
+  IF to_regclass('public.audit_logs_legacy') IS NOT NULL THEN
+    SELECT count(*) INTO v_expected FROM public.audit_logs_legacy;
+
+    INSERT INTO public.audit_logs (id, event_type, user_id, metadata, created_at)
+    SELECT id, event_type, user_id, metadata, created_at
+    FROM public.audit_logs_legacy;
+    GET DIAGNOSTICS v_copied = ROW_COUNT;
+
+    -- The legacy table is only dropped once every row is in the new one;
+    -- otherwise the whole migration rolls back
+    IF v_copied <> v_expected THEN
+      RAISE EXCEPTION 'audit_logs copy incomplete: % of % rows', v_copied, v_expected;
+    END IF;
+
+    DROP TABLE public.audit_logs_legacy;
+  END IF;
+END $$;
+
+-- ========================================
+-- RLS
+-- ========================================
+
+alter table public.audit_logs enable row level security;
+
+drop policy if exists "admins_all_audit_logs" on public.audit_logs;
+create policy "admins_all_audit_logs" on public.audit_logs
+  for all
+  using (
+    exists (
+      select 1 from users
+      where users.id = auth.uid()
+      and users.role = 'admin'
+    )
+  );
+
+-- ========================================
+-- Schedule (pg_cron, when the extension is enabled)
+-- ========================================
+
+-- Without pg_cron the app scheduler runs maintain_audit_logs instead
+-- (maintain-audit-logs in lib/queues/scheduler.ts); running both is safe.
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule(
+      'maintain-audit-logs',
+      '15 0 1 * *',
+      'select public.maintain_audit_logs()'
+    );
+  END IF;
+END $$;
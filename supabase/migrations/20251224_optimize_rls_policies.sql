@@ -0,0 +1,233 @@
+-- RLS policies evaluated once per statement instead of once per row
+--
+-- The original policies inline `exists (select 1 from users where
+-- users.id = auth.uid() ...)`. auth.uid() is not a constant to the planner,
+-- so on large scans the subquery can be re-run for every candidate row.
+-- Wrapping the check in `(select ...)` turns it into an initPlan that runs
+-- once and is reused, and the STABLE SECURITY DEFINER helpers keep the
+-- users lookup out of the caller's own RLS.
+--
+-- Access rules are unchanged. Policies are restricted to `authenticated`
+-- so anon requests skip them entirely. See
+-- supabase/benchmarks/rls_reads.sql for the before/after measurement.
+
+-- ========================================
+-- Helper Functions
+-- ========================================
+
+create or replace function public.get_user_role(user_id uuid)
+returns text as $$
+  select role from public.users where id = user_id limit 1;
+$$ language sql stable security definer set search_path = public;
+
+create or replace function public.is_admin(user_id uuid)
+returns boolean as $$
+  select exists (
+    select 1 from public.users
+    where id = user_id and role = 'admin'
+  );
+$$ language sql stable security definer set search_path = public;
+
+create or replace function public.is_operator_or_admin(user_id uuid)
+returns boolean as $$
+  select exists (
+    select 1 from public.users
+    where id = user_id and role in ('operator', 'admin')
+  );
+$$ language sql stable security definer set search_path = public;
+
+-- Customer rows owned by the calling login, for the customers_own_*
+-- policies. Takes no user id: it is callable over RPC, and must only ever
+-- answer for auth.uid(). Policies compare against it as
+-- `= any ((select public.owned_customer_ids())::uuid[])`: without the cast
+-- Postgres parses the parenthesized select as an ANY subquery (uuid = uuid[]).
+create or replace function public.owned_customer_ids()
+returns uuid[] as $$
+  select coalesce(array_agg(id), '{}') from public.customers c where c.user_id = auth.uid();
+$$ language sql stable security definer set search_path = public;
+
+revoke execute on function public.owned_customer_ids() from public, anon;
+grant execute on function public.owned_customer_ids() to authenticated;
+
+-- ========================================
+-- Supporting Indexes
+-- ========================================
+
+-- Index-only role checks in the helpers
+create index if not exists idx_users_id_role on public.users (id) include (role);
+-- Customer ownership lookups and the barcode -> shipment -> customer path
+create index if not exists idx_customers_user_id on public.customers (user_id);
+create index if not exists idx_shipments_customer_id on public.shipments (customer_id);
+create index if not exists idx_barcodes_shipment_id on public.barcodes (shipment_id);
+
+-- ========================================
+-- Shipments Policies
+-- ========================================
+
+drop policy if exists "admins_all_shipments" on public.shipments;
+create policy "admins_all_shipments" on public.shipments
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))));
+
+drop policy if exists "operators_view_shipments" on public.shipments;
+create policy "operators_view_shipments" on public.shipments
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "operators_update_shipments" on public.shipments;
+create policy "operators_update_shipments" on public.shipments
+  for update
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "customers_own_shipments" on public.shipments;
+create policy "customers_own_shipments" on public.shipments
+  for select
+  to authenticated
+  using (customer_id = any ((select public.owned_customer_ids())::uuid[]));
+
+-- ========================================
+-- Invoices Policies
+-- ========================================
+
+drop policy if exists "admins_all_invoices" on public.invoices;
+create policy "admins_all_invoices" on public.invoices
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))));
+
+drop policy if exists "operators_view_invoices" on public.invoices;
+create policy "operators_view_invoices" on public.invoices
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "customers_own_invoices" on public.invoices;
+create policy "customers_own_invoices" on public.invoices
+  for select
+  to authenticated
+  using (customer_id = any ((select public.owned_customer_ids())::uuid[]));
+
+-- ========================================
+-- Customers Policies
+-- ========================================
+
+drop policy if exists "admins_all_customers" on public.customers;
+create policy "admins_all_customers" on public.customers
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))));
+
+drop policy if exists "operators_view_customers" on public.customers;
+create policy "operators_view_customers" on public.customers
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "customers_own_profile" on public.customers;
+create policy "customers_own_profile" on public.customers
+  for all
+  to authenticated
+  using (user_id = (select auth.uid()));
+
+-- ========================================
+-- Barcodes Policies
+-- ========================================
+
+drop policy if exists "admins_all_barcodes" on public.barcodes;
+create policy "admins_all_barcodes" on public.barcodes
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))));
+
+drop policy if exists "operators_manage_barcodes" on public.barcodes;
+create policy "operators_manage_barcodes" on public.barcodes
+  for all
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "customers_view_own_barcodes" on public.barcodes;
+create policy "customers_view_own_barcodes" on public.barcodes
+  for select
+  to authenticated
+  using (
+    shipment_id in (
+      select s.id from public.shipments s
+      where s.customer_id = any ((select public.owned_customer_ids())::uuid[])
+    )
+  );
+
+-- ========================================
+-- Package Scans Policies
+-- ========================================
+
+drop policy if exists "admins_all_scans" on public.package_scans;
+create policy "admins_all_scans" on public.package_scans
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))));
+
+drop policy if exists "operators_manage_scans" on public.package_scans;
+create policy "operators_manage_scans" on public.package_scans
+  for all
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+-- ========================================
+-- Manifests Policies
+-- ========================================
+
+drop policy if exists "admins_all_manifests" on public.manifests;
+create policy "admins_all_manifests" on public.manifests
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))));
+
+drop policy if exists "operators_manage_manifests" on public.manifests;
+create policy "operators_manage_manifests" on public.manifests
+  for all
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+-- ========================================
+-- Rollup, Metrics and Admin Tables
+-- ========================================
+
+drop policy if exists "operators_view_daily_shipment_stats" on public.daily_shipment_stats;
+create policy "operators_view_daily_shipment_stats" on public.daily_shipment_stats
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "operators_view_daily_revenue_stats" on public.daily_revenue_stats;
+create policy "operators_view_daily_revenue_stats" on public.daily_revenue_stats
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "operators_view_customer_metrics" on public.customer_metrics;
+create policy "operators_view_customer_metrics" on public.customer_metrics
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+drop policy if exists "customers_own_metrics" on public.customer_metrics;
+create policy "customers_own_metrics" on public.customer_metrics
+  for select
+  to authenticated
+  using (customer_id = any ((select public.owned_customer_ids())::uuid[]));
+
+drop policy if exists "admins_all_audit_logs" on public.audit_logs;
+create policy "admins_all_audit_logs" on public.audit_logs
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))));
+
+drop policy if exists "admins_all_auth_lockouts" on public.auth_lockouts;
+create policy "admins_all_auth_lockouts" on public.auth_lockouts
+  for all
+  to authenticated
+  using ((select public.is_admin((select auth.uid()))))
+  with check ((select public.is_admin((select auth.uid()))));
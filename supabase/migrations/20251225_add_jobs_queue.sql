@@ -0,0 +1,197 @@
+-- Postgres-backed job queue (used when Redis/BullMQ is not configured)
+-- See lib/queues/pg-queue.ts.
+--
+-- Workers claim due jobs with FOR UPDATE SKIP LOCKED, so any number of
+-- workers can poll the same queue without blocking each other or running a
+-- job twice. A claimed job is leased until locked_until, which the worker
+-- renews while the job runs (extend_job_lease); if the worker dies the
+-- lease expires and the job becomes claimable again (visibility timeout).
+-- Failures, including expired leases, count against max_attempts, and
+-- failures are retried with exponential backoff.
+
+create table if not exists public.jobs (
+  id uuid primary key default gen_random_uuid(),
+  queue text not null,
+  name text not null,
+  payload jsonb not null default '{}'::jsonb,
+  status text not null default 'waiting'
+    check (status in ('waiting', 'active', 'completed', 'failed')),
+  -- Callers' job id; only one unfinished job per key and queue
+  dedupe_key text,
+  attempts integer not null default 0,
+  max_attempts integer not null default 3,
+  backoff_ms integer not null default 2000,
+  run_at timestamptz not null default now(),
+  locked_until timestamptz,
+  locked_by text,
+  last_error text,
+  result jsonb,
+  created_at timestamptz not null default now(),
+  started_at timestamptz,
+  finished_at timestamptz
+);
+
+-- Claim scan: due waiting jobs and expired leases, per queue
+create index if not exists idx_jobs_claimable
+  on public.jobs (queue, run_at)
+  where status in ('waiting', 'active');
+
+create unique index if not exists idx_jobs_dedupe
+  on public.jobs (queue, dedupe_key)
+  where dedupe_key is not null and status in ('waiting', 'active');
+
+create index if not exists idx_jobs_finished
+  on public.jobs (queue, finished_at desc)
+  where status in ('completed', 'failed');
+
+-- Service role only
+alter table public.jobs enable row level security;
+
+-- ========================================
+-- Queue Functions
+-- ========================================
+
+create or replace function public.enqueue_job(
+  p_queue text,
+  p_name text,
+  p_payload jsonb,
+  p_dedupe_key text default null,
+  p_max_attempts integer default 3,
+  p_backoff_ms integer default 2000,
+  p_delay_ms integer default 0
+)
+returns uuid as $$
+declare
+  v_id uuid;
+begin
+  insert into jobs (queue, name, payload, dedupe_key, max_attempts, backoff_ms, run_at)
+  values (
+    p_queue, p_name, coalesce(p_payload, '{}'::jsonb), p_dedupe_key,
+    p_max_attempts, p_backoff_ms, now() + make_interval(secs => p_delay_ms / 1000.0)
+  )
+  on conflict (queue, dedupe_key) where dedupe_key is not null and status in ('waiting', 'active')
+  do nothing
+  returning id into v_id;
+
+  -- Duplicate of an unfinished job: hand back the existing one
+  if v_id is null then
+    select id into v_id
+    from jobs
+    where queue = p_queue
+      and dedupe_key = p_dedupe_key
+      and status in ('waiting', 'active');
+  end if;
+
+  return v_id;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.claim_jobs(
+  p_queue text,
+  p_worker text,
+  p_limit integer,
+  p_visibility_ms integer default 60000
+)
+returns setof public.jobs as $$
+  -- An expired lease on the last attempt means the job crashed or hung its
+  -- worker every time: fail it instead of handing it out forever
+  with exhausted as (
+    update jobs
+    set
+      status = 'failed',
+      last_error = 'Lease expired on the final attempt (worker crashed or timed out)',
+      locked_until = null,
+      finished_at = now()
+    where id in (
+      select id
+      from jobs
+      where queue = p_queue
+        and status = 'active'
+        and locked_until < now()
+        and attempts >= max_attempts
+      for update skip locked
+    )
+  )
+  update jobs j
+  set
+    status = 'active',
+    attempts = j.attempts + 1,
+    locked_by = p_worker,
+    locked_until = now() + make_interval(secs => p_visibility_ms / 1000.0),
+    started_at = now()
+  where j.id in (
+    select id
+    from jobs
+    where queue = p_queue
+      and (
+        (status = 'waiting' and run_at <= now())
+        or (status = 'active' and locked_until < now() and attempts < max_attempts)
+      )
+    order by run_at
+    limit p_limit
+    for update skip locked
+  )
+  returning j.*;
+$$ language sql security definer set search_path = public;
+
+-- Heartbeat: push the lease out while the job is still running. Returns
+-- null once the lease is gone (expired and claimed by another worker).
+create or replace function public.extend_job_lease(
+  p_id uuid,
+  p_worker text,
+  p_visibility_ms integer default 60000
+)
+returns boolean as $$
+  update jobs
+  set locked_until = now() + make_interval(secs => p_visibility_ms / 1000.0)
+  where id = p_id
+    and status = 'active'
+    and locked_by = p_worker
+  returning true;
+$$ language sql security definer set search_path = public;
+
+create or replace function public.complete_job(
+  p_id uuid,
+  p_worker text,
+  p_result jsonb default null
+)
+returns boolean as $$
+  update jobs
+  set
+    status = 'completed',
+    result = p_result,
+    locked_until = null,
+    finished_at = now()
+  where id = p_id
+    and status = 'active'
+    and locked_by = p_worker
+  returning true;
+$$ language sql security definer set search_path = public;
+
+create or replace function public.fail_job(
+  p_id uuid,
+  p_worker text,
+  p_error text
+)
+returns text as $$
+  update jobs
+  set
+    status = case when attempts >= max_attempts then 'failed' else 'waiting' end,
+    last_error = p_error,
+    locked_until = null,
+    run_at = case
+      when attempts >= max_attempts then run_at
+      else now() + make_interval(secs => backoff_ms * power(2, attempts - 1) / 1000.0)
+    end,
+    finished_at = case when attempts >= max_attempts then now() else null end
+  where id = p_id
+    and status = 'active'
+    and locked_by = p_worker
+  returning status;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.enqueue_job(text, text, jsonb, text, integer, integer, integer) from public, anon, authenticated;
+revoke execute on function public.claim_jobs(text, text, integer, integer) from public, anon, authenticated;
+revoke execute on function public.extend_job_lease(uuid, text, integer) from public, anon, authenticated;
+revoke execute on function public.complete_job(uuid, text, jsonb) from public, anon, authenticated;
+revoke execute on function public.fail_job(uuid, text, text) from public, anon, authenticated;
@@ -0,0 +1,61 @@
+-- Per-queue metrics for the Postgres job queue (see lib/queues/metrics.ts)
+-- Counts are current; throughput, processing percentiles and retries cover
+-- jobs that finished within the window.
+--
+-- finished_in_window counts jobs that reached a terminal state, completed
+-- or failed for good, as the BullMQ driver does; failed_in_window is the
+-- failed share of it. Retried attempts are not counted until the job
+-- finishes.
+
+create or replace function public.queue_metrics(p_window_minutes integer default 60)
+returns table (
+  queue text,
+  waiting bigint,
+  active bigint,
+  completed bigint,
+  failed bigint,
+  finished_in_window bigint,
+  failed_in_window bigint,
+  p50_ms double precision,
+  p95_ms double precision,
+  retries bigint
+) as $$
+  with windowed as (
+    select
+      j.queue,
+      j.status,
+      j.attempts,
+      extract(epoch from (j.finished_at - j.started_at)) * 1000 as duration_ms
+    from jobs j
+    where j.status in ('completed', 'failed')
+      and j.finished_at >= now() - make_interval(mins => p_window_minutes)
+  ),
+  counts as (
+    select
+      j.queue,
+      count(*) filter (where j.status = 'waiting') as waiting,
+      count(*) filter (where j.status = 'active') as active,
+      count(*) filter (where j.status = 'completed') as completed,
+      count(*) filter (where j.status = 'failed') as failed
+    from jobs j
+    group by j.queue
+  )
+  select
+    c.queue,
+    c.waiting,
+    c.active,
+    c.completed,
+    c.failed,
+    count(w.status),
+    count(w.status) filter (where w.status = 'failed'),
+    percentile_cont(0.5) within group (order by w.duration_ms)
+      filter (where w.status = 'completed'),
+    percentile_cont(0.95) within group (order by w.duration_ms)
+      filter (where w.status = 'completed'),
+    coalesce(sum(greatest(w.attempts - 1, 0)), 0)::bigint
+  from counts c
+  left join windowed w on w.queue = c.queue
+  group by c.queue, c.waiting, c.active, c.completed, c.failed;
+$$ language sql stable security definer set search_path = public;
+
+revoke execute on function public.queue_metrics(integer) from public, anon, authenticated;
@@ -0,0 +1,30 @@
+-- Let workers fail a job without retrying it (e.g. a WhatsApp number that
+-- Graph rejects outright). Mirrors BullMQ's UnrecoverableError; see
+-- lib/queues/pg-queue.ts.
+
+drop function if exists public.fail_job(uuid, text, text);
+
+create or replace function public.fail_job(
+  p_id uuid,
+  p_worker text,
+  p_error text,
+  p_retry boolean default true
+)
+returns text as $$
+  update jobs
+  set
+    status = case when not p_retry or attempts >= max_attempts then 'failed' else 'waiting' end,
+    last_error = p_error,
+    locked_until = null,
+    run_at = case
+      when not p_retry or attempts >= max_attempts then run_at
+      else now() + make_interval(secs => backoff_ms * power(2, attempts - 1) / 1000.0)
+    end,
+    finished_at = case when not p_retry or attempts >= max_attempts then now() else null end
+  where id = p_id
+    and status = 'active'
+    and locked_by = p_worker
+  returning status;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.fail_job(uuid, text, text, boolean) from public, anon, authenticated;
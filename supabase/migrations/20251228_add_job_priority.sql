@@ -0,0 +1,182 @@
+-- Priority lanes for the Postgres job queue (see lib/queues/setup.ts)
+--
+-- Lower priority values run first, like BullMQ's. To keep bulk work from
+-- starving, priority is a handicap rather than a strict order: claim_jobs
+-- orders by run_at + priority * p_aging_ms, so a bulk job that has waited
+-- longer than the gap between lanes overtakes newer interactive jobs.
+--
+-- enqueue_job now raises the priority of a pending duplicate instead of
+-- ignoring the request, so an interactive request for work already queued
+-- in the bulk lane jumps ahead.
+--
+-- Bulk lane requests are set-based: enqueue_jobs adds a batch in one round
+-- trip and invoice_fingerprints hashes a batch of invoices in one query.
+
+alter table public.jobs
+  add column if not exists priority integer not null default 0;
+
+drop function if exists public.enqueue_job(text, text, jsonb, text, integer, integer, integer);
+
+create or replace function public.enqueue_job(
+  p_queue text,
+  p_name text,
+  p_payload jsonb,
+  p_dedupe_key text default null,
+  p_max_attempts integer default 3,
+  p_backoff_ms integer default 2000,
+  p_delay_ms integer default 0,
+  p_priority integer default 0
+)
+returns uuid as $$
+  insert into jobs (queue, name, payload, dedupe_key, max_attempts, backoff_ms, run_at, priority)
+  values (
+    p_queue, p_name, coalesce(p_payload, '{}'::jsonb), p_dedupe_key,
+    p_max_attempts, p_backoff_ms, now() + make_interval(secs => p_delay_ms / 1000.0),
+    p_priority
+  )
+  -- Duplicate of an unfinished job: keep it, at the more urgent priority
+  on conflict (queue, dedupe_key) where dedupe_key is not null and status in ('waiting', 'active')
+  do update set priority = least(jobs.priority, excluded.priority)
+  returning id;
+$$ language sql security definer set search_path = public;
+
+drop function if exists public.claim_jobs(text, text, integer, integer);
+
+create or replace function public.claim_jobs(
+  p_queue text,
+  p_worker text,
+  p_limit integer,
+  p_visibility_ms integer default 60000,
+  p_aging_ms integer default 120000
+)
+returns setof public.jobs as $$
+  -- Out of attempts with an expired lease: fail (see 20251225_add_jobs_queue.sql)
+  with exhausted as (
+    update jobs
+    set
+      status = 'failed',
+      last_error = 'Lease expired on the final attempt (worker crashed or timed out)',
+      locked_until = null,
+      finished_at = now()
+    where id in (
+      select id
+      from jobs
+      where queue = p_queue
+        and status = 'active'
+        and locked_until < now()
+        and attempts >= max_attempts
+      for update skip locked
+    )
+  )
+  update jobs j
+  set
+    status = 'active',
+    attempts = j.attempts + 1,
+    locked_by = p_worker,
+    locked_until = now() + make_interval(secs => p_visibility_ms / 1000.0),
+    started_at = now()
+  where j.id in (
+    select id
+    from jobs
+    where queue = p_queue
+      and (
+        (status = 'waiting' and run_at <= now())
+        or (status = 'active' and locked_until < now() and attempts < max_attempts)
+      )
+    order by run_at + make_interval(secs => priority * p_aging_ms / 1000.0)
+    limit p_limit
+    for update skip locked
+  )
+  returning j.*;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.enqueue_job(text, text, jsonb, text, integer, integer, integer, integer) from public, anon, authenticated;
+revoke execute on function public.claim_jobs(text, text, integer, integer, integer) from public, anon, authenticated;
+
+-- ========================================
+-- Bulk enqueue
+-- ========================================
+
+-- enqueue_job for every element of p_jobs ({name, payload, dedupe_key,
+-- max_attempts, backoff_ms, delay_ms, priority}) in one round trip; ids
+-- come back in input order.
+create or replace function public.enqueue_jobs(p_queue text, p_jobs jsonb)
+returns table (id uuid) as $$
+  select public.enqueue_job(
+    p_queue,
+    j ->> 'name',
+    j -> 'payload',
+    j ->> 'dedupe_key',
+    coalesce((j ->> 'max_attempts')::integer, 3),
+    coalesce((j ->> 'backoff_ms')::integer, 2000),
+    coalesce((j ->> 'delay_ms')::integer, 0),
+    coalesce((j ->> 'priority')::integer, 0)
+  )
+  from jsonb_array_elements(p_jobs) with ordinality as t (j, n)
+  order by n;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.enqueue_jobs(text, jsonb) from public, anon, authenticated;
+
+-- ========================================
+-- Invoice fingerprints
+-- ========================================
+
+-- Content hash of everything an invoice PDF renders (see
+-- lib/invoice-fingerprint.ts), for a whole batch of invoices in one query.
+-- Unknown ids are left out of the result.
+create or replace function public.invoice_fingerprints(p_invoice_ids uuid[])
+returns table (invoice_id uuid, fingerprint text) as $$
+  select
+    i.id,
+    left(encode(sha256(convert_to(jsonb_build_array(
+      jsonb_build_object(
+        'invoice_ref', i.invoice_ref,
+        'customer_id', i.customer_id,
+        'amount', i.amount,
+        'status', i.status,
+        'invoice_date', i.invoice_date,
+        'due_date', i.due_date,
+        'customer', (
+          select jsonb_build_object('name', c.name, 'phone', c.phone, 'city', c.city)
+          from customers c
+          where c.id = i.customer_id
+        )
+      ),
+      (
+        select coalesce(jsonb_agg(
+          jsonb_build_object(
+            'shipment_id', it.shipment_id,
+            'amount', it.amount,
+            'shipment', (
+              select jsonb_build_object(
+                'shipment_ref', s.shipment_ref,
+                'origin', s.origin,
+                'destination', s.destination,
+                'weight', s.weight
+              )
+              from shipments s
+              where s.id = it.shipment_id
+            )
+          )
+          order by it.shipment_id, it.amount
+        ), '[]'::jsonb)
+        from invoice_items it
+        where it.invoice_id = i.id
+      ),
+      -- The customer's unpaid balance is printed on every invoice
+      (
+        select coalesce(jsonb_agg(
+          jsonb_build_array(u.id, u.amount, u.status, u.invoice_date)
+          order by u.id
+        ), '[]'::jsonb)
+        from invoices u
+        where u.customer_id = i.customer_id
+          and lower(u.status) in ('pending', 'overdue')
+      )
+    )::text, 'UTF8')), 'hex'), 16)
+  from invoices i
+  where i.id = any (p_invoice_ids);
+$$ language sql stable security definer set search_path = public;
+
+revoke execute on function public.invoice_fingerprints(uuid[]) from public, anon, authenticated;
@@ -0,0 +1,202 @@
+-- Durable inbox for provider webhooks (Meta WhatsApp, Twilio status callbacks)
+--
+-- Handlers verify the signature, append every event in the request with a
+-- single multi-row insert and return 200. process_webhook_inbox() applies
+-- the pending events in set-based batches (statuses to the message logs,
+-- inbound messages to inbound_messages); it is
+-- driven by the worker process (lib/webhook-inbox.ts) with a pg_cron
+-- fallback below.
+
+create table if not exists public.webhook_inbox (
+  id bigint generated always as identity primary key,
+  provider text not null check (provider in ('meta', 'twilio')),
+  event_type text not null,
+  provider_message_id text,
+  status text,
+  error_message text,
+  phone text,
+  -- Provider's event time when it sends one, otherwise receipt time
+  occurred_at timestamptz not null default now(),
+  payload jsonb not null default '{}'::jsonb,
+  received_at timestamptz not null default now(),
+  processed_at timestamptz
+);
+
+create index if not exists idx_webhook_inbox_pending
+  on public.webhook_inbox (id)
+  where processed_at is null;
+
+create index if not exists idx_webhook_inbox_processed_at
+  on public.webhook_inbox (processed_at)
+  where processed_at is not null;
+
+create index if not exists idx_webhook_inbox_message
+  on public.webhook_inbox (provider, provider_message_id);
+
+-- Status updates look messages up by provider id
+create index if not exists whatsapp_logs_provider_message_id_idx
+  on public.whatsapp_logs (provider_message_id);
+
+-- Service role only
+alter table public.webhook_inbox enable row level security;
+
+-- Inbound customer messages, kept after their inbox events are pruned
+create table if not exists public.inbound_messages (
+  id uuid primary key default gen_random_uuid(),
+  provider text not null check (provider in ('meta', 'twilio')),
+  provider_message_id text,
+  phone text,
+  message_type text,
+  body text,
+  received_at timestamptz not null,
+  payload jsonb not null default '{}'::jsonb,
+  created_at timestamptz not null default now()
+);
+
+-- Providers redeliver webhooks; a message is stored once
+create unique index if not exists inbound_messages_provider_message_id_key
+  on public.inbound_messages (provider, provider_message_id)
+  where provider_message_id is not null;
+
+create index if not exists inbound_messages_phone_idx
+  on public.inbound_messages (phone, received_at desc);
+
+-- Inbound messages the old handler logged as webhook rows
+insert into public.inbound_messages (provider, provider_message_id, phone, received_at, payload)
+select 'meta', provider_message_id, phone, created_at, coalesce(raw_response, '{}'::jsonb)
+from public.whatsapp_logs
+where mode = 'meta_webhook'
+  and status = 'received'
+on conflict (provider, provider_message_id) where provider_message_id is not null
+do nothing;
+
+alter table public.inbound_messages enable row level security;
+
+drop policy if exists "operators_view_inbound_messages" on public.inbound_messages;
+create policy "operators_view_inbound_messages" on public.inbound_messages
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+-- ========================================
+-- Consumer
+-- ========================================
+
+-- Apply up to p_limit pending events; returns how many were consumed.
+-- Only the newest status event per message in the batch is written;
+-- inbound messages are stored in inbound_messages. Concurrent consumers
+-- skip each other's rows.
+create or replace function public.process_webhook_inbox(p_limit integer default 500)
+returns integer as $$
+declare
+  v_count integer;
+begin
+  with batch as (
+    select id
+    from webhook_inbox
+    where processed_at is null
+    order by id
+    limit p_limit
+    for update skip locked
+  ),
+  latest as (
+    select distinct on (i.provider, i.provider_message_id)
+      i.provider, i.provider_message_id, i.status, i.error_message, i.phone, i.payload
+    from webhook_inbox i
+    join batch b on b.id = i.id
+    where i.provider_message_id is not null
+      and i.event_type = 'status'
+    order by i.provider, i.provider_message_id, i.occurred_at desc, i.id desc
+  ),
+  -- Twilio sends status callbacks for both SMS and WhatsApp messages
+  twilio_sms as (
+    update twilio_sms_logs t
+    set
+      status = coalesce(l.status, t.status),
+      error_message = coalesce(l.error_message, t.error_message),
+      to_phone = coalesce(l.phone, t.to_phone),
+      raw_response = l.payload,
+      updated_at = now()
+    from latest l
+    where l.provider = 'twilio'
+      and t.provider_message_id = l.provider_message_id
+    returning 1
+  ),
+  whatsapp as (
+    update whatsapp_logs w
+    set
+      status = coalesce(l.status, w.status),
+      error_message = coalesce(l.error_message, w.error_message),
+      raw_response = l.payload,
+      updated_at = now()
+    from latest l
+    where w.provider_message_id = l.provider_message_id
+    returning 1
+  ),
+  inbound as (
+    insert into inbound_messages (
+      provider, provider_message_id, phone, message_type, body, received_at, payload
+    )
+    select
+      i.provider,
+      i.provider_message_id,
+      i.phone,
+      i.payload->>'type',
+      coalesce(i.payload->'text'->>'body', i.payload->>'Body'),
+      i.occurred_at,
+      i.payload
+    from webhook_inbox i
+    join batch b on b.id = i.id
+    where i.event_type = 'message'
+    order by i.id
+    on conflict (provider, provider_message_id) where provider_message_id is not null
+    do nothing
+    returning 1
+  ),
+  consumed as (
+    update webhook_inbox i
+    set processed_at = now()
+    from batch b
+    where i.id = b.id
+    returning 1
+  )
+  select count(*) into v_count from consumed;
+
+  return v_count;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Processed events are kept for a week for debugging
+create or replace function public.prune_webhook_inbox(p_keep interval default interval '7 days')
+returns integer as $$
+  with deleted as (
+    delete from webhook_inbox
+    where processed_at < now() - p_keep
+    returning 1
+  )
+  select count(*)::integer from deleted;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.process_webhook_inbox(integer) from public, anon, authenticated;
+revoke execute on function public.prune_webhook_inbox(interval) from public, anon, authenticated;
+
+-- ========================================
+-- Schedule (pg_cron, when the extension is enabled)
+-- ========================================
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    -- Safety net if no worker is running the consumer
+    PERFORM cron.schedule(
+      'process-webhook-inbox',
+      '* * * * *',
+      'select public.process_webhook_inbox(5000)'
+    );
+    PERFORM cron.schedule(
+      'prune-webhook-inbox',
+      '30 3 * * *',
+      'select public.prune_webhook_inbox()'
+    );
+  END IF;
+END $$;
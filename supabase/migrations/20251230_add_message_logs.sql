@@ -0,0 +1,271 @@
+-- Unified outbound message log (WhatsApp via Meta or Twilio, Twilio SMS)
+--
+-- Replaces writes to whatsapp_logs and twilio_sms_logs. Status callbacks
+-- identify messages only by provider id, so they previously updated both
+-- tables; here (provider, provider_message_id) is a unique key and every
+-- event is a single index lookup.
+--
+-- All writes go through upsert_message_logs(), which applies a batch of
+-- rows ordered by status rank and never lets an older status (e.g. a
+-- delayed "sent") overwrite a later one ("delivered", "read"). Status
+-- callbacks that arrive before the send itself is logged create the row,
+-- and the send fills in the rest.
+
+create table if not exists public.message_logs (
+  id uuid primary key default gen_random_uuid(),
+  provider text not null check (provider in ('meta', 'twilio')),
+  channel text not null check (channel in ('whatsapp', 'sms')),
+  provider_message_id text,
+  invoice_id uuid references public.invoices (id) on delete cascade,
+  phone text,
+  mode text,
+  status text not null,
+  status_rank smallint not null default 0,
+  -- Time of the event that set the current status
+  status_at timestamptz not null default now(),
+  error_message text,
+  raw_response jsonb,
+  created_at timestamptz not null default now(),
+  updated_at timestamptz not null default now()
+);
+
+create unique index if not exists message_logs_provider_message_id_key
+  on public.message_logs (provider, provider_message_id)
+  where provider_message_id is not null;
+
+create index if not exists message_logs_invoice_id_idx
+  on public.message_logs (invoice_id);
+
+create index if not exists message_logs_created_at_idx
+  on public.message_logs (created_at desc);
+
+alter table public.message_logs enable row level security;
+
+drop policy if exists "operators_view_message_logs" on public.message_logs;
+create policy "operators_view_message_logs" on public.message_logs
+  for select
+  to authenticated
+  using ((select public.is_operator_or_admin((select auth.uid()))));
+
+-- ========================================
+-- Status Ordering
+-- ========================================
+
+-- Lifecycle position of a provider status (Meta and Twilio vocabularies).
+-- Failures rank above delivery so a late failure still lands; "read" is
+-- final.
+create or replace function public.message_status_rank(p_status text)
+returns smallint as $$
+  select case lower(coalesce(p_status, ''))
+    when 'accepted' then 1
+    when 'scheduled' then 1
+    when 'queued' then 1
+    when 'sending' then 2
+    when 'sent' then 3
+    when 'delivered' then 4
+    when 'undelivered' then 5
+    when 'failed' then 5
+    when 'error' then 5
+    when 'canceled' then 5
+    when 'read' then 6
+    else 0
+  end::smallint;
+$$ language sql immutable;
+
+-- ========================================
+-- Batched Upsert
+-- ========================================
+
+-- p_rows: [{ provider, channel, provider_message_id, invoice_id, phone,
+--            mode, status, status_at, error_message, raw_response }]
+create or replace function public.upsert_message_logs(p_rows jsonb)
+returns integer as $$
+declare
+  v_count integer;
+begin
+  with incoming as (
+    select
+      r.provider,
+      coalesce(r.channel, 'whatsapp') as channel,
+      r.provider_message_id,
+      r.invoice_id,
+      r.phone,
+      r.mode,
+      r.status,
+      public.message_status_rank(r.status) as status_rank,
+      coalesce(r.status_at, now()) as status_at,
+      r.error_message,
+      r.raw_response,
+      ordinality
+    from jsonb_to_recordset(p_rows) with ordinality as r(
+      provider text,
+      channel text,
+      provider_message_id text,
+      invoice_id uuid,
+      phone text,
+      mode text,
+      status text,
+      status_at timestamptz,
+      error_message text,
+      raw_response jsonb
+    )
+  ),
+  -- One row per message: the furthest status, later events first on ties.
+  -- Rows without a provider id (failed sends) are all kept.
+  collapsed as (
+    select distinct on (provider, provider_message_id) *
+    from incoming
+    where provider_message_id is not null
+    order by provider, provider_message_id, status_rank desc, status_at desc, ordinality desc
+  ),
+  upserted as (
+    insert into message_logs as m (
+      provider, channel, provider_message_id, invoice_id, phone, mode,
+      status, status_rank, status_at, error_message, raw_response
+    )
+    select
+      provider, channel, provider_message_id, invoice_id, phone, mode,
+      status, status_rank, status_at, error_message, raw_response
+    from collapsed
+    order by provider, provider_message_id
+    on conflict (provider, provider_message_id) where provider_message_id is not null
+    do update set
+      invoice_id = coalesce(m.invoice_id, excluded.invoice_id),
+      phone = coalesce(m.phone, excluded.phone),
+      mode = coalesce(m.mode, excluded.mode),
+      status = case when excluded.status_rank > m.status_rank
+        or (excluded.status_rank = m.status_rank and excluded.status_at >= m.status_at)
+        then excluded.status else m.status end,
+      status_rank = greatest(m.status_rank, excluded.status_rank),
+      status_at = case when excluded.status_rank > m.status_rank
+        or (excluded.status_rank = m.status_rank and excluded.status_at >= m.status_at)
+        then excluded.status_at else m.status_at end,
+      error_message = coalesce(excluded.error_message, m.error_message),
+      raw_response = coalesce(excluded.raw_response, m.raw_response),
+      updated_at = now()
+    returning 1
+  ),
+  unkeyed as (
+    insert into message_logs (
+      provider, channel, provider_message_id, invoice_id, phone, mode,
+      status, status_rank, status_at, error_message, raw_response
+    )
+    select
+      provider, channel, null, invoice_id, phone, mode,
+      status, status_rank, status_at, error_message, raw_response
+    from incoming
+    where provider_message_id is null
+    returning 1
+  )
+  select (select count(*) from upserted) + (select count(*) from unkeyed) into v_count;
+
+  return v_count;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+revoke execute on function public.upsert_message_logs(jsonb) from public, anon, authenticated;
+
+-- ========================================
+-- Webhook Inbox Consumer
+-- ========================================
+
+-- Same contract as before (20251229_add_webhook_inbox.sql), now a single
+-- ordered upsert into message_logs instead of an update per legacy table.
+-- Inbound messages still go to inbound_messages, before the batch is
+-- marked processed.
+create or replace function public.process_webhook_inbox(p_limit integer default 500)
+returns integer as $$
+declare
+  v_ids bigint[];
+  v_rows jsonb;
+begin
+  select array_agg(id order by id) into v_ids
+  from (
+    select id
+    from webhook_inbox
+    where processed_at is null
+    order by id
+    limit p_limit
+    for update skip locked
+  ) batch;
+
+  if v_ids is null then
+    return 0;
+  end if;
+
+  select coalesce(jsonb_agg(jsonb_build_object(
+    'provider', i.provider,
+    'channel', case
+      when i.provider = 'twilio' and coalesce(i.payload->>'To', '') not like 'whatsapp:%' then 'sms'
+      else 'whatsapp'
+    end,
+    'provider_message_id', i.provider_message_id,
+    'phone', i.phone,
+    'status', i.status,
+    'status_at', i.occurred_at,
+    'error_message', i.error_message,
+    'raw_response', i.payload
+  ) order by i.id), '[]'::jsonb)
+  into v_rows
+  from webhook_inbox i
+  where i.id = any (v_ids)
+    and i.event_type = 'status'
+    and i.provider_message_id is not null;
+
+  perform public.upsert_message_logs(v_rows);
+
+  insert into inbound_messages (
+    provider, provider_message_id, phone, message_type, body, received_at, payload
+  )
+  select
+    i.provider,
+    i.provider_message_id,
+    i.phone,
+    i.payload->>'type',
+    coalesce(i.payload->'text'->>'body', i.payload->>'Body'),
+    i.occurred_at,
+    i.payload
+  from webhook_inbox i
+  where i.id = any (v_ids)
+    and i.event_type = 'message'
+  order by i.id
+  on conflict (provider, provider_message_id) where provider_message_id is not null
+  do nothing;
+
+  update webhook_inbox
+  set processed_at = now()
+  where id = any (v_ids);
+
+  return cardinality(v_ids);
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- ========================================
+-- Backfill
+-- ========================================
+
+insert into public.message_logs (
+  provider, channel, provider_message_id, invoice_id, phone, mode,
+  status, status_rank, status_at, error_message, raw_response, created_at, updated_at
+)
+select
+  'meta', 'whatsapp', provider_message_id, invoice_id, phone, mode,
+  status, public.message_status_rank(status), updated_at, error_message, raw_response,
+  created_at, updated_at
+from public.whatsapp_logs
+-- Webhook rows were status echoes of sends, not messages of their own
+where mode is distinct from 'meta_webhook'
+on conflict (provider, provider_message_id) where provider_message_id is not null
+do nothing;
+
+insert into public.message_logs (
+  provider, channel, provider_message_id, invoice_id, phone, mode,
+  status, status_rank, status_at, error_message, raw_response, created_at, updated_at
+)
+select
+  'twilio', 'sms', provider_message_id, invoice_id, to_phone, 'twilio_send',
+  status, public.message_status_rank(status), updated_at, error_message, raw_response,
+  created_at, updated_at
+from public.twilio_sms_logs
+on conflict (provider, provider_message_id) where provider_message_id is not null
+do nothing;
@@ -0,0 +1,139 @@
+-- Statement-level event triggers for the handle-events edge function
+--
+-- Row-level database webhooks invoke the function once per row, so a bulk
+-- update of 500 shipments means 500 invocations. These triggers send one
+-- request per statement with every relevant row (see BatchedWebhookPayload
+-- in supabase/functions/handle-events/index.ts). Replace the row-level
+-- "handle-events" database webhooks with them, not run both.
+--
+-- Requires pg_net and two Supabase Vault secrets:
+--   select vault.create_secret('https://<ref>.supabase.co/functions/v1/handle-events', 'handle_events_url');
+--   select vault.create_secret('<service role key>', 'handle_events_token');
+-- Without them the triggers do nothing. The key is kept out of database
+-- settings, which any role can read with current_setting().
+
+create or replace function public.post_handle_events(
+  p_type text,
+  p_table text,
+  p_records jsonb,
+  p_old_records jsonb default null
+)
+returns void as $$
+declare
+  v_url text;
+  v_token text;
+begin
+  if coalesce(jsonb_array_length(p_records), 0) = 0 then
+    return;
+  end if;
+
+  if not exists (select 1 from pg_extension where extname = 'pg_net')
+    or to_regclass('vault.decrypted_secrets') is null then
+    return;
+  end if;
+
+  select
+    max(decrypted_secret) filter (where name = 'handle_events_url'),
+    max(decrypted_secret) filter (where name = 'handle_events_token')
+  into v_url, v_token
+  from vault.decrypted_secrets
+  where name in ('handle_events_url', 'handle_events_token');
+
+  if coalesce(v_url, '') = '' then
+    return;
+  end if;
+
+  perform net.http_post(
+    url := v_url,
+    headers := jsonb_build_object(
+      'Content-Type', 'application/json',
+      'Authorization', 'Bearer ' || coalesce(v_token, '')
+    ),
+    body := jsonb_build_object(
+      'type', p_type,
+      'table', p_table,
+      'schema', 'public',
+      'records', p_records,
+      'old_records', p_old_records
+    ),
+    timeout_milliseconds := 10000
+  );
+end;
+$$ language plpgsql security definer set search_path = public;
+
+revoke execute on function public.post_handle_events(text, text, jsonb, jsonb) from public, anon, authenticated;
+
+-- ========================================
+-- Shipments
+-- ========================================
+
+create or replace function public.shipments_events_after_insert()
+returns trigger as $$
+begin
+  perform public.post_handle_events(
+    'INSERT',
+    'shipments',
+    (select jsonb_agg(to_jsonb(n)) from new_rows n)
+  );
+  return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Only rows whose status changed; the function ignores the rest anyway
+create or replace function public.shipments_events_after_update()
+returns trigger as $$
+declare
+  v_records jsonb;
+  v_old_records jsonb;
+begin
+  select
+    jsonb_agg(to_jsonb(n) order by n.id),
+    jsonb_agg(to_jsonb(o) order by n.id)
+  into v_records, v_old_records
+  from new_rows n
+  join old_rows o on o.id = n.id
+  where n.status is distinct from o.status;
+
+  perform public.post_handle_events('UPDATE', 'shipments', v_records, v_old_records);
+  return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+drop trigger if exists shipments_events_insert on public.shipments;
+create trigger shipments_events_insert
+  after insert on public.shipments
+  referencing new table as new_rows
+  for each statement execute function public.shipments_events_after_insert();
+
+drop trigger if exists shipments_events_update on public.shipments;
+create trigger shipments_events_update
+  after update on public.shipments
+  referencing new table as new_rows old table as old_rows
+  for each statement execute function public.shipments_events_after_update();
+
+-- ========================================
+-- Tickets (when the table exists)
+-- ========================================
+
+create or replace function public.tickets_events_after_insert()
+returns trigger as $$
+begin
+  perform public.post_handle_events(
+    'INSERT',
+    'tickets',
+    (select jsonb_agg(to_jsonb(n)) from new_rows n)
+  );
+  return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+DO $$
+BEGIN
+  IF to_regclass('public.tickets') IS NOT NULL THEN
+    DROP TRIGGER IF EXISTS tickets_events_insert ON public.tickets;
+    CREATE TRIGGER tickets_events_insert
+      AFTER INSERT ON public.tickets
+      REFERENCING NEW TABLE AS new_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION public.tickets_events_after_insert();
+  END IF;
+END $$;
@@ -0,0 +1,199 @@
+-- Cached dashboard summary for the daily-summary edge function
+--
+-- The function used to run exact counts and an LLM call on every request.
+-- Now it reads summary_metrics() (O(1) rollup reads) and reuses the stored
+-- summary unless the metrics moved materially or the TTL expired. Only one
+-- caller regenerates a day's summary at a time (claim_daily_summary).
+
+-- ========================================
+-- Counters
+-- ========================================
+
+-- Running totals kept by statement-level triggers: one update per
+-- statement, so bulk alert inserts do not contend on the counter row
+create table if not exists public.ops_counters (
+  key text primary key,
+  value bigint not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+alter table public.ops_counters enable row level security;
+
+create or replace function public.bump_ops_counter(p_key text, p_delta bigint)
+returns void as $$
+begin
+  if coalesce(p_delta, 0) = 0 then
+    return;
+  end if;
+
+  insert into public.ops_counters as c (key, value, updated_at)
+  values (p_key, p_delta, now())
+  on conflict (key) do update set
+    value = c.value + excluded.value,
+    updated_at = now();
+end;
+$$ language plpgsql security definer set search_path = public;
+
+revoke execute on function public.bump_ops_counter(text, bigint) from public, anon, authenticated;
+
+-- Open tickets
+create or replace function public.tickets_open_counter_trigger()
+returns trigger as $$
+declare
+  v_delta bigint := 0;
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    select v_delta + count(*) into v_delta from new_rows where status = 'open';
+  end if;
+  if tg_op in ('UPDATE', 'DELETE') then
+    select v_delta - count(*) into v_delta from old_rows where status = 'open';
+  end if;
+
+  perform public.bump_ops_counter('open_tickets', v_delta);
+  return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Unread alerts
+create or replace function public.alerts_unread_counter_trigger()
+returns trigger as $$
+declare
+  v_delta bigint := 0;
+begin
+  if tg_op in ('INSERT', 'UPDATE') then
+    select v_delta + count(*) into v_delta from new_rows where is_read = false;
+  end if;
+  if tg_op in ('UPDATE', 'DELETE') then
+    select v_delta - count(*) into v_delta from old_rows where is_read = false;
+  end if;
+
+  perform public.bump_ops_counter('unread_alerts', v_delta);
+  return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- tickets and alerts are created outside these migrations; only wire them
+-- up (and backfill) where they exist
+DO $$
+BEGIN
+  IF to_regclass('public.tickets') IS NOT NULL THEN
+    DROP TRIGGER IF EXISTS tickets_open_counter_insert ON public.tickets;
+    CREATE TRIGGER tickets_open_counter_insert
+      AFTER INSERT ON public.tickets
+      REFERENCING NEW TABLE AS new_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION public.tickets_open_counter_trigger();
+
+    DROP TRIGGER IF EXISTS tickets_open_counter_update ON public.tickets;
+    CREATE TRIGGER tickets_open_counter_update
+      AFTER UPDATE ON public.tickets
+      REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION public.tickets_open_counter_trigger();
+
+    DROP TRIGGER IF EXISTS tickets_open_counter_delete ON public.tickets;
+    CREATE TRIGGER tickets_open_counter_delete
+      AFTER DELETE ON public.tickets
+      REFERENCING OLD TABLE AS old_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION public.tickets_open_counter_trigger();
+
+    INSERT INTO public.ops_counters (key, value)
+    SELECT 'open_tickets', count(*) FROM public.tickets WHERE status = 'open'
+    ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = now();
+  END IF;
+
+  IF to_regclass('public.alerts') IS NOT NULL THEN
+    DROP TRIGGER IF EXISTS alerts_unread_counter_insert ON public.alerts;
+    CREATE TRIGGER alerts_unread_counter_insert
+      AFTER INSERT ON public.alerts
+      REFERENCING NEW TABLE AS new_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION public.alerts_unread_counter_trigger();
+
+    DROP TRIGGER IF EXISTS alerts_unread_counter_update ON public.alerts;
+    CREATE TRIGGER alerts_unread_counter_update
+      AFTER UPDATE ON public.alerts
+      REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION public.alerts_unread_counter_trigger();
+
+    DROP TRIGGER IF EXISTS alerts_unread_counter_delete ON public.alerts;
+    CREATE TRIGGER alerts_unread_counter_delete
+      AFTER DELETE ON public.alerts
+      REFERENCING OLD TABLE AS old_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION public.alerts_unread_counter_trigger();
+
+    INSERT INTO public.ops_counters (key, value)
+    SELECT 'unread_alerts', count(*) FROM public.alerts WHERE is_read = false
+    ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = now();
+  END IF;
+END $$;
+
+-- ========================================
+-- Summary Metrics
+-- ========================================
+
+-- Today's figures for the summary, from rollups and counters only
+create or replace function public.summary_metrics()
+returns jsonb as $$
+  select jsonb_build_object(
+    'day', public.rollup_day(now()),
+    'new_shipments', coalesce((
+      select shipment_count from daily_shipment_stats where day = public.rollup_day(now())
+    ), 0),
+    -- Of the shipments created today, how many are already delivered (not
+    -- deliveries made today: the rollup is keyed by creation day)
+    'new_shipments_delivered', coalesce((
+      select delivered_count from daily_shipment_stats where day = public.rollup_day(now())
+    ), 0),
+    'open_tickets', coalesce((select value from ops_counters where key = 'open_tickets'), 0),
+    'unread_alerts', coalesce((select value from ops_counters where key = 'unread_alerts'), 0)
+  );
+$$ language sql stable security definer set search_path = public;
+
+revoke execute on function public.summary_metrics() from public, anon, authenticated;
+
+-- ========================================
+-- Summary Cache
+-- ========================================
+
+-- summary, metrics and generated_at are null until the day's first
+-- summary is stored
+create table if not exists public.daily_summaries (
+  day date primary key,
+  summary text,
+  -- summary_metrics() output the summary was generated from
+  metrics jsonb,
+  model text,
+  generated_at timestamptz,
+  -- Set while a caller is regenerating the summary
+  generating_at timestamptz
+);
+
+alter table public.daily_summaries enable row level security;
+
+-- Claim the right to regenerate p_day's summary. Returns false while
+-- another caller holds an unexpired claim; storing the summary (or
+-- release_daily_summary) clears it.
+create or replace function public.claim_daily_summary(
+  p_day date,
+  p_claim_seconds integer default 120
+)
+returns boolean as $$
+declare
+  v_claimed boolean;
+begin
+  insert into daily_summaries as d (day, generating_at)
+  values (p_day, now())
+  on conflict (day) do update set generating_at = now()
+  where d.generating_at is null
+    or d.generating_at < now() - make_interval(secs => p_claim_seconds)
+  returning true into v_claimed;
+
+  return coalesce(v_claimed, false);
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create or replace function public.release_daily_summary(p_day date)
+returns void as $$
+  update daily_summaries set generating_at = null where day = p_day;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.claim_daily_summary(date, integer) from public, anon, authenticated;
+revoke execute on function public.release_daily_summary(date) from public, anon, authenticated;
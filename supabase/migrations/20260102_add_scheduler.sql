@@ -0,0 +1,182 @@
+-- Recurring maintenance scheduler (see lib/queues/scheduler.ts)
+--
+-- Every worker process runs the scheduler loop, but only the holder of the
+-- scheduler lease enqueues jobs. The lease expires if its holder stops
+-- renewing it, so another instance takes over. Each schedule's last
+-- enqueued slot is advanced atomically, so a slot is enqueued at most once
+-- even while leadership changes hands, and runs missed during downtime are
+-- caught up (once) on the next tick.
+
+create table if not exists public.scheduler_leases (
+  name text primary key,
+  holder text not null,
+  expires_at timestamptz not null
+);
+
+create table if not exists public.scheduled_runs (
+  name text primary key,
+  last_slot_at timestamptz not null,
+  last_job_id text,
+  updated_at timestamptz not null default now()
+);
+
+alter table public.scheduler_leases enable row level security;
+alter table public.scheduled_runs enable row level security;
+
+-- Take or renew the lease; true while p_holder is the leader
+create or replace function public.acquire_scheduler_lease(
+  p_name text,
+  p_holder text,
+  p_ttl_ms integer
+)
+returns boolean as $$
+  insert into scheduler_leases as l (name, holder, expires_at)
+  values (p_name, p_holder, now() + make_interval(secs => p_ttl_ms / 1000.0))
+  on conflict (name) do update set
+    holder = excluded.holder,
+    expires_at = excluded.expires_at
+  where l.holder = excluded.holder or l.expires_at < now()
+  returning true;
+$$ language sql security definer set search_path = public;
+
+create or replace function public.release_scheduler_lease(p_name text, p_holder text)
+returns void as $$
+  delete from scheduler_leases where name = p_name and holder = p_holder;
+$$ language sql security definer set search_path = public;
+
+-- Advance a schedule to p_slot; true only for the caller that moved it
+create or replace function public.claim_schedule_slot(p_name text, p_slot timestamptz)
+returns boolean as $$
+  insert into scheduled_runs as r (name, last_slot_at)
+  values (p_name, p_slot)
+  on conflict (name) do update set
+    last_slot_at = excluded.last_slot_at,
+    updated_at = now()
+  where r.last_slot_at < excluded.last_slot_at
+  returning true;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.acquire_scheduler_lease(text, text, integer) from public, anon, authenticated;
+revoke execute on function public.release_scheduler_lease(text, text) from public, anon, authenticated;
+revoke execute on function public.claim_schedule_slot(text, timestamptz) from public, anon, authenticated;
+
+-- ========================================
+-- Maintenance Tasks
+-- ========================================
+
+-- Pending invoices past their due date become overdue (IST days, as the
+-- dashboard). Returns the number of invoices marked.
+create or replace function public.mark_overdue_invoices()
+returns integer as $$
+  with marked as (
+    update invoices
+    set status = 'overdue'
+    where status = 'pending'
+      and due_date is not null
+      and due_date::date < public.rollup_day(now())
+    returning 1
+  )
+  select count(*)::integer from marked;
+$$ language sql security definer set search_path = public;
+
+-- Precomputed payloads served by API routes instead of full-table scans
+create table if not exists public.finance_snapshots (
+  key text primary key,
+  payload jsonb not null,
+  computed_at timestamptz not null default now()
+);
+
+alter table public.finance_snapshots enable row level security;
+
+-- Accounts receivable summary, same shape as GET /api/finance/ar
+create or replace function public.refresh_ar_summary()
+returns jsonb as $$
+declare
+  v_payload jsonb;
+begin
+  with paid as (
+    select invoice_id, sum(amount) as paid
+    from invoice_payments
+    group by invoice_id
+  ),
+  per_invoice as (
+    select
+      case
+        when i.status in ('paid', 'pending', 'overdue', 'partially_paid') then i.status
+        when i.status is null then 'pending'
+        else 'other'
+      end as bucket,
+      coalesce(i.amount, 0) as amount,
+      least(coalesce(p.paid, 0), coalesce(i.amount, 0)) as paid,
+      greatest(coalesce(i.amount, 0) - coalesce(p.paid, 0), 0) as outstanding
+    from invoices i
+    left join paid p on p.invoice_id = i.id
+  ),
+  buckets as (
+    select
+      b.bucket,
+      jsonb_build_object(
+        'invoiceCount', count(pi.bucket),
+        'invoiceAmount', coalesce(sum(pi.amount), 0),
+        'outstanding', coalesce(sum(pi.outstanding), 0)
+      ) as summary
+    from unnest(array['paid', 'pending', 'overdue', 'partially_paid', 'other']) as b(bucket)
+    left join per_invoice pi on pi.bucket = b.bucket
+    group by b.bucket
+  )
+  select jsonb_build_object(
+    'totalInvoiced', (select coalesce(sum(amount), 0) from per_invoice),
+    'totalPaid', (select coalesce(sum(paid), 0) from per_invoice),
+    'totalOutstanding', (select coalesce(sum(outstanding), 0) from per_invoice),
+    'buckets', (select jsonb_object_agg(bucket, summary) from buckets)
+  )
+  into v_payload;
+
+  insert into finance_snapshots (key, payload, computed_at)
+  values ('ar_summary', v_payload, now())
+  on conflict (key) do update set
+    payload = excluded.payload,
+    computed_at = excluded.computed_at;
+
+  return v_payload;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+-- Invoice PDFs in storage that no invoice points at any more (superseded
+-- renders whose cleanup failed, uploads whose invoice update failed)
+create or replace function public.find_orphaned_invoice_pdfs(
+  p_bucket text,
+  p_older_than interval default interval '1 day',
+  p_limit integer default 500
+)
+returns setof text as $$
+  select o.name
+  from storage.objects o
+  where o.bucket_id = p_bucket
+    and o.name like 'invoices/%.pdf'
+    and o.created_at < now() - p_older_than
+    and not exists (select 1 from public.invoices i where i.pdf_path = o.name)
+  order by o.created_at
+  limit p_limit;
+$$ language sql stable security definer set search_path = public;
+
+-- Finished queue jobs are kept for metrics and status lookups only
+create or replace function public.prune_jobs(p_keep interval default interval '7 days')
+returns integer as $$
+  with deleted as (
+    delete from jobs
+    where status in ('completed', 'failed')
+      and finished_at < now() - p_keep
+    returning 1
+  )
+  select count(*)::integer from deleted;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.mark_overdue_invoices() from public, anon, authenticated;
+revoke execute on function public.refresh_ar_summary() from public, anon, authenticated;
+revoke execute on function public.find_orphaned_invoice_pdfs(text, interval, integer) from public, anon, authenticated;
+revoke execute on function public.prune_jobs(interval) from public, anon, authenticated;
+
+create index if not exists idx_invoices_pdf_path
+  on public.invoices (pdf_path)
+  where pdf_path is not null;
@@ -0,0 +1,123 @@
+-- Shared send throttle for the WhatsApp worker (lib/whatsapp.ts): every
+-- worker process reserves sends against reserve_send_slot, and a job the
+-- throttle says must wait is handed back with defer_job instead of holding
+-- its lease while it sleeps.
+
+-- ========================================
+-- Deferred jobs
+-- ========================================
+
+-- Put an active job back to waiting for p_delay_ms without using up an
+-- attempt; the Postgres side of BullMQ's moveToDelayed. Workers defer a job
+-- a rate limit says must wait instead of sleeping while holding its lease.
+create or replace function public.defer_job(
+  p_id uuid,
+  p_worker text,
+  p_delay_ms integer
+)
+returns boolean as $$
+  update jobs
+  set
+    status = 'waiting',
+    attempts = greatest(attempts - 1, 0),
+    run_at = now() + make_interval(secs => greatest(p_delay_ms, 0) / 1000.0),
+    locked_by = null,
+    locked_until = null
+  where id = p_id
+    and status = 'active'
+    and locked_by = p_worker
+  returning true;
+$$ language sql security definer set search_path = public;
+
+revoke execute on function public.defer_job(uuid, text, integer) from public, anon, authenticated;
+
+-- ========================================
+-- Shared send throttle
+-- ========================================
+
+-- Send limits shared by every worker process (lib/whatsapp.ts
+-- reserveWhatsAppSend): a token bucket per sending account and a minimum
+-- gap per recipient of that account. One row per account and one per
+-- recipient ever messaged, so neither table needs pruning.
+create table if not exists public.send_rate_buckets (
+  bucket text primary key,
+  tokens double precision not null,
+  refilled_at timestamptz not null default now()
+);
+
+create table if not exists public.send_recipient_slots (
+  bucket text not null,
+  recipient text not null,
+  next_at timestamptz not null,
+  primary key (bucket, recipient)
+);
+
+-- Service role only
+alter table public.send_rate_buckets enable row level security;
+alter table public.send_recipient_slots enable row level security;
+
+-- Reserve one send to p_recipient. Returns 0 when the send may go now (the
+-- token and the recipient's slot are taken), otherwise the milliseconds to
+-- wait; nothing is reserved then. Rows are locked recipient first, then
+-- bucket, in every call, so concurrent callers cannot deadlock.
+create or replace function public.reserve_send_slot(
+  p_bucket text,
+  p_rate_per_second double precision,
+  p_recipient text,
+  p_pair_interval_ms integer
+)
+returns integer as $$
+declare
+  v_now timestamptz := clock_timestamp();
+  v_next_at timestamptz;
+  v_tokens double precision;
+  v_refilled_at timestamptz;
+begin
+  insert into send_recipient_slots (bucket, recipient, next_at)
+  values (p_bucket, p_recipient, '-infinity')
+  on conflict do nothing;
+
+  select next_at into v_next_at
+  from send_recipient_slots
+  where bucket = p_bucket and recipient = p_recipient
+  for update;
+
+  -- A recipient still in its gap must not spend an account token
+  if v_next_at > v_now then
+    return ceil(extract(epoch from v_next_at - v_now) * 1000)::integer;
+  end if;
+
+  insert into send_rate_buckets (bucket, tokens, refilled_at)
+  values (p_bucket, p_rate_per_second, v_now)
+  on conflict do nothing;
+
+  select tokens, refilled_at into v_tokens, v_refilled_at
+  from send_rate_buckets
+  where bucket = p_bucket
+  for update;
+
+  v_tokens := least(
+    p_rate_per_second,
+    v_tokens + greatest(extract(epoch from v_now - v_refilled_at), 0) * p_rate_per_second
+  );
+
+  if v_tokens < 1 then
+    update send_rate_buckets
+    set tokens = v_tokens, refilled_at = v_now
+    where bucket = p_bucket;
+    return greatest(1, ceil((1 - v_tokens) / p_rate_per_second * 1000))::integer;
+  end if;
+
+  update send_rate_buckets
+  set tokens = v_tokens - 1, refilled_at = v_now
+  where bucket = p_bucket;
+
+  update send_recipient_slots
+  set next_at = v_now + make_interval(secs => p_pair_interval_ms / 1000.0)
+  where bucket = p_bucket and recipient = p_recipient;
+
+  return 0;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+revoke execute on function public.reserve_send_slot(text, double precision, text, integer) from public, anon, authenticated;
@@ -0,0 +1,139 @@
+-- claim_jobs, extend_job_lease and complete_job (20251225_add_jobs_queue.sql,
+-- 20251228_add_job_priority.sql). Run with `supabase test db`.
+
+begin;
+
+create extension if not exists pgtap with schema extensions;
+
+select plan(15);
+
+-- ========================================
+-- Fixtures (queue 'test-claim'; now() is fixed for the transaction)
+-- ========================================
+
+insert into public.jobs (id, queue, name, status, attempts, max_attempts, run_at, locked_by, locked_until, priority)
+values
+  -- Due, waiting
+  ('00000000-0000-0000-0000-000000000001', 'test-claim', 'due', 'waiting', 0, 3, now() - interval '1 minute', null, null, 1),
+  -- Not due yet
+  ('00000000-0000-0000-0000-000000000002', 'test-claim', 'future', 'waiting', 0, 3, now() + interval '1 hour', null, null, 1),
+  -- Lease expired with attempts left: reclaimed
+  ('00000000-0000-0000-0000-000000000003', 'test-claim', 'expired', 'active', 1, 3, now() - interval '10 minutes', 'crashed', now() - interval '1 second', 1),
+  -- Lease expired on the final attempt: failed, never reclaimed
+  ('00000000-0000-0000-0000-000000000004', 'test-claim', 'exhausted', 'active', 3, 3, now() - interval '10 minutes', 'crashed', now() - interval '1 second', 1),
+  -- Lease still held
+  ('00000000-0000-0000-0000-000000000005', 'test-claim', 'leased', 'active', 1, 3, now() - interval '10 minutes', 'busy', now() + interval '1 minute', 1);
+
+select is(
+  (select array_agg(name order by name) from public.claim_jobs('test-claim', 'worker-a', 10)),
+  array['due', 'expired'],
+  'claims due waiting jobs and expired leases with attempts left'
+);
+
+select is(
+  (select attempts from public.jobs where id = '00000000-0000-0000-0000-000000000001'),
+  1,
+  'a claim counts an attempt'
+);
+
+select is(
+  (select locked_by from public.jobs where id = '00000000-0000-0000-0000-000000000003'),
+  'worker-a',
+  'a reclaimed job moves to the new worker'
+);
+
+select results_eq(
+  $$ select status, locked_until is null, finished_at is not null
+     from public.jobs where id = '00000000-0000-0000-0000-000000000004' $$,
+  $$ values ('failed'::text, true, true) $$,
+  'an expired lease on the final attempt is failed'
+);
+
+select is(
+  (select attempts from public.jobs where id = '00000000-0000-0000-0000-000000000004'),
+  3,
+  'a failed exhausted job is not charged another attempt'
+);
+
+select results_eq(
+  $$ select status, locked_by from public.jobs where id = '00000000-0000-0000-0000-000000000005' $$,
+  $$ values ('active'::text, 'busy'::text) $$,
+  'a live lease is left alone'
+);
+
+select is_empty(
+  $$ select * from public.claim_jobs('test-claim', 'worker-b', 10) $$,
+  'nothing is claimable twice'
+);
+
+-- ========================================
+-- Leases
+-- ========================================
+
+select ok(
+  public.extend_job_lease('00000000-0000-0000-0000-000000000001', 'worker-a', 300000),
+  'the holder can extend its lease'
+);
+
+select is(
+  public.extend_job_lease('00000000-0000-0000-0000-000000000001', 'worker-b', 300000),
+  null,
+  'another worker cannot extend the lease'
+);
+
+select is(
+  public.complete_job('00000000-0000-0000-0000-000000000003', 'crashed'),
+  null,
+  'the previous holder cannot complete a reclaimed job'
+);
+
+select ok(
+  public.complete_job('00000000-0000-0000-0000-000000000003', 'worker-a'),
+  'the current holder completes the job'
+);
+
+-- ========================================
+-- Priority and aging
+-- ========================================
+
+insert into public.jobs (id, queue, name, status, run_at, priority)
+values
+  ('00000000-0000-0000-0000-000000000011', 'test-priority', 'bulk', 'waiting', now() - interval '1 minute', 2),
+  ('00000000-0000-0000-0000-000000000012', 'test-priority', 'interactive', 'waiting', now() - interval '1 minute', 1),
+  -- Waited longer than the aging allowance for one priority step
+  ('00000000-0000-0000-0000-000000000013', 'test-priority', 'aged-bulk', 'waiting', now() - interval '10 minutes', 2);
+
+select is(
+  (select array_agg(name) from public.claim_jobs('test-priority', 'worker-a', 1, 60000, 120000)),
+  array['aged-bulk'],
+  'a bulk job that waited past the aging allowance goes first'
+);
+
+select is(
+  (select array_agg(name) from public.claim_jobs('test-priority', 'worker-a', 1, 60000, 120000)),
+  array['interactive'],
+  'otherwise the more urgent priority goes first'
+);
+
+-- ========================================
+-- Enqueue
+-- ========================================
+
+create temp table bulk_job as
+select public.enqueue_job('test-priority', 'bulk', '{}', 'dup', 3, 2000, 0, 2) as id;
+
+select is(
+  public.enqueue_job('test-priority', 'bulk', '{}', 'dup', 3, 2000, 0, 1),
+  (select id from bulk_job),
+  'enqueueing a pending duplicate returns the existing job'
+);
+
+select is(
+  (select priority from public.jobs where id = (select id from bulk_job)),
+  1,
+  'the duplicate raises the job to the more urgent priority'
+);
+
+select * from finish();
+
+rollback;
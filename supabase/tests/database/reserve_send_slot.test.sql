@@ -0,0 +1,71 @@
+-- reserve_send_slot and defer_job (20260103_add_send_throttle.sql).
+-- Run with `supabase test db`.
+
+begin;
+
+create extension if not exists pgtap with schema extensions;
+
+select plan(10);
+
+-- ========================================
+-- Account bucket (2 sends per second)
+-- ========================================
+
+select is(public.reserve_send_slot('test:account', 2, '911111111111', 6000), 0, 'first send is reserved');
+select is(public.reserve_send_slot('test:account', 2, '912222222222', 6000), 0, 'the burst allows a second recipient');
+
+select ok(
+  public.reserve_send_slot('test:account', 2, '913333333333', 6000) between 1 and 500,
+  'an empty bucket returns the wait for the next token'
+);
+
+select ok(
+  (select tokens between 0 and 1 from public.send_rate_buckets where bucket = 'test:account'),
+  'a refused send does not take a token'
+);
+
+-- ========================================
+-- Recipient gap
+-- ========================================
+
+select is(public.reserve_send_slot('test:pair', 2, '914444444444', 6000), 0, 'first send to a recipient is reserved');
+
+select ok(
+  public.reserve_send_slot('test:pair', 2, '914444444444', 6000) between 5000 and 6000,
+  'a second send to the same recipient waits out the gap'
+);
+
+select is(
+  public.reserve_send_slot('test:pair', 2, '915555555555', 6000),
+  0,
+  'waiting on a recipient gap does not spend an account token'
+);
+
+-- ========================================
+-- Deferral
+-- ========================================
+
+insert into public.jobs (id, queue, name, status, attempts, locked_by, locked_until)
+values ('00000000-0000-0000-0000-000000000021', 'test-defer', 'send', 'active', 1, 'worker-a', now() + interval '1 minute');
+
+select is(
+  public.defer_job('00000000-0000-0000-0000-000000000021', 'worker-b', 1000),
+  null,
+  'only the lease holder can defer a job'
+);
+
+select ok(
+  public.defer_job('00000000-0000-0000-0000-000000000021', 'worker-a', 60000),
+  'the lease holder defers the job'
+);
+
+select results_eq(
+  $$ select status, attempts, locked_by, run_at >= now() + interval '59 seconds'
+     from public.jobs where id = '00000000-0000-0000-0000-000000000021' $$,
+  $$ values ('waiting'::text, 0, null::text, true) $$,
+  'a deferred job waits again without using up an attempt'
+);
+
+select * from finish();
+
+rollback;
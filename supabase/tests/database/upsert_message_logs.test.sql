@@ -0,0 +1,134 @@
+-- upsert_message_logs status ordering (20251230_add_message_logs.sql).
+-- Run with `supabase test db`.
+
+begin;
+
+create extension if not exists pgtap with schema extensions;
+
+select plan(15);
+
+-- ========================================
+-- Within one batch
+-- ========================================
+
+select is(
+  public.upsert_message_logs($$[
+    {"provider": "meta", "provider_message_id": "wamid.test-1", "status": "read", "status_at": "2026-01-10T10:00:03Z"},
+    {"provider": "meta", "provider_message_id": "wamid.test-1", "status": "sent", "status_at": "2026-01-10T10:00:01Z"},
+    {"provider": "meta", "provider_message_id": "wamid.test-1", "status": "delivered", "status_at": "2026-01-10T10:00:02Z"}
+  ]$$::jsonb),
+  1,
+  'events for one message collapse to one row'
+);
+
+select results_eq(
+  $$ select status, status_rank::integer, status_at, channel
+     from public.message_logs where provider = 'meta' and provider_message_id = 'wamid.test-1' $$,
+  $$ values ('read'::text, 6, '2026-01-10T10:00:03Z'::timestamptz, 'whatsapp'::text) $$,
+  'the furthest status in the batch wins, whatever the arrival order'
+);
+
+-- ========================================
+-- Across batches
+-- ========================================
+
+select lives_ok(
+  $sql$ select public.upsert_message_logs($$[
+    {"provider": "meta", "provider_message_id": "wamid.test-1", "status": "delivered", "status_at": "2026-01-10T10:00:05Z"}
+  ]$$::jsonb) $sql$,
+  'a delayed delivery event is accepted'
+);
+
+select is(
+  (select status from public.message_logs where provider = 'meta' and provider_message_id = 'wamid.test-1'),
+  'read',
+  'a delayed earlier status does not regress the message'
+);
+
+select lives_ok(
+  $sql$ select public.upsert_message_logs($$[
+    {"provider": "twilio", "channel": "sms", "provider_message_id": "SM-test-2", "status": "delivered", "status_at": "2026-01-10T10:00:02Z"}
+  ]$$::jsonb) $sql$,
+  'the delivery is recorded'
+);
+
+select lives_ok(
+  $sql$ select public.upsert_message_logs($$[
+    {"provider": "twilio", "channel": "sms", "provider_message_id": "SM-test-2", "status": "undelivered", "status_at": "2026-01-10T10:00:04Z", "error_message": "Carrier rejected"}
+  ]$$::jsonb) $sql$,
+  'a late failure is accepted'
+);
+
+select results_eq(
+  $$ select status, error_message
+     from public.message_logs where provider = 'twilio' and provider_message_id = 'SM-test-2' $$,
+  $$ values ('undelivered'::text, 'Carrier rejected'::text) $$,
+  'a late failure still lands after delivery'
+);
+
+select lives_ok(
+  $sql$ select public.upsert_message_logs($$[
+    {"provider": "twilio", "channel": "sms", "provider_message_id": "SM-test-2", "status": "failed", "status_at": "2026-01-10T10:00:03Z"}
+  ]$$::jsonb) $sql$,
+  'an equal-rank failure is accepted'
+);
+
+select is(
+  (select status from public.message_logs where provider = 'twilio' and provider_message_id = 'SM-test-2'),
+  'undelivered',
+  'on equal rank the later event wins'
+);
+
+-- ========================================
+-- Callbacks before the send is logged
+-- ========================================
+
+select lives_ok(
+  $sql$ select public.upsert_message_logs($$[
+    {"provider": "meta", "provider_message_id": "wamid.test-3", "status": "delivered", "status_at": "2026-01-10T10:00:02Z"}
+  ]$$::jsonb) $sql$,
+  'a callback before the send is accepted'
+);
+
+select lives_ok(
+  $sql$ select public.upsert_message_logs($$[
+    {"provider": "meta", "provider_message_id": "wamid.test-3", "phone": "919999999999", "mode": "meta_cloud", "status": "sent", "status_at": "2026-01-10T10:00:01Z"}
+  ]$$::jsonb) $sql$,
+  'the send is accepted'
+);
+
+select results_eq(
+  $$ select status, phone, mode
+     from public.message_logs where provider = 'meta' and provider_message_id = 'wamid.test-3' $$,
+  $$ values ('delivered'::text, '919999999999'::text, 'meta_cloud'::text) $$,
+  'the send fills in the row a callback created without regressing it'
+);
+
+select is(
+  (select count(*)::integer from public.message_logs where provider = 'meta' and provider_message_id = 'wamid.test-3'),
+  1,
+  'the callback and the send share one row'
+);
+
+-- ========================================
+-- Failed sends without a provider id
+-- ========================================
+
+select is(
+  public.upsert_message_logs($$[
+    {"provider": "meta", "phone": "918888888888", "status": "failed", "error_message": "test: no id 1"},
+    {"provider": "meta", "phone": "918888888888", "status": "failed", "error_message": "test: no id 2"}
+  ]$$::jsonb),
+  2,
+  'rows without a provider id are counted'
+);
+
+select is(
+  (select count(*)::integer from public.message_logs where error_message like 'test: no id %'),
+  2,
+  'rows without a provider id are all kept'
+);
+
+select * from finish();
+
+rollback;
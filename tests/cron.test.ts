@@ -0,0 +1,66 @@
+import { test } from "node:test";
+import assert from "node:assert/strict";
+import { parseCron, previousCronSlot } from "@/lib/queues/cron";
+
+const IST = 330;
+
+function slot(expression: string, at: string, offset = 0) {
+  return previousCronSlot(parseCron(expression), new Date(at), offset)?.toISOString() ?? null;
+}
+
+test("parseCron expands lists, ranges and steps", () => {
+  const cron = parseCron("0,30 7-9 */10 1-12/6 1-5");
+
+  assert.deepEqual([...cron.minutes], [0, 30]);
+  assert.deepEqual([...cron.hours], [7, 8, 9]);
+  assert.deepEqual([...cron.daysOfMonth], [1, 11, 21, 31]);
+  assert.deepEqual([...cron.months], [1, 7]);
+  assert.deepEqual([...cron.daysOfWeek], [1, 2, 3, 4, 5]);
+  assert.equal(cron.dayOfMonthRestricted, true);
+  assert.equal(cron.dayOfWeekRestricted, true);
+});
+
+test("parseCron treats 7 as Sunday and rejects bad expressions", () => {
+  assert.deepEqual([...parseCron("0 0 * * 7").daysOfWeek], [0]);
+
+  assert.throws(() => parseCron("* * * *"), /expected 5 fields/);
+  assert.throws(() => parseCron("60 * * * *"), /Invalid cron field/);
+  assert.throws(() => parseCron("*/0 * * * *"), /Invalid cron field/);
+  assert.throws(() => parseCron("a * * * *"), /Invalid cron field/);
+});
+
+test("previousCronSlot returns the slot at or before the given time", () => {
+  assert.equal(slot("5 * * * *", "2026-01-10T10:05:00Z"), "2026-01-10T10:05:00.000Z");
+  assert.equal(slot("5 * * * *", "2026-01-10T10:05:59Z"), "2026-01-10T10:05:00.000Z");
+  assert.equal(slot("5 * * * *", "2026-01-10T10:04:59Z"), "2026-01-10T09:05:00.000Z");
+  assert.equal(slot("*/15 * * * *", "2026-01-10T10:44:00Z"), "2026-01-10T10:30:00.000Z");
+});
+
+test("previousCronSlot evaluates the schedule at the UTC offset", () => {
+  // 03:30 IST is 22:00 UTC the previous day
+  assert.equal(slot("30 3 * * *", "2026-01-10T00:00:00Z", IST), "2026-01-09T22:00:00.000Z");
+  // Before 07:00 IST the last 07-21 slot was 21:30 IST the previous day
+  assert.equal(
+    slot("0,30 7-21 * * *", "2026-01-10T01:00:00Z", IST),
+    "2026-01-09T16:00:00.000Z"
+  );
+});
+
+test("previousCronSlot crosses day, month and year boundaries", () => {
+  // Mondays only; 2026-01-14 is a Wednesday
+  assert.equal(slot("0 9 * * 1", "2026-01-14T12:00:00Z"), "2026-01-12T09:00:00.000Z");
+  // First of the month
+  assert.equal(slot("0 0 1 * *", "2026-03-15T00:00:00Z"), "2026-03-01T00:00:00.000Z");
+  assert.equal(slot("0 0 1 * *", "2026-01-01T00:00:00Z"), "2026-01-01T00:00:00.000Z");
+  assert.equal(slot("59 23 31 12 *", "2026-01-01T00:00:00Z"), "2025-12-31T23:59:00.000Z");
+});
+
+test("either day field matches when both are restricted", () => {
+  // The 15th or any Sunday; 2026-01-11 is a Sunday
+  assert.equal(slot("0 0 15 * 0", "2026-01-13T00:00:00Z"), "2026-01-11T00:00:00.000Z");
+  assert.equal(slot("0 0 15 * 0", "2026-01-16T00:00:00Z"), "2026-01-15T00:00:00.000Z");
+});
+
+test("previousCronSlot gives up after a year without a match", () => {
+  assert.equal(slot("0 0 31 2 *", "2026-01-10T00:00:00Z"), null);
+});
@@ -0,0 +1,62 @@
+import { test } from "node:test";
+import assert from "node:assert/strict";
+import {
+  decodeCursor,
+  encodeCursor,
+  keysetAfterFilter,
+  toKeysetPage,
+} from "@/lib/pagination";
+
+const cursor = {
+  createdAt: "2025-12-01T10:15:00.123456+05:30",
+  id: "6f1c2a4e-8d3b-4c5a-9e7f-0a1b2c3d4e5f",
+};
+
+test("cursors round-trip through encode and decode", () => {
+  const encoded = encodeCursor(cursor);
+  assert.match(encoded, /^[A-Za-z0-9_-]+$/);
+  assert.deepEqual(decodeCursor(encoded), cursor);
+});
+
+test("decodeCursor rejects missing and malformed cursors", () => {
+  assert.equal(decodeCursor(null), null);
+  assert.equal(decodeCursor(""), null);
+  assert.equal(decodeCursor("not base64 json"), null);
+  assert.equal(
+    decodeCursor(Buffer.from(JSON.stringify({ createdAt: "x" })).toString("base64url")),
+    null
+  );
+  assert.equal(
+    decodeCursor(Buffer.from(JSON.stringify(["yesterday", cursor.id])).toString("base64url")),
+    null
+  );
+  assert.equal(
+    decodeCursor(Buffer.from(JSON.stringify([cursor.createdAt, 42])).toString("base64url")),
+    null
+  );
+});
+
+test("keysetAfterFilter quotes values with reserved characters", () => {
+  assert.equal(
+    keysetAfterFilter(cursor),
+    `created_at.lt."${cursor.createdAt}",and(created_at.eq."${cursor.createdAt}",id.lt."${cursor.id}")`
+  );
+});
+
+test("toKeysetPage returns a cursor only when there are more rows", () => {
+  const rows = [
+    { id: "c", created_at: "2025-12-03T00:00:00Z" },
+    { id: "b", created_at: "2025-12-02T00:00:00Z" },
+    { id: "a", created_at: "2025-12-01T00:00:00Z" },
+  ];
+
+  const page = toKeysetPage(rows, 2);
+  assert.deepEqual(page.items, rows.slice(0, 2));
+  assert.deepEqual(decodeCursor(page.nextCursor), {
+    createdAt: "2025-12-02T00:00:00Z",
+    id: "b",
+  });
+
+  assert.deepEqual(toKeysetPage(rows, 3), { items: rows, nextCursor: null });
+  assert.deepEqual(toKeysetPage([], 3), { items: [], nextCursor: null });
+});
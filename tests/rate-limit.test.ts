@@ -0,0 +1,94 @@
+import { afterEach, beforeEach, mock, test } from "node:test";
+import assert from "node:assert/strict";
+import { checkRateLimit } from "@/lib/rateLimit";
+
+// Without UPSTASH_REDIS_REST_URL only the local token bucket is active.
+// Each test uses its own identifier, since buckets live at module level.
+
+beforeEach(() => {
+  mock.timers.enable({ apis: ["Date"], now: 1_000_000 });
+});
+
+afterEach(() => {
+  mock.timers.reset();
+});
+
+test("allows up to the limit, then rejects until tokens refill", async () => {
+  // auth: 5 per minute, no burst
+  for (let i = 0; i < 5; i++) {
+    assert.equal((await checkRateLimit("auth", "ip:refill")).success, true);
+  }
+
+  const rejected = await checkRateLimit("auth", "ip:refill");
+  assert.equal(rejected.success, false);
+  assert.equal(rejected.remaining, 0);
+  // One token takes a fifth of the window
+  assert.equal(rejected.reset, Date.now() + 12_000);
+
+  mock.timers.tick(6_000);
+  assert.equal((await checkRateLimit("auth", "ip:refill")).success, false);
+
+  mock.timers.tick(6_100);
+  assert.equal((await checkRateLimit("auth", "ip:refill")).success, true);
+  assert.equal((await checkRateLimit("auth", "ip:refill")).success, false);
+});
+
+test("burst adds capacity on top of the limit", async () => {
+  // tracking: 30 per minute plus a burst of 10
+  for (let i = 0; i < 40; i++) {
+    assert.equal((await checkRateLimit("tracking", "ip:burst")).success, true);
+  }
+  assert.equal((await checkRateLimit("tracking", "ip:burst")).success, false);
+});
+
+test("charges the declared cost", async () => {
+  // invoicePdf base tier: capacity 40
+  for (let i = 0; i < 4; i++) {
+    const result = await checkRateLimit("invoicePdf", "user:cost", { cost: 10 });
+    assert.equal(result.success, true);
+    assert.equal(result.remaining, 30 - i * 10);
+  }
+  assert.equal((await checkRateLimit("invoicePdf", "user:cost", { cost: 1 })).success, false);
+});
+
+test("a cost above capacity is rejected with a full-window reset", async () => {
+  const result = await checkRateLimit("auth", "ip:oversized", { cost: 6 });
+  assert.equal(result.success, false);
+  assert.equal(result.reset, Date.now() + 60_000);
+
+  // Nothing was charged
+  assert.equal((await checkRateLimit("auth", "ip:oversized", { cost: 5 })).success, true);
+});
+
+test("roles get their tier's budget", async () => {
+  // api: base capacity 15, viewer 30
+  let anonymous = 0;
+  while ((await checkRateLimit("api", "ip:tiers")).success) anonymous++;
+  assert.equal(anonymous, 15);
+
+  let viewer = 0;
+  while ((await checkRateLimit("api", "user:tiers", { role: "viewer" })).success) viewer++;
+  assert.equal(viewer, 30);
+
+  // Unknown roles fall back to the base tier
+  let unknown = 0;
+  while ((await checkRateLimit("api", "user:unknown-role", { role: "guest" })).success) unknown++;
+  assert.equal(unknown, 15);
+});
+
+test("bulk PDF queueing is charged per invoice", async () => {
+  assert.equal(
+    (await checkRateLimit("invoicePdfBulk", "user:bulk", { cost: 1000, role: "operator" })).success,
+    true
+  );
+  assert.equal(
+    (await checkRateLimit("invoicePdfBulk", "user:bulk", { cost: 1, role: "operator" })).success,
+    false
+  );
+
+  assert.equal(
+    (await checkRateLimit("invoicePdfBulk", "user:bulk-admin", { cost: 2000, role: "admin" }))
+      .success,
+    true
+  );
+});
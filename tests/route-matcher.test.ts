@@ -0,0 +1,51 @@
+import { test } from "node:test";
+import assert from "node:assert/strict";
+import { compileRouteMatcher } from "@/lib/route-matcher";
+
+test("segment routes match the path and anything below it", () => {
+  const match = compileRouteMatcher([{ path: "/track", value: "track" }]);
+
+  assert.equal(match("/track"), "track");
+  assert.equal(match("/track/ABC123"), "track");
+  assert.equal(match("/tracking"), null);
+  assert.equal(match("/trac"), null);
+  assert.equal(match("/"), null);
+});
+
+test("exact routes match only the path itself", () => {
+  const match = compileRouteMatcher([{ path: "/login", value: true, match: "exact" }]);
+
+  assert.equal(match("/login"), true);
+  assert.equal(match("/login/"), null);
+  assert.equal(match("/login/reset"), null);
+});
+
+test("prefix routes behave like startsWith", () => {
+  const match = compileRouteMatcher([{ path: "/_next", value: true, match: "prefix" }]);
+
+  assert.equal(match("/_next"), true);
+  assert.equal(match("/_next/static/chunk.js"), true);
+  assert.equal(match("/_nextjs"), true);
+  assert.equal(match("/_nex"), null);
+});
+
+test("the longest matching route wins", () => {
+  const match = compileRouteMatcher([
+    { path: "/api", value: "api" },
+    { path: "/api/webhooks", value: "webhooks" },
+    { path: "/api/webhooks/whatsapp", value: "whatsapp", match: "exact" },
+  ]);
+
+  assert.equal(match("/api/invoices"), "api");
+  assert.equal(match("/api/webhooks/twilio"), "webhooks");
+  assert.equal(match("/api/webhooks/whatsapp"), "whatsapp");
+  // The exact route does not match below itself; its parent still does
+  assert.equal(match("/api/webhooks/whatsapp/extra"), "webhooks");
+  assert.equal(match("/apis"), null);
+});
+
+test("an empty table matches nothing", () => {
+  const match = compileRouteMatcher<boolean>([]);
+  assert.equal(match("/"), null);
+  assert.equal(match(""), null);
+});
@@ -0,0 +1,136 @@
+import { afterEach, beforeEach, test } from "node:test";
+import assert from "node:assert/strict";
+import {
+  USER_CONTEXT_HEADERS,
+  readUserContextHeaders,
+  stripUserContextHeaders,
+  writeUserContextHeaders,
+} from "@/lib/user-context";
+
+const user = {
+  userId: "6f1c2a4e-8d3b-4c5a-9e7f-0a1b2c3d4e5f",
+  email: "ops@example.com",
+  role: "operator",
+  location: "Mumbai",
+};
+
+const originalSecret = process.env.USER_CONTEXT_SECRET;
+const originalServiceKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
+
+beforeEach(() => {
+  process.env.USER_CONTEXT_SECRET = "test-user-context-secret";
+});
+
+afterEach(() => {
+  const restore = (name: string, value: string | undefined) => {
+    if (value === undefined) delete process.env[name];
+    else process.env[name] = value;
+  };
+  restore("USER_CONTEXT_SECRET", originalSecret);
+  restore("SUPABASE_SERVICE_ROLE_KEY", originalServiceKey);
+});
+
+async function signedHeaders() {
+  const headers = new Headers();
+  assert.equal(await writeUserContextHeaders(headers, user), true);
+  return headers;
+}
+
+test("signed headers round-trip", async () => {
+  assert.deepEqual(await readUserContextHeaders(await signedHeaders()), user);
+});
+
+test("headers without a signature are rejected", async () => {
+  const headers = await signedHeaders();
+  headers.delete(USER_CONTEXT_HEADERS.signature);
+  assert.equal(await readUserContextHeaders(headers), null);
+
+  const forged = new Headers({
+    [USER_CONTEXT_HEADERS.id]: user.userId,
+    [USER_CONTEXT_HEADERS.role]: "admin",
+  });
+  assert.equal(await readUserContextHeaders(forged), null);
+});
+
+test("changing any signed field invalidates the signature", async () => {
+  for (const [name, value] of [
+    [USER_CONTEXT_HEADERS.role, "admin"],
+    [USER_CONTEXT_HEADERS.id, "00000000-0000-0000-0000-000000000000"],
+    [USER_CONTEXT_HEADERS.location, "Delhi"],
+    [USER_CONTEXT_HEADERS.email, "someone@example.com"],
+  ]) {
+    const headers = await signedHeaders();
+    headers.set(name, value);
+    assert.equal(await readUserContextHeaders(headers), null, `tampered ${name}`);
+  }
+
+  const dropped = await signedHeaders();
+  dropped.delete(USER_CONTEXT_HEADERS.location);
+  assert.equal(await readUserContextHeaders(dropped), null, "dropped location");
+});
+
+test("forged and malformed signatures are rejected", async () => {
+  const headers = await signedHeaders();
+  const [issuedAt, signature] = headers.get(USER_CONTEXT_HEADERS.signature)!.split(".");
+
+  for (const value of [
+    `${issuedAt}.${"0".repeat(signature.length)}`,
+    `${issuedAt}.${signature.slice(0, -2)}`,
+    `${issuedAt}.not-hex`,
+    `${Number(issuedAt) + 1}.${signature}`,
+    signature,
+    "",
+  ]) {
+    headers.set(USER_CONTEXT_HEADERS.signature, value);
+    assert.equal(await readUserContextHeaders(headers), null, `signature "${value}"`);
+  }
+});
+
+test("a signature from another secret is rejected", async () => {
+  const headers = await signedHeaders();
+  process.env.USER_CONTEXT_SECRET = "another-secret";
+  assert.equal(await readUserContextHeaders(headers), null);
+});
+
+test("signatures expire after a minute", async () => {
+  const realNow = Date.now;
+  try {
+    const issued = realNow();
+    Date.now = () => issued;
+    const headers = await signedHeaders();
+
+    Date.now = () => issued + 60_000;
+    assert.deepEqual(await readUserContextHeaders(headers), user);
+
+    Date.now = () => issued + 60_001;
+    assert.equal(await readUserContextHeaders(headers), null);
+
+    // Issued in the future
+    Date.now = () => issued - 1;
+    assert.equal(await readUserContextHeaders(headers), null);
+  } finally {
+    Date.now = realNow;
+  }
+});
+
+test("without a secret nothing is forwarded or accepted", async () => {
+  const headers = await signedHeaders();
+
+  delete process.env.USER_CONTEXT_SECRET;
+  delete process.env.SUPABASE_SERVICE_ROLE_KEY;
+
+  assert.equal(await readUserContextHeaders(headers), null);
+
+  const unsigned = new Headers();
+  assert.equal(await writeUserContextHeaders(unsigned, user), false);
+  assert.equal(unsigned.get(USER_CONTEXT_HEADERS.id), null);
+});
+
+test("stripUserContextHeaders removes every context header", async () => {
+  const headers = await signedHeaders();
+  headers.set("x-other", "kept");
+  stripUserContextHeaders(headers);
+
+  Object.values(USER_CONTEXT_HEADERS).forEach((name) => assert.equal(headers.get(name), null));
+  assert.equal(headers.get("x-other"), "kept");
+});
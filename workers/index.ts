@@ -0,0 +1,186 @@
+/**
+ * Background worker process
+ *
+ * Runs the queue workers outside the Next.js server so PDF rendering scales
+ * on its own nodes:
+ *
+ *   npm run worker
+ *
+ * Environment:
+ * - WORKER_QUEUES                 comma-separated subset of: invoice,email,whatsapp,
+ *                                 maintenance,webhooks,scheduler (default: all; webhooks =
+ *                                 the webhook inbox consumer, scheduler = recurring
+ *                                 maintenance, leader-elected across processes)
+ * - WORKER_INVOICE_CONCURRENCY    concurrent PDF jobs per process (default 2)
+ * - WORKER_EMAIL_CONCURRENCY      concurrent email jobs per process (default 10)
+ * - WORKER_WHATSAPP_CONCURRENCY   concurrent WhatsApp sends per process (default 20)
+ * - WHATSAPP_MESSAGES_PER_SECOND  account send rate, shared by all workers (default 80)
+ * - WHATSAPP_PAIR_INTERVAL_MS     min gap between messages to one phone (default 6000)
+ * - WORKER_SHUTDOWN_TIMEOUT_MS    max time to drain on SIGTERM/SIGINT (default 60000)
+ * - WEBHOOK_INBOX_BATCH_SIZE      inbox events applied per round trip (default 500)
+ * - QUEUE_PRIORITY_AGING_MS       wait after which bulk jobs rank as interactive (default 120000)
+ *
+ * Queue driver selection (REDIS_URL / QUEUE_DRIVER) is the same as the web
+ * tier's, see lib/queues/setup.ts.
+ */
+
+import {
+  PRIORITY_AGING_MS,
+  QUEUE_NAMES,
+  closeQueueConnection,
+  createQueueWorker,
+  invoiceQueue,
+  promoteAgedJobs,
+  queueDriver,
+  whatsappQueue,
+} from "@/lib/queues/setup";
+import {
+  processEmailJob,
+  processInvoiceJob,
+  processMaintenanceJob,
+  processWhatsAppJob,
+} from "@/lib/queues/processors";
+import { startScheduler } from "@/lib/queues/scheduler";
+import { startWebhookInboxConsumer } from "@/lib/webhook-inbox";
+import { WHATSAPP_MESSAGES_PER_SECOND } from "@/lib/whatsapp";
+
+type WorkerQueue = keyof typeof QUEUE_NAMES | "webhooks" | "scheduler";
+
+const WORKER_QUEUES = [...Object.keys(QUEUE_NAMES), "webhooks", "scheduler"];
+
+function readInt(name: string, fallback: number) {
+  const value = Number.parseInt(process.env[name] ?? "", 10);
+  return Number.isFinite(value) && value > 0 ? value : fallback;
+}
+
+const enabledQueues = new Set<WorkerQueue>(
+  (process.env.WORKER_QUEUES ?? WORKER_QUEUES.join(","))
+    .split(",")
+    .map((queue) => queue.trim())
+    .filter((queue): queue is WorkerQueue => WORKER_QUEUES.includes(queue))
+);
+
+const shutdownTimeoutMs = readInt("WORKER_SHUTDOWN_TIMEOUT_MS", 60_000);
+
+function main() {
+  if (!queueDriver) {
+    console.error("[worker] No queue driver configured. Set REDIS_URL or SUPABASE_SERVICE_ROLE_KEY.");
+    process.exit(1);
+  }
+
+  const workers: { queue: WorkerQueue; worker: any }[] = [];
+
+  if (enabledQueues.has("invoice")) {
+    workers.push({
+      queue: "invoice",
+      worker: createQueueWorker(QUEUE_NAMES.invoice, processInvoiceJob, {
+        concurrency: readInt("WORKER_INVOICE_CONCURRENCY", 2),
+        // PDF rendering can take a while; don't hand the job to another worker
+        visibilityTimeoutMs: 5 * 60_000,
+        limiter: { max: 10, duration: 1000 },
+      }),
+    });
+  }
+
+  if (enabledQueues.has("email")) {
+    workers.push({
+      queue: "email",
+      worker: createQueueWorker(QUEUE_NAMES.email, processEmailJob, {
+        concurrency: readInt("WORKER_EMAIL_CONCURRENCY", 10),
+      }),
+    });
+  }
+
+  if (enabledQueues.has("whatsapp")) {
+    workers.push({
+      queue: "whatsapp",
+      worker: createQueueWorker(QUEUE_NAMES.whatsapp, processWhatsAppJob, {
+        // Sends are network-bound; the throttle, not concurrency, sets the pace
+        concurrency: readInt("WORKER_WHATSAPP_CONCURRENCY", 20),
+        // Throttled jobs are deferred, not held, so a job's longest run is a
+        // PDF render on a cache miss plus one send
+        visibilityTimeoutMs: 3 * 60_000,
+        limiter: { max: WHATSAPP_MESSAGES_PER_SECOND, duration: 1000 },
+      }),
+    });
+  }
+
+  if (enabledQueues.has("maintenance")) {
+    workers.push({
+      queue: "maintenance",
+      worker: createQueueWorker(QUEUE_NAMES.maintenance, processMaintenanceJob, {
+        concurrency: 1,
+        visibilityTimeoutMs: 10 * 60_000,
+      }),
+    });
+  }
+
+  // The scheduler and inbox consumer are loops, not queue workers: close()
+  // is all the shutdown path needs
+  if (enabledQueues.has("scheduler")) {
+    workers.push({ queue: "scheduler", worker: startScheduler() });
+  }
+
+  if (enabledQueues.has("webhooks")) {
+    workers.push({
+      queue: "webhooks",
+      worker: startWebhookInboxConsumer({
+        batchSize: readInt("WEBHOOK_INBOX_BATCH_SIZE", 500),
+      }),
+    });
+  }
+
+  workers.forEach(({ queue, worker }) => {
+    if (!worker.on) return;
+    worker.on("completed", (job: any) => {
+      console.log(`✅ ${queue} job ${job.id} completed`);
+    });
+    worker.on("failed", (job: any, error: Error) => {
+      console.error(`❌ ${queue} job ${job?.id} failed:`, error?.message);
+    });
+  });
+
+  console.log(
+    `[worker] ${queueDriver} driver, queues: ${workers.map((w) => w.queue).join(", ") || "none"}`
+  );
+
+  // BullMQ priorities are strict; age bulk jobs forward so they cannot starve
+  const agingTimer =
+    queueDriver === "bullmq"
+      ? setInterval(() => {
+          [invoiceQueue, whatsappQueue].forEach((queue) => {
+            promoteAgedJobs(queue).catch((error) =>
+              console.error(`[worker] Failed to promote aged ${queue?.name} jobs:`, error?.message)
+            );
+          });
+        }, Math.max(5_000, PRIORITY_AGING_MS / 4))
+      : null;
+
+  let shuttingDown = false;
+
+  async function shutdown(signal: string) {
+    if (shuttingDown) return;
+    shuttingDown = true;
+    console.log(`[worker] ${signal} received, draining in-flight jobs...`);
+
+    const forceExit = setTimeout(() => {
+      console.error(`[worker] Drain exceeded ${shutdownTimeoutMs}ms, exiting`);
+      process.exit(1);
+    }, shutdownTimeoutMs);
+
+    if (agingTimer) clearInterval(agingTimer);
+
+    // close() stops taking new jobs and waits for active ones
+    await Promise.allSettled(workers.map(({ worker }) => worker.close()));
+    await closeQueueConnection();
+
+    clearTimeout(forceExit);
+    console.log("[worker] Drained, exiting");
+    process.exit(0);
+  }
+
+  process.on("SIGTERM", () => void shutdown("SIGTERM"));
+  process.on("SIGINT", () => void shutdown("SIGINT"));
+}
+
+main();